@@ -1,5 +1,6 @@
 const cron = require("node-cron");
 const { runLSTMModel } = require("./models/LSTMModelRunner");
+const { invalidateHistoryCache } = require("./models/HistoryCache");
 const axios = require("axios");
 const { MongoClient } = require("mongodb");
 
@@ -70,6 +71,7 @@ async function checkAndRunForecast() {
 
       // Insert new predictions
       await collection.insertMany(predictions);
+      invalidateHistoryCache();
 
       // Post to API
       await axios.post("http://localhost:5000/api/predictions/lstm", { predictions });
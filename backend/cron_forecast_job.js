@@ -3,6 +3,7 @@ const cron = require("node-cron");
 const axios = require("axios");
 const { MongoClient } = require("mongodb");
 const { runLSTMModel } = require("./models/LSTMModelRunner");
+const { invalidateHistoryCache } = require("./models/HistoryCache");
 
 const mongoURL = "mongodb://localhost:27018/";
 const dbName = "noaa_database";
@@ -70,6 +71,7 @@ async function checkAndRunForecast() {
 
     // Insert new future predictions
     await collection.insertMany(predictions);
+    invalidateHistoryCache();
     console.log(`✅ Saved ${predictions.length} future forecast entries to MongoDB.`);
 
     // Optional: post to Express API
@@ -1,5 +1,6 @@
 // backend/migrate_dates.js
 const mongoose = require("mongoose");
+const { invalidateHistoryCache } = require("./models/HistoryCache");
 
 const mongoURL = "mongodb://localhost:27018/noaa_database";
 
@@ -25,6 +26,7 @@ async function migrateDates() {
     }
   }
 
+  invalidateHistoryCache();
   console.log("✅ Migration complete!");
   await mongoose.disconnect();
 }
@@ -0,0 +1,21 @@
+// backend/models/HistoryCache.js
+// The Python scripts keep an incremental copy of forecast_lstm_27day (python/history_cache.py)
+// that only fetches rows newer than its last date. Every Node writer to that collection drops
+// the file after a write, so rows rewritten in place are reloaded on the next Python run.
+const fs = require("fs");
+const path = require("path");
+
+const HISTORY_CACHE_FILE =
+  process.env.HISTORY_CACHE_FILE ||
+  path.join(__dirname, "..", "python", "history_cache.npz");
+
+// ✅ Drop the Python history cache (missing file is fine)
+function invalidateHistoryCache() {
+  try {
+    fs.rmSync(HISTORY_CACHE_FILE, { force: true });
+  } catch (e) {
+    console.warn("⚠️ Could not drop the Python history cache:", e.message || e);
+  }
+}
+
+module.exports = { invalidateHistoryCache, HISTORY_CACHE_FILE };
@@ -2,6 +2,10 @@
 const { exec } = require("child_process");
 const path = require("path");
 const fs = require("fs");
+const axios = require("axios");
+
+// Optional warm Python forecast service (python/forecast_server.py), e.g. http://127.0.0.1:8765
+const FORECAST_SERVER_URL = process.env.FORECAST_SERVER_URL || "";
 
 // ✅ Get last NOAA date from local file
 function getLastNOAADate() {
@@ -21,8 +25,53 @@ function getLastNOAADate() {
   return parsedDate;
 }
 
+// ✅ Ask the warm forecast server for predictions (no Python/TensorFlow startup per run).
+// Returns null when no server is configured or it fails, so callers fall back to the script.
+async function fetchFromForecastServer() {
+  if (!FORECAST_SERVER_URL) return null;
+  try {
+    const started = Date.now();
+    const res = await axios.get(`${FORECAST_SERVER_URL.replace(/\/$/, "")}/forecast`, { timeout: 60000 });
+    const serverMs = res.headers["x-forecast-latency-ms"];
+    console.log(`⚡ Forecast server answered in ${Date.now() - started} ms (server ${serverMs || "?"} ms).`);
+    if (Array.isArray(res.data)) {
+      console.log(`✅ Forecast server returned ${res.data.length} predictions.`);
+      return res.data;
+    }
+    console.warn("⚠️ Forecast server returned unexpected payload, falling back to script.");
+  } catch (err) {
+    console.warn("⚠️ Forecast server unavailable, falling back to script:", err.message);
+  }
+  return null;
+}
+
+// ✅ Run Python LSTM (warm server if configured, else spawn script) and return predictions
+async function runLSTMModel() {
+  const predictions = await fetchFromForecastServer();
+  return predictions || runLSTMScript();
+}
+
+// ✅ Log the script's per-stage timing lines (python/instrumentation.py) so slow runs are traceable
+function logScriptMetrics(stderr) {
+  const events = [];
+  for (const line of (stderr || "").split("\n")) {
+    if (!line.startsWith('{"event"')) continue;
+    try {
+      events.push(JSON.parse(line));
+    } catch (e) {
+      // not a metrics line
+    }
+  }
+  const run = events.find(e => e.event === "run");
+  if (!run) return;
+  const stages = Object.entries(run.stages || {})
+    .map(([name, s]) => `${name}=${Number(s).toFixed(2)}s`)
+    .join(" ");
+  console.log(`⏱️ LSTM script ${run.status} in ${Number(run.seconds).toFixed(2)}s (peak RSS ${run.max_rss_mb} MB): ${stages}`);
+}
+
 // ✅ Run Python LSTM script and return predictions
-function runLSTMModel() {
+function runLSTMScript() {
   return new Promise((resolve, reject) => {
     const scriptPath = path.join(__dirname, "../python/predict_lstm.py");
 
@@ -31,6 +80,7 @@ function runLSTMModel() {
         console.error("❌ Error executing LSTM Python script:", stderr || err.message);
         return reject(err);
       }
+      logScriptMetrics(stderr);
 
       try {
         const predictions = JSON.parse(stdout.trim());
@@ -48,4 +98,4 @@ function runLSTMModel() {
   });
 }
 
-module.exports = { runLSTMModel, getLastNOAADate };
+module.exports = { runLSTMModel, runLSTMScript, fetchFromForecastServer, getLastNOAADate };
@@ -0,0 +1,228 @@
+# backend/python/affine_transform.py  -- scaler + residual scaler folded into scale/offset vectors
+# Both scalers are per-feature affine maps (MinMaxScaler: x_s = x * scale_ + min_), so the
+# inference chain
+#   base_s = scaler.transform(base); res_s = res_scaler.inverse_transform(pred)
+#   actual = scaler.inverse_transform(base_s + res_s)
+# collapses to one multiply-add per value:
+#   actual = base + pred * gain + bias      gain = 1 / (scale * res_scale), bias = -res_offset * gain
+# AffineScalers holds those vectors and applies them with broadcasting over any leading batch
+# axes -- no reshape(-1, 3) round trips, and in place when out= is given. The vectors are kept
+# in an npz sidecar (scalers_affine.npz) next to scaler.save, keyed by the sha256 of both .save
+# files; loading the pickles (the only step that imports scikit-learn) happens only when the
+# sidecar is missing or stale.
+#
+# Usage (from backend folder):
+#   python python/affine_transform.py --check     # compare with the sklearn scalers and time both
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+
+import numpy as np
+
+import atomic_io
+
+# ===================== Config =====================
+BASE_DIR = os.path.dirname(__file__)
+SCALER_FILE = os.path.join(BASE_DIR, "scaler.save")
+RES_SCALER_FILE = os.path.join(BASE_DIR, "residual_scaler.save")
+SIDECAR_NAME = "scalers_affine.npz"
+
+# ===================== Folding =====================
+def _affine(scaler):
+    """(scale, offset, clip range or None) with scaler.transform(x) == x * scale + offset."""
+    if not (hasattr(scaler, "min_") and hasattr(scaler, "scale_")):
+        raise TypeError(f"{type(scaler).__name__} is not a fitted MinMaxScaler")
+    clip = tuple(float(v) for v in scaler.feature_range) if getattr(scaler, "clip", False) else None
+    return np.asarray(scaler.scale_, np.float64), np.asarray(scaler.min_, np.float64), clip
+
+def _output(x, out):
+    if out is not None:
+        if out is not x:
+            out[...] = x
+        return out
+    x = np.asarray(x)
+    return np.array(x, dtype=np.result_type(x.dtype, np.float32))
+
+class AffineScalers:
+    """
+    The scaler and the residual scaler as per-feature vectors. Every method takes arrays of shape
+    (..., n_features) and writes into `out` when given (out may be the input itself).
+    """
+
+    def __init__(self, scale, offset, res_scale, res_offset, clip=None, res_clip=None):
+        self.scale = np.asarray(scale, np.float64)
+        self.offset = np.asarray(offset, np.float64)
+        self.res_scale = np.asarray(res_scale, np.float64)
+        self.res_offset = np.asarray(res_offset, np.float64)
+        self.clip = clip
+        self.res_clip = res_clip
+        self.inv_scale = 1.0 / self.scale
+        self.gain = self.inv_scale / self.res_scale  # residual-scaled prediction -> real units
+        self.bias = -self.res_offset * self.gain
+        self.scaled_bias = self.bias - self.offset * self.inv_scale
+
+    @classmethod
+    def from_scalers(cls, scaler, res_scaler):
+        scale, offset, clip = _affine(scaler)
+        res_scale, res_offset, res_clip = _affine(res_scaler)
+        return cls(scale, offset, res_scale, res_offset, clip, res_clip)
+
+    @property
+    def n_features(self):
+        return len(self.scale)
+
+    # ----- single transforms -----
+    def transform(self, x, out=None):
+        """scaler.transform"""
+        out = _output(x, out)
+        out *= self.scale
+        out += self.offset
+        if self.clip is not None:
+            np.clip(out, *self.clip, out=out)
+        return out
+
+    def inverse_transform(self, x_s, out=None):
+        """scaler.inverse_transform"""
+        out = _output(x_s, out)
+        out -= self.offset
+        out *= self.inv_scale
+        return out
+
+    def res_transform(self, r, out=None):
+        """res_scaler.transform"""
+        out = _output(r, out)
+        out *= self.res_scale
+        out += self.res_offset
+        if self.res_clip is not None:
+            np.clip(out, *self.res_clip, out=out)
+        return out
+
+    def res_inverse(self, r_s, out=None):
+        """res_scaler.inverse_transform"""
+        out = _output(r_s, out)
+        out -= self.res_offset
+        out /= self.res_scale
+        return out
+
+    # ----- fused forecast chain -----
+    def forecast(self, baseline, pred_res_scaled, out=None):
+        """Real-unit forecast from the real-unit baseline and the model's residual-scaled output."""
+        out = _output(pred_res_scaled, out)
+        out *= self.gain
+        out += self.bias
+        out += baseline
+        return out
+
+    def forecast_scaled(self, baseline_s, pred_res_scaled, out=None):
+        """As forecast(), for a baseline that is already scaled (hindcast windows)."""
+        out = _output(pred_res_scaled, out)
+        out *= self.gain
+        out += self.scaled_bias
+        out += baseline_s * self.inv_scale.astype(out.dtype)
+        return out
+
+    # ----- persistence -----
+    def save(self, path, stamp=""):
+        nan = np.full(2, np.nan)
+        atomic_io.atomic_write(path, lambda tmp: np.savez(
+            tmp, scale=self.scale, offset=self.offset, res_scale=self.res_scale, res_offset=self.res_offset,
+            clip=np.asarray(self.clip if self.clip is not None else nan, np.float64),
+            res_clip=np.asarray(self.res_clip if self.res_clip is not None else nan, np.float64),
+            stamp=np.asarray(stamp)), suffix=".tmp.npz")
+
+    @classmethod
+    def read(cls, path):
+        """(AffineScalers, stamp) from a sidecar."""
+        with np.load(path) as data:
+            clips = [None if np.isnan(data[k]).any() else tuple(float(v) for v in data[k])
+                     for k in ("clip", "res_clip")]
+            affine = cls(data["scale"], data["offset"], data["res_scale"], data["res_offset"], *clips)
+            return affine, str(data["stamp"])
+
+# ===================== Sidecar =====================
+def sidecar_path(scaler_path):
+    return os.path.join(os.path.dirname(scaler_path), SIDECAR_NAME)
+
+def scalers_stamp(scaler_path, res_path):
+    """sha256 over both pickles: the sidecar is only valid for exactly these files."""
+    h = hashlib.sha256()
+    for path in (scaler_path, res_path):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def write_sidecar(affine, scaler_path, res_path):
+    """Store `affine` next to the .save files it was folded from (call after dumping them)."""
+    affine.save(sidecar_path(scaler_path), scalers_stamp(scaler_path, res_path))
+
+def load(scaler_path=SCALER_FILE, res_path=RES_SCALER_FILE):
+    """AffineScalers for the two .save files; unpickles them (importing sklearn) only on a stale sidecar."""
+    stamp = scalers_stamp(scaler_path, res_path)
+    side = sidecar_path(scaler_path)
+    if os.path.exists(side):
+        try:
+            affine, saved = AffineScalers.read(side)
+            if saved == stamp:
+                return affine
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ unreadable {SIDECAR_NAME} ({e}); rebuilding", file=sys.stderr)
+    import joblib
+
+    affine = AffineScalers.from_scalers(joblib.load(scaler_path), joblib.load(res_path))
+    try:
+        affine.save(side, stamp)
+    except OSError as e:
+        print(f"⚠️ could not write {side}: {e}", file=sys.stderr)
+    return affine
+
+# ===================== Check =====================
+def check(n_samples=100, window=27, repeat=50):
+    """Max |diff| against the sklearn chain on random batches, and median ms of both."""
+    import joblib
+
+    scaler, res_scaler = joblib.load(SCALER_FILE), joblib.load(RES_SCALER_FILE)
+    affine = load()
+    rng = np.random.default_rng(0)
+    base = rng.uniform([70, 2, 0], [200, 40, 6], (window, 3)).astype(np.float32)
+    pred = rng.random((n_samples, window, 3), dtype=np.float32)
+
+    def sklearn_chain():
+        base_s = scaler.transform(base)
+        res_s = res_scaler.inverse_transform(pred.reshape(-1, 3)).reshape(pred.shape)
+        return scaler.inverse_transform((base_s + res_s).reshape(-1, 3)).reshape(pred.shape)
+
+    buf = np.empty_like(pred)
+
+    def timed(fn):
+        runs = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            runs.append(time.perf_counter() - t0)
+        return round(float(np.median(runs)) * 1000, 4)
+
+    ref = sklearn_chain()
+    return {
+        "samples": n_samples,
+        "max_abs_diff": float(np.abs(affine.forecast(base, pred) - ref).max()),
+        "max_abs_diff_scaled": float(np.abs(affine.forecast_scaled(affine.transform(base), pred) - ref).max()),
+        "max_abs_diff_transform": float(np.abs(affine.transform(base) - scaler.transform(base)).max()),
+        "sklearn_ms": timed(sklearn_chain),
+        "affine_ms": timed(lambda: affine.forecast(base, pred, out=buf)),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fused scaler / residual-scaler transforms")
+    parser.add_argument("--check", action="store_true", help="compare with the sklearn scalers and time both")
+    parser.add_argument("--samples", type=int, nargs="+", default=[1, 100])
+    args = parser.parse_args(argv)
+    if not args.check:
+        parser.print_help()
+        return
+    print(json.dumps([check(n) for n in args.samples]))
+
+if __name__ == "__main__":
+    main()
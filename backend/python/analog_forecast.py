@@ -0,0 +1,279 @@
+# backend/python/analog_forecast.py  -- nearest-neighbour ("analog") 27-day forecaster
+# Solar activity recurs with the ~27-day rotation, so the past windows that looked most like the
+# last 27 days are a forecast in themselves: find the k closest historical windows and average
+# what followed them. Each analog's continuation is shifted by the difference between the query
+# and analog window means (level adjustment), and weighted by inverse distance.
+# The index holds every 27-day window of the calendar-merged history that has a full 27-day
+# continuation and crosses no long gap (see calendar_merge.py), z-scored per feature with the
+# mean/std of the history it was built from, flattened to one float32 row per window together
+# with its squared norm. A query is one matrix-vector product
+#   |w - q|^2 = |w|^2 - 2 w.q + |q|^2
+# plus argpartition -- a few ms for decades of data, and 81 dimensions is past where KD/ball
+# trees beat a brute-force scan anyway. The index is saved to ANALOG_INDEX_FILE (.npz) and
+# extended in place with the windows that new days complete; it is rebuilt when stored rows
+# were revised, or with --rebuild (which also refreshes the normalization).
+#   ANALOG_INDEX_FILE   default backend/python/analog_index.npz
+#   ANALOG_K            neighbours averaged (default 10)
+#
+# Usage (from backend folder):
+#   python python/analog_forecast.py                 # forecast JSON, like predict_lstm.py
+#   python python/analog_forecast.py --rebuild --k 20
+#   python python/analog_forecast.py --bench --days 14600
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import timedelta
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import atomic_io
+import calendar_merge
+
+# ===================== Config =====================
+BASE_DIR = os.path.dirname(__file__)
+INDEX_FILE = os.getenv("ANALOG_INDEX_FILE", os.path.join(BASE_DIR, "analog_index.npz"))
+K = int(os.getenv("ANALOG_K", "10"))
+WINDOW = 27
+HORIZON = 27
+FEATURES = ["f107", "a_index", "kp_max"]
+
+# ===================== Index =====================
+class AnalogIndex:
+    """Normalized window matrix over a dense daily series; see the module header."""
+
+    def __init__(self, first_day, values, imputed, mean, std, window=WINDOW, horizon=HORIZON):
+        self.first_day = int(first_day)              # day number of values[0]
+        self.values = np.asarray(values, dtype=np.float32)
+        self.imputed = np.asarray(imputed, dtype=bool)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.std = np.asarray(std, dtype=np.float32)
+        self.window, self.horizon = int(window), int(horizon)
+        self.windows = np.empty((0, self.window * self.values.shape[1]), dtype=np.float32)
+        self.sq_norms = np.empty(0, dtype=np.float32)
+        self.starts = np.empty(0, dtype=np.int64)
+        self._add_windows(0)
+
+    @classmethod
+    def build(cls, first_day, values, imputed=None, window=WINDOW, horizon=HORIZON, fit_rows=None):
+        """
+        Index `values`; the normalization mean/std come from its first `fit_rows` rows (all by
+        default) -- backtests pass the rows before the first origin so no later data leaks in.
+        """
+        values = np.asarray(values, dtype=np.float32)
+        imputed = np.zeros(len(values), dtype=bool) if imputed is None else np.asarray(imputed, dtype=bool)
+        observed = values[:fit_rows][~imputed[:fit_rows]]
+        std = observed.std(axis=0)
+        return cls(first_day, values, imputed, observed.mean(axis=0), np.where(std > 0, std, 1.0), window, horizon)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def last_day(self):
+        return self.first_day + len(self.values) - 1
+
+    def normalize(self, values):
+        return (np.asarray(values, dtype=np.float32) - self.mean) / self.std
+
+    def _add_windows(self, from_row):
+        """Index the windows that start at or after the first start whose span reaches from_row."""
+        span = self.window + self.horizon
+        n_starts = len(self.values) - span + 1
+        first = max(from_row - span + 1, int(self.starts[-1]) + 1 if len(self.starts) else 0, 0)
+        if n_starts <= first:
+            return 0
+        clean = calendar_merge.clean_starts(self.imputed, span)
+        new = clean[clean >= first]
+        if len(new) == 0:
+            return 0
+        z = self.normalize(self.values[new[0] :])
+        views = sliding_window_view(z, self.window, axis=0)[new - new[0]]  # (n, features, window)
+        rows = np.ascontiguousarray(views.transpose(0, 2, 1)).reshape(len(new), -1)
+        self.windows = np.concatenate([self.windows, rows])
+        self.sq_norms = np.concatenate([self.sq_norms, np.einsum("ij,ij->i", rows, rows)])
+        self.starts = np.concatenate([self.starts, new.astype(np.int64)])
+        return len(new)
+
+    def extend(self, first_day, values, imputed=None):
+        """
+        Bring the index up to a dense series starting at day `first_day`. Returns the number of
+        windows added, or None when overlapping rows differ (the caller should rebuild).
+        """
+        values = np.asarray(values, dtype=np.float32)
+        imputed = np.zeros(len(values), dtype=bool) if imputed is None else np.asarray(imputed, dtype=bool)
+        offset = self.first_day - int(first_day)
+        overlap = len(self.values)
+        if offset < 0 or offset + overlap > len(values):
+            return None
+        if not np.allclose(values[offset : offset + overlap], self.values, equal_nan=True):
+            return None
+        if offset + overlap == len(values):
+            return 0
+        old_rows = len(self.values)
+        self.values = np.concatenate([self.values, values[offset + overlap :]])
+        self.imputed = np.concatenate([self.imputed, imputed[offset + overlap :]])
+        return self._add_windows(old_rows)
+
+    # ---- queries ----
+    def neighbours(self, queries, k=K, max_start=None):
+        """
+        (starts, distances) of the k nearest indexed windows to each query (n, window, features),
+        sorted by distance. max_start limits candidates per query (e.g. no look-ahead in backtests);
+        ValueError when a query is left without any candidate.
+        """
+        if len(self) == 0:
+            raise ValueError("the analog index holds no windows")
+        q = self.normalize(queries).reshape(len(queries), -1)
+        d2 = self.sq_norms[None, :] - 2.0 * (q @ self.windows.T) + np.einsum("ij,ij->i", q, q)[:, None]
+        if max_start is not None:
+            max_start = np.broadcast_to(max_start, (len(q),))
+            empty = np.flatnonzero(max_start < self.starts[0])
+            if empty.size:
+                raise ValueError(f"no indexed window starts at or before max_start {int(max_start[empty[0]])} "
+                                 f"(query {int(empty[0])}, {empty.size} without candidates)")
+            d2[self.starts[None, :] > max_start[:, None]] = np.inf
+        k = min(k, d2.shape[1])
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(d2, nearest, axis=1), axis=1)
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        dist = np.sqrt(np.maximum(np.take_along_axis(d2, nearest, axis=1), 0.0))
+        return self.starts[nearest], dist
+
+    def forecast(self, queries, k=K, max_start=None, adjust=True):
+        """Level-adjusted, inverse-distance-weighted continuations -> (n, horizon, features)."""
+        queries = np.asarray(queries, dtype=np.float32)
+        starts, dist = self.neighbours(queries, k, max_start)
+        w, h = self.window, self.horizon
+        analog = self.values[starts[..., None] + np.arange(w)]           # (n, k, window, features)
+        cont = self.values[starts[..., None] + w + np.arange(h)]         # (n, k, horizon, features)
+        if adjust:
+            cont = cont + (queries.mean(axis=1)[:, None, None, :] - analog.mean(axis=2)[:, :, None, :])
+        weights = np.where(np.isfinite(dist), 1.0 / (dist + 1e-6), 0.0)
+        weights /= weights.sum(axis=1, keepdims=True)
+        return np.einsum("nk,nkhf->nhf", weights, cont)
+
+    # ---- persistence ----
+    def save(self, path=INDEX_FILE):
+        """Temp file + rename (atomic_io), like the history cache."""
+        atomic_io.atomic_write(path, lambda tmp: np.savez(
+            tmp, first_day=self.first_day, values=self.values, imputed=self.imputed, mean=self.mean,
+            std=self.std, window=self.window, horizon=self.horizon, windows=self.windows,
+            sq_norms=self.sq_norms, starts=self.starts), suffix=".tmp.npz")
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        with np.load(path) as data:
+            index = cls.__new__(cls)
+            index.first_day = int(data["first_day"])
+            index.window, index.horizon = int(data["window"]), int(data["horizon"])
+            for name in ("values", "imputed", "mean", "std", "windows", "sq_norms", "starts"):
+                setattr(index, name, data[name])
+        return index
+
+def sync_index(first_day, values, imputed=None, path=INDEX_FILE, rebuild=False):
+    """Load the saved index, extend it to `values` (or rebuild it), save if it changed."""
+    index = None
+    if os.path.exists(path) and not rebuild:
+        try:
+            index = AnalogIndex.load(path)
+        except Exception as e:
+            print("⚠️ analog index unreadable, rebuilding:", e, file=sys.stderr)
+    added = index.extend(first_day, values, imputed) if index is not None else None
+    if added is None:
+        if index is not None:
+            print("ℹ️ history rows changed under the analog index; rebuilding", file=sys.stderr)
+        index = AnalogIndex.build(first_day, values, imputed)
+        added = len(index)
+    if added:
+        index.save(path)
+    print(f"ℹ️ analog index: {len(index)} windows ({added} new)", file=sys.stderr)
+    return index
+
+# ===================== Forecast =====================
+def history_series(history_df):
+    """Dense (first_day, values, imputed) from a history frame via the calendar merge."""
+    merged = calendar_merge.merge_daily([history_df], FEATURES)
+    if merged.frame.empty:
+        return 0, np.empty((0, len(FEATURES)), np.float32), np.zeros(0, bool)
+    first_day = int(calendar_merge.day_numbers(merged.frame["date"].values[:1])[0])
+    return first_day, merged.frame[FEATURES].values.astype(np.float32), merged.imputed
+
+def forecast_frame(index, all_df, start_date, k=K):
+    """JSON rows (same shape as predict_lstm) for the HORIZON days after the last WINDOW rows."""
+    query = all_df[FEATURES].values[-index.window :].astype(np.float32)
+    pred = index.forecast(query[None], k=k)[0]
+    return [{"date": (start_date + timedelta(days=i)).date().isoformat(),
+             "f107": float(rf), "a_index": float(ai), "kp_max": float(kp)}
+            for i, (rf, ai, kp) in enumerate(pred)]
+
+def run(k=K, rebuild=False):
+    import predict_lstm as pl
+
+    noaa_df = pl.parse_noaa_text(pl.fetch_noaa_text())
+    if noaa_df.empty:
+        print("❌ No NOAA 27-day data found; exiting.", file=sys.stderr)
+        return []
+    history_df = pl.load_history_from_mongo()
+    index = sync_index(*history_series(history_df), rebuild=rebuild)
+    all_df = pl.merge_history_and_noaa(history_df, noaa_df)
+    if len(index) == 0 or len(all_df) < index.window:
+        print(f"❗ Need at least {WINDOW + HORIZON} days of history.", file=sys.stderr)
+        return []
+    return forecast_frame(index, all_df, noaa_df["date"].max() + timedelta(days=1), k=k)
+
+# ===================== CLI =====================
+def bench(days, k, repeat):
+    """Build / incremental update / single and batched query timings on a synthetic history."""
+    from bench_pipeline import synthetic_history
+
+    dates, dense = synthetic_history(days)
+    dense = dense.astype(np.float32)
+    first_day = int(calendar_merge.day_numbers(dates[:1])[0])
+
+    def timed(fn):
+        times, out = [], None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            out = fn()
+            times.append(time.perf_counter() - t0)
+        return round(float(np.median(times)) * 1000, 3), out
+
+    build_ms, index = timed(lambda: AnalogIndex.build(first_day, dense[:-1]))
+    def update():
+        ix = AnalogIndex.build(first_day, dense[:-1])
+        t0 = time.perf_counter()
+        ix.extend(first_day, dense)
+        return time.perf_counter() - t0
+    update_ms = round(float(np.median([update() for _ in range(repeat)])) * 1000, 3)
+    index.extend(first_day, dense)
+    with_tmp = INDEX_FILE + ".bench.npz"
+    save_ms, _ = timed(lambda: index.save(with_tmp))
+    load_ms, _ = timed(lambda: AnalogIndex.load(with_tmp))
+    os.remove(with_tmp)
+    query = dense[-WINDOW:][None]
+    query_ms, _ = timed(lambda: index.forecast(query, k=k))
+    batch = sliding_window_view(dense[-1000:], WINDOW, axis=0).transpose(0, 2, 1)
+    batch_ms, _ = timed(lambda: index.forecast(batch, k=k))
+    return {"days": int(len(dense)), "windows": len(index), "k": k, "build_ms": build_ms,
+            "extend_1_day_ms": update_ms, "save_ms": save_ms, "load_ms": load_ms, "query_ms": query_ms,
+            f"batch_{len(batch)}_queries_ms": batch_ms}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analog (nearest-neighbour) 27-day forecast")
+    parser.add_argument("--k", type=int, default=K, help="neighbours averaged (env ANALOG_K)")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the index from scratch")
+    parser.add_argument("--bench", action="store_true", help="time build / update / query")
+    parser.add_argument("--days", type=int, default=40 * 365, help="synthetic history length for --bench")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        print(json.dumps(bench(args.days, args.k, args.repeat)))
+        return
+    print(json.dumps(run(k=args.k, rebuild=args.rebuild)))
+
+if __name__ == "__main__":
+    main()
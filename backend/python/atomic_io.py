@@ -0,0 +1,45 @@
+# backend/python/atomic_io.py  -- write-to-temp-then-rename for every file the scripts persist
+# Readers (other cron runs, the forecast server's threads) must never see a half-written file, so
+# each writer fills a temp file next to the target and os.replace()s it over the target. The temp
+# name carries the pid and thread id: two processes or two threads writing the same target each
+# get their own temp file, and the last rename wins.
+import os
+import json
+import shutil
+import threading
+
+def temp_path(path, suffix=".tmp"):
+    """Per-process, per-thread temp name next to `path` (suffix ".tmp.npz" for np.savez)."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}{suffix}"
+
+def atomic_write(path, writer, suffix=".tmp"):
+    """writer(tmp) creates the temp file, which then replaces `path`; the temp is removed on failure."""
+    tmp = temp_path(path, suffix)
+    try:
+        writer(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def write_text(path, text):
+    def writer(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+    atomic_write(path, writer)
+
+def write_bytes(path, data):
+    def writer(tmp):
+        with open(tmp, "wb") as f:
+            f.write(data)
+    atomic_write(path, writer)
+
+def write_json(path, obj, **dump_kwargs):
+    def writer(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(obj, f, **dump_kwargs)
+    atomic_write(path, writer)
+
+def copy_file(src, dst):
+    atomic_write(dst, lambda tmp: shutil.copyfile(src, tmp))
@@ -0,0 +1,355 @@
+# backend/python/backtest.py  -- walk-forward (rolling-origin) backtest of every forecaster
+# The history is cut into `--folds` consecutive test blocks of `--test-days` days at the end of
+# the series. For each fold the models are refit on the rows dated before the block and then
+# forecast 27 days from every `--origin-step`-th day inside it:
+#   lstm         residual encoder-decoder retrained on the fold's training rows (fresh scalers)
+#                through trainer.train, exactly as predict_lstm --mode train trains it
+#   linear       predict_linear least-squares trend refit before each origin (all origins in one
+#                batched solve; --linear-fit-window / --linear-harmonic as in predict_linear.py)
+#   persistence  the 27 days before the origin repeated (one solar rotation)
+#   analog       analog_forecast k nearest past windows, only those whose continuation ends
+#                before the origin, z-scored with the training rows only (--analog-k)
+#   noaa         the latest 27DO bulletin issued before the origin (forecast_27day_issues)
+# Folds run in a spawn-based process pool (TensorFlow is only imported in the workers) and the
+# report -- per-model / per-variable / per-lead-day MAE and RMSE plus wall-clock per fold and in
+# total -- is printed as JSON (and written to --json-out, e.g. for registry.py metrics).
+#
+# Usage (from backend folder):
+#   python python/backtest.py --folds 6 --test-days 90 --workers 6
+#   python python/backtest.py --from-file "python/27 day forecast.txt" --lstm-epochs 20 --out bt.csv
+#   python python/backtest.py --models persistence linear noaa --workers 1
+#   python python/backtest.py --json-out bt.json && python python/registry.py metrics VERSION bt.json
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import noaa_parser
+import mongo_connection
+from history_cache import load_history as load_cached_history
+from hindcast import origin_indices
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ===================== Config =====================
+HIST_COLLECTION = "forecast_lstm_27day"
+ISSUES_COLLECTION = "forecast_27day_issues"
+VARIABLES = ["f107", "a_index", "kp_max"]
+WINDOW = 27
+MODELS = ("lstm", "linear", "persistence", "noaa", "analog")
+MAX_ISSUE_LEAD = 64  # bulletin lead days kept on the dense issue grid
+
+# ===================== Data =====================
+def load_series_from_mongo():
+    df = load_cached_history(mongo_connection.get_mongo_collection(HIST_COLLECTION))
+    return df["date"].values.astype("datetime64[D]"), df[VARIABLES].values.astype("float32")
+
+def load_issues_from_mongo():
+    """(issue_date, target_date, values) of every archived bulletin row, or None if there are none."""
+    coll = mongo_connection.get_mongo_collection(ISSUES_COLLECTION)
+    projection = {"_id": 0, "issue_date": 1, "target_date": 1, **{c: 1 for c in VARIABLES}}
+    with mongo_connection.timed_query(f"{ISSUES_COLLECTION}.find"):
+        docs = list(coll.find({}, projection))
+    if not docs:
+        return None
+    df = pd.DataFrame(docs)
+    return (df["issue_date"].values.astype("datetime64[D]"), df["target_date"].values.astype("datetime64[D]"),
+            df[VARIABLES].values.astype("float32"))
+
+def load_from_file(path):
+    """Series (one row per date, latest bulletin wins) and issue rows from a NOAA archive file."""
+    result = noaa_parser.parse_noaa_file(path)
+    df = noaa_parser.to_frame(result)
+    df = df.drop_duplicates(subset="date", keep="last").sort_values("date")
+    series = (df["date"].values.astype("datetime64[D]"), df[VARIABLES].values.astype("float32"))
+    has_issue = ~np.isnat(result.issued)
+    issues = None
+    if has_issue.any():
+        values = np.column_stack([result.f107, result.a_index, result.kp_max]).astype("float32")
+        issues = (result.issued[has_issue].astype("datetime64[D]"), result.dates[has_issue], values[has_issue])
+    return series, issues
+
+# ===================== Folds =====================
+def make_folds(dates, n_folds, test_days, min_train_days, window=WINDOW):
+    """
+    [(fold, cutoff, test_end)] -- test origins are cutoff <= origin < test_end. The last block
+    ends where a full 27-day forecast can still be verified against the series.
+    """
+    last_origin = dates[-1] - np.timedelta64(window - 1, "D")
+    folds = []
+    for k in range(n_folds):
+        test_end = last_origin + np.timedelta64(1 - (n_folds - 1 - k) * test_days, "D")
+        cutoff = test_end - np.timedelta64(test_days, "D")
+        if (cutoff - dates[0]).astype("int64") < min_train_days:
+            print(f"⚠️ fold {k} skipped: fewer than {min_train_days} training days before {cutoff}",
+                  file=sys.stderr)
+            continue
+        folds.append((k, cutoff, test_end))
+    return folds
+
+def windows_before(values, idx, window=WINDOW):
+    """(n, window, 3) gather of the `window` rows preceding each index in `idx`."""
+    views = sliding_window_view(values, window, axis=0).transpose(0, 2, 1)
+    return views[idx - window]
+
+def observed_at(dates, values, origins, window=WINDOW):
+    """(n, window, 3) observations for origin .. origin+window-1, NaN where a date is missing."""
+    targets = origins[:, None] + np.arange(window).astype("timedelta64[D]")[None, :]
+    pos = np.minimum(np.searchsorted(dates, targets), len(dates) - 1)
+    present = dates[pos] == targets
+    return np.where(present[..., None], values[pos], np.nan)
+
+def issue_grid(issues):
+    """Dense (n_issues, MAX_ISSUE_LEAD, 3) grid of bulletin values indexed by target - issue."""
+    issue_dates, target_dates, values = issues
+    unique_issues, which = np.unique(issue_dates, return_inverse=True)
+    grid = np.full((unique_issues.size, MAX_ISSUE_LEAD, len(VARIABLES)), np.nan, dtype="float32")
+    lead = (target_dates - issue_dates).astype("int64")
+    keep = (lead >= 0) & (lead < MAX_ISSUE_LEAD)
+    grid[which[keep], lead[keep]] = values[keep]
+    return unique_issues, grid
+
+# ===================== Models =====================
+def forecast_persistence(values, idx, window=WINDOW):
+    return windows_before(values, idx, window).astype("float64")
+
+def forecast_noaa(issues, origins, window=WINDOW):
+    """Latest bulletin issued strictly before each origin; NaN where it does not cover a lead day."""
+    unique_issues, grid = issue_grid(issues)
+    out = np.full((origins.size, window, len(VARIABLES)), np.nan)
+    which = np.searchsorted(unique_issues, origins, side="left") - 1
+    has = which >= 0
+    offset = (origins[has] - unique_issues[which[has]]).astype("int64")[:, None] + np.arange(window)[None, :]
+    inside = offset < MAX_ISSUE_LEAD
+    rows = np.broadcast_to(which[has][:, None], offset.shape)
+    out[has] = np.where(inside[..., None], grid[rows, np.minimum(offset, MAX_ISSUE_LEAD - 1)], np.nan)
+    return out
+
+def forecast_linear_model(values, idx, fit_window, harmonic, window=WINDOW):
+    import predict_linear
+
+    # unrounded: the JSON output rounds to integers, the error metrics should not
+    return predict_linear.forecast_origins(values, idx, days=window, fit_window=fit_window, harmonic=harmonic)
+
+def forecast_analog(values, idx, k, train_rows, window=WINDOW):
+    """
+    Analog forecasts from every origin; normalized with the `train_rows` rows before the fold's
+    first origin. Origins with no complete analog before them stay NaN.
+    """
+    from analog_forecast import AnalogIndex
+
+    out = np.full((len(idx), window, values.shape[1]), np.nan)
+    index = AnalogIndex.build(0, values, window=window, horizon=window, fit_rows=train_rows)
+    # an analog is usable once its whole continuation lies before the origin
+    max_start = idx - 2 * window
+    ok = (max_start >= index.starts[0]) if len(index) else np.zeros(len(idx), bool)
+    if ok.any():
+        out[ok] = index.forecast(windows_before(values, idx[ok], window), k=k, max_start=max_start[ok])
+    return out
+
+def forecast_lstm(dates, values, idx, cutoff, epochs, batch_size, seed, window=WINDOW):
+    """
+    Retrain the residual model on the rows before `cutoff` the way production does -- dense
+    calendar, windows across long gaps left out, trainer.train's tf.data pipeline and the
+    TRAIN_* determinism settings -- then forecast from every origin in one batch.
+    """
+    import predict_lstm as pl
+    import trainer
+    import calendar_merge
+    from hindcast import predict_windows
+    from affine_transform import AffineScalers
+
+    # thread pools are capped by init_worker; only seeds / determinism are (re)applied per fold
+    seed = trainer.configure(seed, None, trainer.DETERMINISTIC)
+    before = dates < cutoff
+    merged = calendar_merge.merge_daily(
+        [pd.DataFrame({"date": dates[before], **dict(zip(VARIABLES, values[before].T))})], VARIABLES)
+    train = merged.frame[VARIABLES].values.astype("float32")
+    scaler, res_scaler = pl.fit_scalers(train, window)
+    affine = AffineScalers.from_scalers(scaler, res_scaler)
+    model = pl.build_encoder_decoder(window, len(VARIABLES) + 1, len(VARIABLES), latent=128)
+    model, _ = trainer.train(model, affine.transform(train), res_scaler, window, epochs=epochs,
+                             batch_size=batch_size, seed=seed, deterministic=trainer.DETERMINISTIC,
+                             valid_starts=pl.usable_starts(merged.imputed, len(train), window), verbose=0)
+    values_s = affine.transform(values)
+    return predict_windows(model, affine, windows_before(values_s, idx, window)).astype("float64")
+
+# ===================== Worker =====================
+def init_worker(threads):
+    """Cap the BLAS / TensorFlow thread pools so `workers * threads` matches the machine."""
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+def error_sums(forecast, observed):
+    """Per (lead, variable) sums of |e|, e^2 and counts, ignoring NaN forecasts/observations."""
+    err = forecast - observed
+    ok = ~np.isnan(err)
+    err = np.where(ok, err, 0.0)
+    return {"abs": np.abs(err).sum(axis=0), "sq": (err ** 2).sum(axis=0), "n": ok.sum(axis=0)}
+
+def run_fold(fold, cutoff, test_end, dates, values, issues, models, opts):
+    t0 = time.perf_counter()
+    origins = np.arange(cutoff, test_end, np.timedelta64(opts["origin_step"], "D"))
+    idx = origin_indices(dates, origins, WINDOW)
+    origins, idx = origins[idx >= 0], idx[idx >= 0]
+    observed = observed_at(dates, values, origins)
+
+    report = {"fold": fold, "train_end": str(cutoff - np.timedelta64(1, "D")),
+              "test_start": str(cutoff), "test_end": str(test_end - np.timedelta64(1, "D")),
+              "train_rows": int((dates < cutoff).sum()), "n_origins": int(idx.size),
+              "model_seconds": {}, "errors": {}}
+    for name in models:
+        if idx.size == 0:
+            break
+        if name == "noaa" and issues is None:
+            continue
+        t = time.perf_counter()
+        if name == "persistence":
+            forecast = forecast_persistence(values, idx)
+        elif name == "noaa":
+            forecast = forecast_noaa(issues, origins)
+        elif name == "analog":
+            forecast = forecast_analog(values, idx, opts["analog_k"], int((dates < cutoff).sum()))
+        elif name == "linear":
+            forecast = forecast_linear_model(values, idx, opts["linear_fit_window"], opts["linear_harmonic"])
+        else:
+            forecast = forecast_lstm(dates, values, idx, cutoff, opts["lstm_epochs"],
+                                     opts["lstm_batch_size"], opts["seed"] + fold)
+        report["model_seconds"][name] = round(time.perf_counter() - t, 3)
+        report["errors"][name] = error_sums(forecast, observed)
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    return report
+
+# ===================== Report =====================
+def summarize(fold_reports, models):
+    """Sum fold errors into per-lead MAE/RMSE; returns (metrics, summary, tidy rows)."""
+    metrics, summary, rows = {}, {}, []
+    for name in models:
+        parts = [r["errors"][name] for r in fold_reports if name in r["errors"]]
+        if not parts:
+            continue
+        abs_sum = sum(p["abs"] for p in parts)
+        sq_sum = sum(p["sq"] for p in parts)
+        n = sum(p["n"] for p in parts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mae = abs_sum / n
+            rmse = np.sqrt(sq_sum / n)
+            overall_mae = abs_sum.sum(axis=0) / n.sum(axis=0)
+            overall_rmse = np.sqrt(sq_sum.sum(axis=0) / n.sum(axis=0))
+        metrics[name], summary[name] = {}, {}
+        for j, var in enumerate(VARIABLES):
+            metrics[name][var] = {"mae": _round_list(mae[:, j]), "rmse": _round_list(rmse[:, j])}
+            summary[name][var] = {"mae": _round(overall_mae[j]), "rmse": _round(overall_rmse[j]),
+                                  "n": int(n[:, j].sum())}
+            for lead in range(mae.shape[0]):
+                rows.append({"model": name, "variable": var, "lead_day": lead + 1, "mae": mae[lead, j],
+                             "rmse": rmse[lead, j], "n": int(n[lead, j])})
+    return metrics, summary, rows
+
+def _round(x):
+    return None if np.isnan(x) else round(float(x), 4)
+
+def _round_list(a):
+    return [_round(x) for x in a]
+
+def fold_mae(report):
+    out = {}
+    for name, e in report["errors"].items():
+        n = e["n"].sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[name] = {var: _round(v) for var, v in zip(VARIABLES, e["abs"].sum(axis=0) / n)}
+    return out
+
+# ===================== Main =====================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the 27-day forecasters")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--test-days", type=int, default=90, help="days of forecast origins per fold")
+    parser.add_argument("--origin-step", type=int, default=7, help="days between origins inside a fold")
+    parser.add_argument("--min-train-days", type=int, default=365)
+    parser.add_argument("--lstm-epochs", type=int, default=200)
+    parser.add_argument("--lstm-batch-size", type=int, default=32)
+    parser.add_argument("--linear-fit-window", type=int, default=0, help="trend fit window in days (0 = all)")
+    parser.add_argument("--linear-harmonic", action="store_true", help="27-day harmonic in the trend model")
+    parser.add_argument("--analog-k", type=int, default=10, help="neighbours for the analog model")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="BLAS/TF threads per worker (default: cores / workers)")
+    parser.add_argument("--from-file", help="NOAA archive text file instead of Mongo")
+    parser.add_argument("--out", help="also write per-lead metrics as CSV")
+    parser.add_argument("--json-out", help="also write the JSON report here (input of registry.py metrics)")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    if args.from_file:
+        (dates, values), issues = load_from_file(args.from_file)
+    else:
+        dates, values = load_series_from_mongo()
+        issues = None
+        if "noaa" in args.models:
+            try:
+                issues = load_issues_from_mongo()
+            except Exception as e:
+                print(f"⚠️ NOAA issue archive unavailable: {e}", file=sys.stderr)
+        mongo_connection.close_client()
+    if "noaa" in args.models and issues is None:
+        print("⚠️ no archived bulletins (run ingest_archive.py); skipping the noaa baseline", file=sys.stderr)
+    if len(dates) < 2 * WINDOW:
+        print("❌ Not enough history to backtest.", file=sys.stderr)
+        sys.exit(1)
+
+    folds = make_folds(dates, args.folds, args.test_days, args.min_train_days)
+    if not folds:
+        print("❌ No fold has enough training data.", file=sys.stderr)
+        sys.exit(1)
+    workers = max(1, min(args.workers, len(folds)))
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    opts = {"origin_step": args.origin_step, "lstm_epochs": args.lstm_epochs,
+            "lstm_batch_size": args.lstm_batch_size, "seed": args.seed,
+            "linear_fit_window": args.linear_fit_window, "linear_harmonic": args.linear_harmonic,
+            "analog_k": args.analog_k}
+
+    reports = []
+    # spawn: forked TensorFlow / pymongo state is not safe to reuse in children
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=init_worker,
+                             initargs=(threads,)) as pool:
+        futures = [pool.submit(run_fold, k, cutoff, end, dates, values, issues, args.models, opts)
+                   for k, cutoff, end in folds]
+        for fut in as_completed(futures):
+            r = fut.result()
+            print(f"ℹ️ fold {r['fold']} ({r['test_start']}..{r['test_end']}, {r['n_origins']} origins) "
+                  f"in {r['seconds']:.1f}s", file=sys.stderr)
+            reports.append(r)
+    reports.sort(key=lambda r: r["fold"])
+    total = time.perf_counter() - t0
+
+    metrics, summary, rows = summarize(reports, args.models)
+    out = {
+        "series": {"start": str(dates[0]), "end": str(dates[-1]), "rows": int(len(dates))},
+        "workers": workers,
+        "threads_per_worker": threads,
+        "total_seconds": round(total, 3),
+        "folds": [{k: v for k, v in r.items() if k != "errors"} | {"mae": fold_mae(r)} for r in reports],
+        "summary": summary,
+        "per_lead": metrics,
+    }
+    if args.out:
+        pd.DataFrame(rows).to_csv(args.out, index=False)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(out, f)
+    print(f"✅ backtest: {len(reports)} fold(s) on {workers} worker(s) in {total:.1f}s", file=sys.stderr)
+    print(json.dumps(out))
+
+if __name__ == "__main__":
+    main()
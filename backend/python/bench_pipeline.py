@@ -0,0 +1,247 @@
+# backend/python/bench_pipeline.py  -- per-stage benchmark of predict_lstm.py / predict_linear.py
+# Runs every stage of a forecast on synthetic histories (default 1k / 10k / 100k days) served
+# from mongomock, so results do not depend on the network or a live Mongo:
+#   lstm:   parse, mongo_load (cold / warm history cache), merge, scale, windows, model_load,
+#           predict, forecast, json
+#   linear: parse, mongo_load, merge, forecast, json
+# Each stage is run --repeat times; min / median / max seconds are reported together with the
+# library versions and git commit, as JSON you can keep per release and diff with --compare.
+# mongomock is a dev dependency: pip install -r python/requirements-dev.txt
+#
+# Usage (from backend folder):
+#   python python/bench_pipeline.py --out bench-$(git rev-parse --short HEAD).json
+#   python python/bench_pipeline.py --sizes 1000 10000 --repeat 5 --pipelines lstm
+#   python python/bench_pipeline.py --compare bench-old.json bench-new.json
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# ===================== Config =====================
+SIZES = (1_000, 10_000, 100_000)
+REPEAT = 3
+SEED = 1234
+END_DATE = np.datetime64("2025-01-01", "D")
+HIST_COLLECTION = "forecast_lstm_27day"
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+# ===================== Synthetic data =====================
+def synthetic_history(n_days, seed=SEED):
+    """
+    n_days of plausible daily values ending the day before END_DATE: an 11-year cycle plus a
+    27-day rotation on F10.7, heavy-tailed A index and a Kp that tracks it.
+    """
+    rng = np.random.default_rng(seed)
+    dates = END_DATE - np.arange(n_days, 0, -1).astype("timedelta64[D]")
+    t = np.arange(n_days, dtype="float64")
+    f107 = 110 + 60 * np.sin(2 * np.pi * t / 4018) + 12 * np.sin(2 * np.pi * t / 27) + rng.normal(0, 5, n_days)
+    a_index = np.clip(rng.lognormal(2.0, 0.6, n_days), 2, 200)
+    kp_max = np.clip(np.round(np.log2(a_index + 1) - 0.5), 0, 9)
+    values = np.column_stack([np.round(f107), np.round(a_index), kp_max]).astype("float64")
+    return dates, values
+
+def history_docs(dates, values):
+    ts = dates.astype("datetime64[ms]").tolist()
+    return [{"date": d, "f107": float(f), "a_index": float(a), "kp_max": float(k)}
+            for d, (f, a, k) in zip(ts, values)]
+
+def bulletin_text(start, rows, issued=None):
+    """A 27DO-formatted bulletin with `rows` days starting at `start` (datetime64[D])."""
+    issued = issued if issued is not None else start
+    y, m, d = str(issued).split("-")
+    lines = [":Product: 27-day Space Weather Outlook Table 27DO.txt",
+             f":Issued: {y} {MONTH_NAMES[int(m) - 1]} {int(d):02d} 0000 UTC",
+             "#   UTC      Radio Flux   Planetary   Largest",
+             "#  Date       10.7 cm      A Index    Kp Index"]
+    rng = np.random.default_rng(SEED)
+    for i in range(rows):
+        day = (start + np.timedelta64(i, "D")).astype(datetime)
+        lines.append(f"{day.year} {MONTH_NAMES[day.month - 1]} {day.day:02d}"
+                     f"     {int(rng.integers(70, 200)):3d}          {int(rng.integers(4, 30)):3d}"
+                     f"          {int(rng.integers(1, 6))}")
+    return "\n".join(lines) + "\n"
+
+def mongomock_collection(docs):
+    try:
+        import mongomock
+    except ImportError:
+        print("❌ bench_pipeline needs mongomock as the local Mongo stand-in: "
+              "pip install -r python/requirements-dev.txt", file=sys.stderr)
+        sys.exit(1)
+    coll = mongomock.MongoClient()["noaa_database"][HIST_COLLECTION]
+    coll.create_index("date")
+    coll.insert_many(docs)
+    return coll
+
+# ===================== Timing =====================
+def time_stage(fn, repeat, setup=None):
+    """Run fn() `repeat` times (setup() before each, untimed); returns (stats, last result)."""
+    times, result = [], None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    arr = np.array(times)
+    return {"min_s": round(float(arr.min()), 6), "median_s": round(float(np.median(arr)), 6),
+            "max_s": round(float(arr.max()), 6), "runs": repeat}, result
+
+# ===================== Pipelines =====================
+def load_artifacts(pl, values):
+    """Saved model + folded scalers if present, else an untrained model and scalers fitted on `values`."""
+    import affine_transform
+
+    if pl.artifacts_exist():
+        return pl.load_trained_model(), affine_transform.load(pl.SCALER_FILE, pl.RES_SCALER_FILE), "saved"
+    scaler, res_scaler = pl.fit_scalers(values, pl.PRED_DAYS)
+    model = pl.build_encoder_decoder(pl.PRED_DAYS, 4, 3, latent=128)
+    return model, affine_transform.AffineScalers.from_scalers(scaler, res_scaler), "synthetic"
+
+def bench_lstm(coll, noaa_text, cache_dir, repeat):
+    import predict_lstm as pl
+    import history_cache
+    from windowing import build_inputs, build_xy
+
+    stages = {}
+    cache_path = os.path.join(cache_dir, "history_cache.npz")
+    stages["parse"], noaa_df = time_stage(lambda: pl.parse_noaa_text(noaa_text), repeat)
+    stages["mongo_load_cold"], history = time_stage(
+        lambda: history_cache.load_history(coll, cache_path), repeat,
+        setup=lambda: history_cache.invalidate_cache(cache_path))
+    stages["mongo_load_warm"], history = time_stage(lambda: history_cache.load_history(coll, cache_path), repeat)
+    stages["merge"], merged = time_stage(lambda: pl.merge_history_and_noaa(history, noaa_df), repeat)
+    values = merged[["f107", "a_index", "kp_max"]].values.astype("float32")
+
+    stages["model_load"], artifacts = time_stage(lambda: load_artifacts(pl, values), repeat)
+    model, affine, source = artifacts
+    stages["scale"], values_s = time_stage(lambda: affine.transform(values), repeat)
+    stages["windows_train"], _ = time_stage(lambda: build_xy(values_s, pl.PRED_DAYS), repeat)
+    X = build_inputs(values_s[-pl.PRED_DAYS:][None])
+    stages["windows_infer"], _ = time_stage(lambda: build_inputs(values_s[-pl.PRED_DAYS:][None]), repeat)
+    model.predict(X, verbose=0)  # first call traces the graph; time steady-state calls
+    stages["predict"], _ = time_stage(lambda: model.predict(X, verbose=0), repeat)
+    start = merged["date"].max() + pd.Timedelta(days=1)
+    stages["forecast"], results = time_stage(
+        lambda: pl.forecast_from_values(model, affine, values, start), repeat)
+    stages["json"], _ = time_stage(lambda: json.dumps(results), repeat)
+    return stages, {"artifacts": source, "rows": int(len(merged))}
+
+def bench_linear(coll, noaa_text, cache_dir, repeat):
+    import predict_linear
+    import history_cache
+
+    stages = {}
+    cache_path = os.path.join(cache_dir, "history_cache_linear.npz")
+    stages["parse"], latest = time_stage(lambda: predict_linear.parse_noaa(noaa_text), repeat)
+    # same as predict_linear.get_historical, against the stand-in collection
+    load = lambda: history_cache.load_history(coll, cache_path).rename(
+        columns={"f107": "radio_flux", "kp_max": "kp_index"})
+    stages["mongo_load_cold"], _ = time_stage(load, repeat, setup=lambda: history_cache.invalidate_cache(cache_path))
+    stages["mongo_load_warm"], historical = time_stage(load, repeat)
+    stages["merge"], merged = time_stage(lambda: predict_linear.merge_data(historical.copy(), latest.copy()), repeat)
+    stages["forecast"], results = time_stage(lambda: predict_linear.forecast_linear(merged, latest, days=27), repeat)
+    stages["json"], _ = time_stage(lambda: json.dumps(results), repeat)
+    return stages, {"rows": int(len(merged))}
+
+PIPELINES = {"lstm": bench_lstm, "linear": bench_linear}
+
+# ===================== Report =====================
+def environment():
+    def version(mod):
+        try:
+            return __import__(mod).__version__
+        except Exception:
+            return None
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit,
+        "numpy": version("numpy"),
+        "pandas": version("pandas"),
+        "sklearn": version("sklearn"),
+        "tensorflow": version("tensorflow"),
+        "mongomock": version("mongomock"),
+    }
+
+def compare(old_path, new_path):
+    """Per-stage median ratio new/old (>1 means slower)."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    rows = []
+    for key, run in new["runs"].items():
+        base = old["runs"].get(key)
+        if not base:
+            continue
+        for stage, stats in run["stages"].items():
+            before = base["stages"].get(stage)
+            if not before:
+                continue
+            ratio = stats["median_s"] / before["median_s"] if before["median_s"] else None
+            rows.append({"run": key, "stage": stage, "old_median_s": before["median_s"],
+                         "new_median_s": stats["median_s"], "ratio": round(ratio, 3) if ratio else None})
+    return rows
+
+# ===================== Main =====================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each forecast pipeline stage on synthetic histories")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="history lengths in days")
+    parser.add_argument("--pipelines", nargs="+", choices=sorted(PIPELINES), default=sorted(PIPELINES))
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two saved reports")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        print(json.dumps(compare(*args.compare), indent=2))
+        return
+
+    report = {"created": datetime.utcnow().isoformat(timespec="seconds") + "Z", "seed": SEED,
+              "repeat": args.repeat, "environment": environment(), "runs": {}}
+    cache_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    # history caches go to a scratch dir so the real history_cache.npz is left alone
+    try:
+        for n_days in args.sizes:
+            dates, values = synthetic_history(n_days)
+            t0 = time.perf_counter()
+            coll = mongomock_collection(history_docs(dates, values))
+            seed_s = time.perf_counter() - t0
+            noaa_text = bulletin_text(END_DATE, 27)
+            for name in args.pipelines:
+                stages, info = PIPELINES[name](coll, noaa_text, cache_dir, args.repeat)
+                key = f"{name}/{n_days}"
+                report["runs"][key] = {"pipeline": name, "days": n_days, "seed_collection_s": round(seed_s, 4),
+                                       **info, "stages": stages}
+                total = sum(s["median_s"] for s in stages.values())
+                print(f"ℹ️ {key}: {total:.3f}s (sum of stage medians)", file=sys.stderr)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload)
+        print(f"✅ wrote {args.out}", file=sys.stderr)
+    else:
+        print(payload)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# backend/python/calendar_merge.py  -- merge daily sources onto a dense calendar grid
+# Every date becomes an integer day number (days since 1970-01-01), and day - first_day is its
+# row in a dense daily grid. Merging sorted sources is then one placement per row (O(N), no
+# concat + sort), and a missing calendar day is simply a grid row nobody wrote. Sources are
+# given in priority order: on a date present in several, the first source's row wins (history
+# over the NOAA outlook, as before). Missing days and missing fields are filled by linear
+# interpolation in time (np.interp over day numbers), holding the edge values outside the data.
+# The result carries the imputed-day mask and a gap report, and clean_starts() drops training
+# windows that would span a gap longer than FORECAST_MAX_GAP_DAYS.
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+MAX_GAP_DAYS = int(os.getenv("FORECAST_MAX_GAP_DAYS", "3"))  # longer runs of imputed days corrupt a window
+REPORT_GAPS = 20  # gaps listed individually in the report (longest first)
+
+class CalendarMerge(NamedTuple):
+    frame: pd.DataFrame     # date + columns (+ "imputed"), one row per calendar day
+    imputed: np.ndarray     # bool per row: no source had this day
+    report: dict            # see gap_report()
+
+def day_numbers(dates):
+    """datetime-like array -> int64 days since 1970-01-01."""
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+def _sorted_unique(days, values):
+    """Rows ordered by day with the first row per day kept; sorted input costs one pass."""
+    step = np.diff(days)
+    if (step < 0).any():
+        order = np.argsort(days, kind="stable")
+        days, values = days[order], values[order]
+        step = np.diff(days)
+    if step.all():
+        return days, values
+    keep = np.concatenate(([True], step != 0))
+    return days[keep], values[keep]
+
+def gap_runs(mask):
+    """(starts, lengths) of the runs of True in a bool array."""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return edges[::2], edges[1::2] - edges[::2]
+
+def gap_report(first_day, imputed, filled_values):
+    starts, lengths = gap_runs(imputed)
+    order = np.argsort(-lengths, kind="stable")[:REPORT_GAPS]
+    day = lambda i: str(np.datetime64(int(first_day + i), "D"))
+    return {
+        "start": day(0) if len(imputed) else None,
+        "end": day(len(imputed) - 1) if len(imputed) else None,
+        "days": int(len(imputed)),
+        "imputed_days": int(imputed.sum()),
+        "filled_values": int(filled_values),  # missing fields on days that were present
+        "gaps": int(len(starts)),
+        "longest_gap": int(lengths.max()) if len(lengths) else 0,
+        "long_gaps": int((lengths > MAX_GAP_DAYS).sum()),
+        "largest": [{"start": day(s), "end": day(s + n - 1), "days": int(n)}
+                    for s, n in zip(starts[order], lengths[order])],
+    }
+
+def merge_daily(sources, columns):
+    """
+    Merge DataFrames with a "date" column (priority order, each ideally sorted) onto one dense
+    daily grid and fill every gap. Returns CalendarMerge(frame, imputed, report).
+    """
+    prepared = []
+    for df in sources:
+        if df is None or df.empty:
+            continue
+        days = day_numbers(df["date"].values)
+        values = df[columns].to_numpy(dtype="float64")
+        prepared.append(_sorted_unique(days, values))
+    if not prepared:
+        empty = pd.DataFrame(columns=["date", *columns, "imputed"])
+        return CalendarMerge(empty, np.zeros(0, dtype=bool), gap_report(0, np.zeros(0, dtype=bool), 0))
+
+    first_day = min(days[0] for days, _ in prepared)
+    last_day = max(days[-1] for days, _ in prepared)
+    n = int(last_day - first_day + 1)
+    grid = np.full((n, len(columns)), np.nan)
+    present = np.zeros(n, dtype=bool)
+    # lowest priority first, so higher-priority rows overwrite on shared days
+    for days, values in reversed(prepared):
+        rows = days - first_day
+        grid[rows] = values
+        present[rows] = True
+
+    missing = np.isnan(grid)
+    filled_values = int(missing[present].sum())
+    for j in np.flatnonzero(missing.any(axis=0)):
+        gaps = np.flatnonzero(missing[:, j])
+        known = np.flatnonzero(~missing[:, j])
+        if known.size:
+            grid[gaps, j] = np.interp(gaps, known, grid[known, j])
+
+    imputed = ~present
+    frame = pd.DataFrame(grid, columns=columns)
+    frame.insert(0, "date", (first_day + np.arange(n)).astype("datetime64[D]").astype("datetime64[ns]"))
+    frame["imputed"] = imputed
+    return CalendarMerge(frame, imputed, gap_report(first_day, imputed, filled_values))
+
+def clean_starts(imputed, span, max_gap=MAX_GAP_DAYS):
+    """
+    Start indices i whose rows [i, i + span) touch no gap longer than max_gap days. Short gaps
+    are left to interpolation; a window across a long one would learn from made-up data.
+    """
+    n_starts = len(imputed) - span + 1
+    if n_starts <= 0:
+        return np.zeros(0, dtype=np.int64)
+    long_gap = np.zeros(len(imputed), dtype=bool)
+    for s, length in zip(*gap_runs(np.asarray(imputed, dtype=bool))):
+        if length > max_gap:
+            long_gap[s : s + length] = True
+    counts = np.concatenate(([0], np.cumsum(long_gap)))
+    return np.flatnonzero(counts[span : span + n_starts] - counts[:n_starts] == 0)
@@ -4,15 +4,17 @@
 #   python .\python\compare_predictions.py
 
 import json
-import requests
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 
+import noaa_parser
+import noaa_fetch
+
 BASE = Path(__file__).resolve().parent
 PRED_FILE = BASE / "predictions.json"
-NOAA_URL = "https://services.swpc.noaa.gov/text/27-day-outlook.txt"
+NOAA_URL = noaa_fetch.NOAA_URL
 
 def load_preds(path: Path) -> pd.DataFrame:
     if not path.exists():
@@ -26,28 +28,16 @@ def load_preds(path: Path) -> pd.DataFrame:
     return df.sort_values('date').reset_index(drop=True)
 
 def fetch_noaa_df() -> pd.DataFrame:
-    r = requests.get(NOAA_URL, timeout=20)
-    r.raise_for_status()
-    text = r.text
-    rows = []
-    for line in text.splitlines():
-        line = line.strip()
-        if not line or line.startswith(":") or line.startswith("#"):
-            continue
-        parts = line.split()
-        if len(parts) >= 6:
-            try:
-                dt = pd.to_datetime(f"{parts[0]} {parts[1]} {parts[2]}", dayfirst=False)
-                f107 = float(parts[3])
-                a_index = float(parts[4])
-                kp_max = float(parts[5])
-                rows.append({"date": dt.date().isoformat(), "f107": f107, "a_index": a_index, "kp_max": kp_max})
-            except Exception:
-                continue
-    df = pd.DataFrame(rows)
+    bulletin = noaa_fetch.fetch_bulletin()
+    if not bulletin["text"]:
+        raise RuntimeError("NOAA outlook unavailable and no local snapshot.")
+    text = bulletin["text"]
+    result = noaa_parser.parse_noaa_text(text)
+    if result.malformed:
+        print(f"⚠️ Skipped {result.malformed} malformed NOAA line(s), e.g. {result.malformed_lines[:1]}")
+    df = noaa_parser.to_frame(result)
     if df.empty:
         raise RuntimeError("No NOAA rows parsed.")
-    df['date'] = pd.to_datetime(df['date'])
     return df.sort_values('date').reset_index(drop=True)
 
 def compute_metrics(y_true: np.ndarray, y_pred: np.ndarray):
@@ -1,13 +1,12 @@
 # backend/python/eval_model.py
-import os
 from pathlib import Path
 import joblib
-import numpy as np
 from sklearn.metrics import mean_squared_error
-from tensorflow.keras.models import load_model
+
+from windowing import build_xy
 
 BASE_DIR = Path(__file__).resolve().parent
-MODEL_FILE = BASE_DIR / "trained_lstm.h5"
+MODEL_FILE = BASE_DIR / "trained_lstm.keras"  # what predict_lstm.py writes
 SCALER_FILE = BASE_DIR / "scaler.save"
 PRED_DAYS = 27
 
@@ -22,21 +21,18 @@ if not SCALER_FILE.exists():
     raise FileNotFoundError(f"Scaler not found at {SCALER_FILE}")
 scaler = joblib.load(str(SCALER_FILE))
 
-# Load model without compiling (avoid metric/loss deserialization issues)
-if MODEL_FILE.exists():
-    try:
-        model = load_model(str(MODEL_FILE), compile=False)
-        print(f"Loaded model: {MODEL_FILE}")
-    except Exception as e:
-        # try .keras if .h5 fails
-        alt = str(MODEL_FILE) + ".keras"
-        if os.path.exists(alt):
-            model = load_model(alt, compile=False)
-            print(f"Loaded model: {alt}")
-        else:
-            raise RuntimeError("Failed to load model (.h5) and no .keras available.") from e
+# Load model through the configured inference backend (FORECAST_BACKEND=numpy needs no TensorFlow)
+model = pl.load_inference_model() if MODEL_FILE.exists() else None
+if model is None:
+    # fall back to a legacy .h5 export if one is lying around
+    alt = BASE_DIR / "trained_lstm.h5"
+    if not alt.exists():
+        raise FileNotFoundError(f"Model file not found or unreadable: {MODEL_FILE}")
+    from tensorflow.keras.models import load_model
+    model = load_model(str(alt), compile=False)
+    print(f"Loaded model: {alt}")
 else:
-    raise FileNotFoundError(f"Model file not found: {MODEL_FILE}")
+    print(f"Loaded model: {MODEL_FILE}")
 
 # Re-create dataset pairs (same preprocessing as predict_lstm.py)
 history_df = pl.load_history_from_mongo()
@@ -46,26 +42,10 @@ all_df = pl.merge_history_and_noaa(history_df, noaa_df)
 
 window = PRED_DAYS
 values = all_df[['f107','a_index','kp_max']].values.astype('float32')
-n_features = values.shape[1]
-
-# build baseline-target pairs
-baselines = []
-targets = []
-for i in range(0, len(values) - 2*window + 1):
-    baselines.append(values[i:i+window])
-    targets.append(values[i+window:i+2*window])
-baselines = np.array(baselines)
-targets = np.array(targets)
-
-# scale
-bas_s = scaler.transform(baselines.reshape(-1, n_features)).reshape(baselines.shape)
-tar_s = scaler.transform(targets.reshape(-1, n_features)).reshape(targets.shape)
 
-# construct X and Y (residuals)
-day_idx = (np.arange(window) / float(window - 1)).reshape(1, window, 1)
-day_idx = np.repeat(day_idx, bas_s.shape[0], axis=0)
-X = np.concatenate([bas_s, day_idx], axis=2)
-Y = tar_s - bas_s
+# scale the flat series once, then build strided baseline/target windows
+values_s = scaler.transform(values).astype('float32')
+X, Y, bas_s, tar_s = build_xy(values_s, window)
 
 # train/val split (same as training)
 split = int(0.8 * X.shape[0])
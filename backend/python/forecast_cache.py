@@ -0,0 +1,186 @@
+# backend/python/forecast_cache.py  -- forecast result cache keyed by (model, scalers, input window)
+# The same 27-day input window through the same model + scalers always gives the same forecast,
+# so results are stored on disk under
+#   sha256(model file hash, scaler hash, residual-scaler hash, window bytes, start date)
+# Entries are evicted least-recently-used (file mtime, touched on every hit) once the cache
+# exceeds FORECAST_CACHE_MAX_ENTRIES or FORECAST_CACHE_MAX_BYTES. Hit/miss counts and the
+# compute time saved by hits are kept in metrics.json inside the cache directory.
+#
+# Usage (from backend folder):
+#   python python/forecast_cache.py          # print hit rate, saved seconds, size
+#   python python/forecast_cache.py --clear
+import os
+import sys
+import json
+import glob
+import time
+import hashlib
+import argparse
+import threading
+
+import numpy as np
+
+import atomic_io
+
+# ===================== Config =====================
+BASE_DIR = os.path.dirname(__file__)
+CACHE_DIR = os.getenv("FORECAST_CACHE_DIR", os.path.join(BASE_DIR, "forecast_cache"))
+CACHE_ENABLED = os.getenv("FORECAST_CACHE", "1") != "0"
+MAX_ENTRIES = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", "256"))
+MAX_BYTES = int(os.getenv("FORECAST_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# ===================== Fingerprints =====================
+_file_hashes = {}
+
+def file_fingerprint(path):
+    """sha256 of a file's bytes, memoized on (size, mtime) so unchanged files are hashed once."""
+    st = os.stat(path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    cached = _file_hashes.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _file_hashes[path] = (stamp, digest)
+    return digest
+
+def forecast_key(artifact_paths, window_values, start_date, extra=None):
+    """extra: anything else that changes the output (e.g. Monte Carlo sample count + quantiles)."""
+    h = hashlib.sha256()
+    for path in artifact_paths:
+        h.update(file_fingerprint(path).encode("ascii"))
+    window = np.ascontiguousarray(window_values, dtype="float32")
+    h.update(str(window.shape).encode("ascii"))
+    h.update(window.tobytes())
+    h.update(str(start_date).encode("utf-8"))
+    if extra:
+        h.update(json.dumps(extra, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+# ===================== Cache =====================
+class ForecastCache:
+    def __init__(self, directory=CACHE_DIR, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.metrics_file = os.path.join(directory, "metrics.json")
+        self._lock = threading.Lock()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _entries(self):
+        return glob.glob(os.path.join(self.directory, "*.json"))
+
+    def _write_json(self, path, payload):
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_io.write_json(path, payload)
+
+    def _bump(self, hit, saved_seconds=0.0):
+        with self._lock:
+            m = self.metrics()
+            m["hits" if hit else "misses"] += 1
+            m["saved_seconds"] += saved_seconds
+            self._write_json(self.metrics_file, m)
+
+    def metrics(self):
+        m = {"hits": 0, "misses": 0, "saved_seconds": 0.0}
+        try:
+            with open(self.metrics_file, "r", encoding="utf-8") as f:
+                m.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        total = m["hits"] + m["misses"]
+        m["hit_rate"] = m["hits"] / total if total else None
+        return m
+
+    def get(self, key):
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # LRU: most recently used = newest mtime
+        except (OSError, ValueError):
+            self._bump(hit=False)
+            return None
+        self._bump(hit=True, saved_seconds=float(entry.get("compute_seconds", 0.0)))
+        return entry["results"]
+
+    def put(self, key, results, compute_seconds):
+        self._write_json(self._entry_path(key), {"results": results, "compute_seconds": compute_seconds,
+                                                 "created": time.time()})
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for p in self._entries():
+            if p == self.metrics_file:
+                continue
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort(reverse=True)  # newest first
+        total = 0
+        for i, (_, size, p) in enumerate(entries):
+            total += size
+            if i >= self.max_entries or total > self.max_bytes:
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+    def clear(self):
+        for p in self._entries():
+            os.remove(p)
+
+    def stats(self):
+        m = self.metrics()
+        entries = [p for p in self._entries() if p != self.metrics_file]
+        m["entries"] = len(entries)
+        m["bytes"] = sum(os.path.getsize(p) for p in entries)
+        return m
+
+_default = None
+
+def default_cache():
+    global _default
+    if _default is None:
+        _default = ForecastCache()
+    return _default
+
+def cached(artifact_paths, window_values, start_date, compute, extra=None):
+    """Return compute() through the default cache (or directly when FORECAST_CACHE=0)."""
+    if not CACHE_ENABLED:
+        return compute()
+    cache = default_cache()
+    try:
+        key = forecast_key(artifact_paths, window_values, start_date, extra)
+    except OSError:
+        return compute()  # artifacts missing: no key, and compute() reports the load failure
+    results = cache.get(key)
+    if results is not None:
+        print("ℹ️ forecast cache hit", file=sys.stderr)
+        return results
+    t0 = time.perf_counter()
+    results = compute()
+    if results:
+        cache.put(key, results, time.perf_counter() - t0)
+    return results
+
+# ===================== CLI =====================
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the forecast result cache")
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+    cache = default_cache()
+    if args.clear:
+        cache.clear()
+    print(json.dumps(cache.stats()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# backend/python/forecast_server.py  -- long-lived forecast service (model + scalers loaded once)
+# Usage (from backend folder):
+#   python python/forecast_server.py            # listens on FORECAST_HOST:FORECAST_PORT
+# Endpoints:
+#   GET /forecast  -> same JSON list predict_lstm.py prints
+#   GET /health    -> {"ok": true, ...}
+#   GET /metrics   -> startup / first-forecast / per-request latency stats
+# The model is loaded once; a change to the registry's current.json (promote / rollback /
+# retrain) is noticed on the next request and the new version is loaded in its place.
+import os
+import sys
+import json
+import time
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import predict_lstm as pl
+import registry
+import mongo_connection
+import noaa_fetch
+import forecast_cache
+import mc_dropout
+
+# ===================== Config =====================
+HOST = os.getenv("FORECAST_HOST", "127.0.0.1")
+PORT = int(os.getenv("FORECAST_PORT", "8765"))
+WINDOW = pl.PRED_DAYS
+BANDS = pl.band_settings()  # FORECAST_MC_SAMPLES / FORECAST_QUANTILES
+
+# ===================== Warm state =====================
+_state = {"model": None, "affine": None, "version": None, "paths": None, "stamp": None, "current": None}
+_predict_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "process_start": time.perf_counter(),
+    "load_seconds": None,
+    "warmup_seconds": None,
+    "startup_to_first_forecast_seconds": None,
+    "requests": 0,
+    "errors": 0,
+    "last_latency_ms": None,
+    "total_latency_ms": 0.0,
+    "max_latency_ms": 0.0,
+    "reloads": 0,
+    "previous_version": None,
+}
+
+def current_file_stamp():
+    """(mtime, size) of the registry's current.json, or None without a registry."""
+    try:
+        st = os.stat(registry.CURRENT_FILE)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def load_artifacts():
+    """Load model and both scalers; they stay resident until the current version changes."""
+    current = current_file_stamp()
+    version = registry.resolve()  # FORECAST_MODEL_VERSION, else the registry's current version
+    for path in registry.version_paths(version):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} missing; run predict_lstm.py once to train/fit it")
+    t0 = time.perf_counter()
+    art = registry.load(version)  # FORECAST_BACKEND: keras | tflite | numpy
+    if art is None:
+        raise RuntimeError(f"failed to load model version {version or 'live'}")
+    if BANDS and not mc_dropout.supports_sampling(art.model):
+        art = registry.load(version, backend="keras")  # FORECAST_MC_SAMPLES needs dropout sampling
+    model = art.model
+    # fingerprint the files now: they are what this model was loaded from, whatever happens later
+    stamp = pl.artifact_stamp(version, paths=art.paths)
+    _state.update(model=model, affine=art.affine, version=version, paths=art.paths, stamp=stamp, current=current)
+    _stats["load_seconds"] = time.perf_counter() - t0
+    print(f"ℹ️ artifacts loaded in {_stats['load_seconds']:.3f}s", file=sys.stderr)
+
+    # one dummy predict so graph tracing is not paid by the first real request
+    t0 = time.perf_counter()
+    model.predict(np.zeros((1, WINDOW, model.input_shape[-1]), dtype="float32"), verbose=0)
+    _stats["warmup_seconds"] = time.perf_counter() - t0
+
+def reload_if_changed():
+    """Reload when current.json changed since the last load (ignored when a version is pinned)."""
+    if registry.MODEL_VERSION or current_file_stamp() == _state["current"]:
+        return
+    with _reload_lock:
+        current = current_file_stamp()
+        if current == _state["current"]:
+            return
+        if registry.resolve() == _state["version"]:
+            _state["current"] = current
+            return
+        print(f"ℹ️ model version changed ({_state['version']} -> {registry.resolve()}); reloading", file=sys.stderr)
+        previous = _state["version"]
+        with _predict_lock:
+            registry.clear_cache()
+            try:
+                load_artifacts()
+            except Exception as e:
+                # keep serving the loaded model; the next promote / rollback is picked up again
+                print(f"❌ reload failed ({e}); still serving version {previous}", file=sys.stderr)
+                _state["current"] = current
+                return
+    with _stats_lock:
+        _stats["reloads"] += 1
+        _stats["previous_version"] = previous
+
+def run_forecast():
+    """Fetch NOAA + history, merge, and predict with the warm model."""
+    reload_if_changed()
+    state = dict(_state)  # one consistent model / scalers / stamp for this request
+    bulletin = noaa_fetch.fetch_bulletin()
+    cached = pl.load_last_forecast(bulletin["issued"], state["stamp"], BANDS)
+    if cached is not None:
+        return cached
+    noaa_df = pl.parse_noaa_text(bulletin["text"])
+    if noaa_df.empty:
+        return []
+    # inference only needs the trailing window, not the whole history
+    all_df = pl.merge_history_and_noaa(pl.load_history_tail_from_mongo(WINDOW), noaa_df)
+    if len(all_df) < WINDOW:
+        return []
+    values = all_df[["f107", "a_index", "kp_max"]].values.astype("float32")
+    start_date = noaa_df["date"].max() + timedelta(days=1)
+
+    def compute():
+        with _predict_lock:
+            return pl.forecast_with_bands(
+                state["model"], state["affine"], values, start_date, window=WINDOW, bands=BANDS
+            )
+
+    results = forecast_cache.cached(state["paths"], values[-WINDOW:], start_date, compute, extra=BANDS)
+    pl.save_last_forecast(bulletin["issued"], results, state["stamp"], BANDS)
+    return results
+
+def record_request(latency_ms, ok):
+    with _stats_lock:
+        _stats["requests"] += 1
+        if not ok:
+            _stats["errors"] += 1
+        _stats["last_latency_ms"] = latency_ms
+        _stats["total_latency_ms"] += latency_ms
+        _stats["max_latency_ms"] = max(_stats["max_latency_ms"], latency_ms)
+        if ok and _stats["startup_to_first_forecast_seconds"] is None:
+            _stats["startup_to_first_forecast_seconds"] = time.perf_counter() - _stats["process_start"]
+
+def metrics_snapshot():
+    with _stats_lock:
+        snap = {k: v for k, v in _stats.items() if k != "process_start"}
+    n = snap["requests"]
+    snap["mean_latency_ms"] = snap["total_latency_ms"] / n if n else None
+    snap["uptime_seconds"] = time.perf_counter() - _stats["process_start"]
+    snap["mongo_queries"] = mongo_connection.query_stats()
+    snap["forecast_cache"] = forecast_cache.default_cache().stats() if forecast_cache.CACHE_ENABLED else None
+    return snap
+
+# ===================== HTTP =====================
+class ForecastHandler(BaseHTTPRequestHandler):
+    def _send_json(self, code, payload, extra_headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (extra_headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            return self._send_json(200, {"ok": _state["model"] is not None, "model_version": _state["version"]})
+        if path == "/metrics":
+            return self._send_json(200, metrics_snapshot())
+        if path != "/forecast":
+            return self._send_json(404, {"error": "not found"})
+
+        t0 = time.perf_counter()
+        try:
+            results = run_forecast()
+        except Exception as e:
+            latency_ms = (time.perf_counter() - t0) * 1000.0
+            record_request(latency_ms, ok=False)
+            print("❌ forecast error:", e, file=sys.stderr)
+            return self._send_json(500, {"error": str(e)})
+        latency_ms = (time.perf_counter() - t0) * 1000.0
+        record_request(latency_ms, ok=True)
+        print(f"ℹ️ /forecast served {len(results)} rows in {latency_ms:.1f} ms", file=sys.stderr)
+        self._send_json(200, results, {"X-Forecast-Latency-Ms": f"{latency_ms:.1f}"})
+
+    def log_message(self, fmt, *args):
+        print("ℹ️ " + (fmt % args), file=sys.stderr)
+
+def main():
+    load_artifacts()
+    server = ThreadingHTTPServer((HOST, PORT), ForecastHandler)
+    print(f"✅ forecast server listening on http://{HOST}:{PORT}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
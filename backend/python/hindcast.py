@@ -0,0 +1,142 @@
+# backend/python/hindcast.py  -- batched multi-origin inference (hindcasting)
+# For each forecast origin date O the model sees the 27 days O-27 .. O-1 and predicts O .. O+26,
+# exactly like predict_lstm does for the day after the latest NOAA block. All windows are cut
+# from one scaled copy of the series as strided views, gathered into a single batch and sent
+# through one model.predict call.
+#
+# Usage (from backend folder):
+#   python python/hindcast.py --start 2020-01-01 --end 2024-12-31 --out hindcast.csv
+#   python python/hindcast.py --origins 2024-03-01 2024-04-01 --batch-size 512
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from windowing import build_inputs
+from numpy.lib.stride_tricks import sliding_window_view
+
+VARIABLES = ["f107", "a_index", "kp_max"]
+WINDOW = 27
+
+def origin_indices(dates, origins, window=WINDOW):
+    """
+    Position of each origin in `dates` (the index of the first forecast day), or -1 when the
+    27 days before it are not all present in the series.
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    origins = np.asarray(origins, dtype="datetime64[D]")
+    idx = np.searchsorted(dates, origins)
+    ok = idx >= window
+    # the window must end on origin-1 and span exactly `window` calendar days
+    prev = np.where(ok, idx - 1, 0)
+    first = np.where(ok, idx - window, 0)
+    ok &= dates[prev] == origins - np.timedelta64(1, "D")
+    ok &= (dates[prev] - dates[first]).astype("int64") == window - 1
+    return np.where(ok, idx, -1)
+
+def predict_windows(model, affine, windows_s, batch_size=256):
+    """
+    Batched residual-model inference: windows_s is (n, window, 3) already scaled, affine the
+    model's AffineScalers. Returns forecasts in real units, shaped (n, window, 3).
+    """
+    X = build_inputs(windows_s)
+    pred_res_scaled = model.predict(X, batch_size=batch_size, verbose=0)
+    return affine.forecast_scaled(windows_s, pred_res_scaled, out=pred_res_scaled)
+
+def hindcast(model, affine, dates, values, origins, batch_size=256, window=WINDOW):
+    """
+    Forecast from every origin in one batch. Returns a tidy DataFrame with columns
+    origin, lead_day (1..window), date, variable, forecast, observed (NaN when not in the series).
+    Origins without a full preceding window are dropped (reported on stderr).
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    values = np.asarray(values, dtype="float32")
+    origins = np.asarray(origins, dtype="datetime64[D]")
+    idx = origin_indices(dates, origins, window)
+    valid = idx >= 0
+    if not valid.all():
+        print(f"⚠️ hindcast: skipped {int((~valid).sum())} origin(s) without a full {window}-day window",
+              file=sys.stderr)
+    origins, idx = origins[valid], idx[valid]
+    if idx.size == 0:
+        return pd.DataFrame(columns=["origin", "lead_day", "date", "variable", "forecast", "observed"])
+
+    values_s = affine.transform(values)
+    views = sliding_window_view(values_s, window, axis=0).transpose(0, 2, 1)  # (N-window+1, window, 3)
+    batch = views[idx - window]  # one gather -> (n_origins, window, 3)
+    forecast = predict_windows(model, affine, batch, batch_size=batch_size)
+
+    n, n_var = idx.size, len(VARIABLES)
+    lead = np.arange(1, window + 1)
+    target_dates = origins[:, None] + (lead - 1).astype("timedelta64[D]")[None, :]
+
+    # observed values where the target date exists in the series
+    pos = np.searchsorted(dates, target_dates)
+    pos_c = np.minimum(pos, len(dates) - 1)
+    present = dates[pos_c] == target_dates
+    observed = np.where(present[..., None], values[pos_c], np.nan)
+
+    return pd.DataFrame({
+        "origin": np.repeat(origins, window * n_var).astype("datetime64[ns]"),
+        "lead_day": np.tile(np.repeat(lead, n_var), n),
+        "date": np.repeat(target_dates.ravel(), n_var).astype("datetime64[ns]"),
+        "variable": np.tile(VARIABLES, n * window),
+        "forecast": forecast.reshape(-1),
+        "observed": observed.reshape(-1),
+    })
+
+# ===================== CLI =====================
+def main():
+    import predict_lstm as pl
+    import registry
+
+    parser = argparse.ArgumentParser(description="Batched multi-origin hindcast with the saved LSTM")
+    parser.add_argument("--origins", nargs="*", help="explicit origin dates (YYYY-MM-DD)")
+    parser.add_argument("--start", help="first origin (YYYY-MM-DD)")
+    parser.add_argument("--end", help="last origin (YYYY-MM-DD)")
+    parser.add_argument("--step", type=int, default=1, help="days between origins")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--with-noaa", action="store_true", help="append the current NOAA block to history")
+    parser.add_argument("--model-version", help="registry version (default: FORECAST_MODEL_VERSION / current)")
+    parser.add_argument("--out", help="write CSV here instead of stdout")
+    args = parser.parse_args()
+
+    art = registry.load(args.model_version)
+    if art is None:
+        print("❌ No trained model found.", file=sys.stderr)
+        sys.exit(1)
+    model, affine = art.model, art.affine
+
+    df = pl.load_history_from_mongo()
+    if args.with_noaa:
+        df = pl.merge_history_and_noaa(df, pl.parse_noaa_text(pl.fetch_noaa_text()))
+        # hindcast windows and "observed" must be real days, not interpolated ones
+        df = df[~df["imputed"]].reset_index(drop=True)
+    if df.empty:
+        print("❌ No history available.", file=sys.stderr)
+        sys.exit(1)
+    dates = df["date"].values.astype("datetime64[D]")
+    values = df[VARIABLES].values.astype("float32")
+
+    if args.origins:
+        origins = np.array(args.origins, dtype="datetime64[D]")
+    else:
+        start = np.datetime64(args.start, "D") if args.start else dates[0] + np.timedelta64(WINDOW, "D")
+        end = np.datetime64(args.end, "D") if args.end else dates[-1] + np.timedelta64(1, "D")
+        origins = np.arange(start, end + np.timedelta64(1, "D"), np.timedelta64(args.step, "D"))
+
+    t0 = time.perf_counter()
+    out = hindcast(model, affine, dates, values, origins, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - t0
+    n_origins = out["origin"].nunique() if not out.empty else 0
+    print(f"✅ hindcast: {n_origins} origins in {elapsed:.2f}s", file=sys.stderr)
+
+    if args.out:
+        out.to_csv(args.out, index=False)
+    else:
+        out.to_csv(sys.stdout, index=False)
+
+if __name__ == "__main__":
+    main()
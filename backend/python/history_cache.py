@@ -0,0 +1,153 @@
+# backend/python/history_cache.py  -- incremental Mongo history loader with a local columnar cache
+# The cache is a single .npz file holding date (datetime64[ms]), f107, a_index and kp_max arrays.
+# Each load asks Mongo only for documents with date > the cached high-water mark and appends them.
+# Before that it counts the stored documents up to the mark; a count that differs from the cached
+# rows (rows deleted or back-filled below the mark) rebuilds the cache from scratch.
+# Values rewritten in place keep the count, so the writers drop the cache themselves:
+#   python  load_history.py, load_historical.py, maintain_forecasts.py (invalidate_cache)
+#   node    server.js savePredictions, cron.js, cron_forecast_job.js, routes/predictions.js
+#           POST /lstm and migrate_dates.js (models/HistoryCache.js)
+# Anything else that edits old rows: run with --rebuild or set HISTORY_CACHE=0.
+#
+# Usage (from backend folder):
+#   python python/history_cache.py            # sync and print row count / high-water mark
+#   python python/history_cache.py --rebuild  # drop the cache and reload everything
+#   python python/history_cache.py --bench    # cold vs warm vs uncached full-scan timings
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+import atomic_io
+import mongo_connection
+from mongo_connection import timed_query
+
+# ===================== Config =====================
+HIST_COLLECTION = "forecast_lstm_27day"
+BASE_DIR = os.path.dirname(__file__)
+CACHE_FILE = os.getenv("HISTORY_CACHE_FILE", os.path.join(BASE_DIR, "history_cache.npz"))
+CACHE_ENABLED = os.getenv("HISTORY_CACHE", "1") != "0"
+VALUE_COLUMNS = ["f107", "a_index", "kp_max"]
+PROJECTION = {"_id": 0, "date": 1, **{c: 1 for c in VALUE_COLUMNS}}
+
+# ===================== Cache file =====================
+def empty_arrays():
+    arrays = {"date": np.empty(0, dtype="datetime64[ms]")}
+    for c in VALUE_COLUMNS:
+        arrays[c] = np.empty(0, dtype="float64")
+    return arrays
+
+def load_cache(path=CACHE_FILE):
+    if not os.path.exists(path):
+        return empty_arrays()
+    try:
+        with np.load(path) as data:
+            return {k: data[k] for k in ["date"] + VALUE_COLUMNS}
+    except Exception as e:
+        print("⚠️ history cache unreadable, rebuilding:", e, file=sys.stderr)
+        return empty_arrays()
+
+def save_cache(arrays, path=CACHE_FILE):
+    """Write to a temp file and rename, so a crashed run never leaves a half-written cache."""
+    atomic_io.atomic_write(path, lambda tmp: np.savez(tmp, **arrays), suffix=".tmp.npz")
+
+def invalidate_cache(path=CACHE_FILE):
+    if os.path.exists(path):
+        os.remove(path)
+
+def docs_to_arrays(docs):
+    arrays = {"date": np.array([d["date"] for d in docs], dtype="datetime64[ms]")}
+    for c in VALUE_COLUMNS:
+        arrays[c] = np.array([d.get(c) for d in docs], dtype="float64")
+    return arrays
+
+def to_frame(arrays):
+    df = pd.DataFrame({"date": pd.to_datetime(arrays["date"])})
+    for c in VALUE_COLUMNS:
+        df[c] = arrays[c]
+    return df
+
+# ===================== Sync =====================
+def sync_history(coll, path=CACHE_FILE):
+    """
+    Bring the cache up to date with `coll` and return all rows as sorted arrays.
+    Only documents newer than the cached high-water-mark date are fetched, unless the stored
+    count up to the mark no longer matches the cache (then everything is reloaded).
+    """
+    arrays = load_cache(path)
+    query, rebuilt = {}, False
+    if arrays["date"].size:
+        hwm = arrays["date"][-1].astype("datetime64[ms]").item()
+        with timed_query("history_check"):
+            stored = coll.count_documents({"date": {"$lte": hwm}})
+        if stored == arrays["date"].size:
+            query = {"date": {"$gt": hwm}}
+        else:
+            print(f"⚠️ history cache has {arrays['date'].size} rows up to {hwm:%Y-%m-%d}, Mongo {stored}; rebuilding",
+                  file=sys.stderr)
+            arrays, rebuilt = empty_arrays(), True
+
+    with timed_query("history_delta"):
+        docs = list(coll.find(query, PROJECTION).sort("date", 1))
+    if docs or rebuilt:
+        delta = docs_to_arrays(docs)
+        arrays = {k: np.concatenate([arrays[k], delta[k]]) for k in arrays}
+        save_cache(arrays, path)
+    print(f"ℹ️ history cache: {arrays['date'].size} rows ({len(docs)} new)", file=sys.stderr)
+    return arrays
+
+def load_history(coll, path=CACHE_FILE):
+    """History as a DataFrame (date, f107, a_index, kp_max), using the cache unless disabled."""
+    if not CACHE_ENABLED:
+        with timed_query("history_full"):
+            docs = list(coll.find({}, PROJECTION).sort("date", 1))
+        return to_frame(docs_to_arrays(docs))
+    return to_frame(sync_history(coll, path))
+
+# ===================== CLI =====================
+def bench(coll):
+    bench_path = CACHE_FILE + ".bench.npz"
+    invalidate_cache(bench_path)
+
+    t0 = time.perf_counter()
+    uncached = list(coll.find({}, {"_id": 0}).sort("date", 1))
+    pd.DataFrame(uncached)
+    full_scan = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    cold = to_frame(sync_history(coll, bench_path))
+    cold_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    to_frame(sync_history(coll, bench_path))
+    warm_s = time.perf_counter() - t0
+
+    invalidate_cache(bench_path)
+    return {
+        "rows": len(cold),
+        "uncached_full_scan_s": round(full_scan, 4),
+        "cold_cache_s": round(cold_s, 4),
+        "warm_cache_s": round(warm_s, 4),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync/inspect the local history cache")
+    parser.add_argument("--rebuild", action="store_true", help="drop the cache and reload everything")
+    parser.add_argument("--bench", action="store_true", help="time cold vs warm vs uncached loads")
+    args = parser.parse_args()
+
+    coll = mongo_connection.get_mongo_collection(HIST_COLLECTION)
+    if args.bench:
+        print(json.dumps(bench(coll)))
+        return
+    if args.rebuild:
+        invalidate_cache()
+    arrays = sync_history(coll)
+    hwm = str(arrays["date"][-1]) if arrays["date"].size else None
+    print(json.dumps({"rows": int(arrays["date"].size), "high_water_mark": hwm, "file": CACHE_FILE}))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# backend/python/inference_backend.py  -- pluggable runtime for the residual model's forward pass
+# The daily forecast only needs predict(), not the training stack, so the model can be run by a
+# lighter runtime than full TensorFlow:
+#   FORECAST_BACKEND=keras    (default) tensorflow.keras loading trained_lstm.keras
+#   FORECAST_BACKEND=tflite   trained_lstm.tflite, run by tflite_runtime when installed
+#                             (pip install tflite-runtime, no TensorFlow needed), else tf.lite
+#   FORECAST_BACKEND=numpy    numpy_lstm.py: the same forward pass in NumPy, weights read from
+#                             trained_lstm.keras with h5py (no TensorFlow, no export step)
+# The .tflite file is exported from the Keras model with --export; a sidecar JSON records the
+# sha256 of the model it came from, and a stale export is refused rather than silently used.
+# Every backend returns an object with .predict(X, batch_size=None, verbose=0) and .input_shape,
+# so it drops in wherever the Keras model was used for inference.
+#
+# Usage (from backend folder):
+#   python python/inference_backend.py --export                 # write trained_lstm.tflite
+#   python python/inference_backend.py --bench --repeat 5       # cold start to first forecast per backend
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import numpy as np
+
+import atomic_io
+from forecast_cache import file_fingerprint
+
+# ===================== Config =====================
+BASE_DIR = os.path.dirname(__file__)
+MODEL_FILE = os.path.join(BASE_DIR, "trained_lstm.keras")
+TFLITE_FILE = os.path.join(BASE_DIR, "trained_lstm.tflite")
+TFLITE_META = TFLITE_FILE + ".json"
+BACKEND = os.getenv("FORECAST_BACKEND", "keras")
+WINDOW = 27
+
+# ===================== Backends =====================
+def load_keras(path=MODEL_FILE):
+    if not os.path.exists(path):
+        return None
+    try:
+        from tensorflow.keras.models import load_model
+
+        model = load_model(path, compile=False)
+        print("ℹ️ loaded existing model", file=sys.stderr)
+        return model
+    except Exception as e:
+        print("⚠️ failed loading model:", e, file=sys.stderr)
+        return None
+
+def _tflite_interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+class TFLiteModel:
+    """
+    A batch-1 TFLite export (fused LSTM kernels need static shapes), so predict() runs one
+    invoke per window -- each is a fraction of a millisecond.
+    """
+
+    def __init__(self, path=TFLITE_FILE):
+        self.interpreter = _tflite_interpreter_class()(model_path=path)
+        self.interpreter.allocate_tensors()
+        inp = self.interpreter.get_input_details()[0]
+        out = self.interpreter.get_output_details()[0]
+        self._in, self._out = inp["index"], out["index"]
+        self.input_shape = (None,) + tuple(int(d) for d in inp["shape"][1:])
+        self.output_shape = (None,) + tuple(int(d) for d in out["shape"][1:])
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        out = np.empty((X.shape[0],) + self.output_shape[1:], dtype=np.float32)
+        for i in range(X.shape[0]):
+            self.interpreter.set_tensor(self._in, X[i : i + 1])
+            self.interpreter.invoke()
+            out[i] = self.interpreter.get_tensor(self._out)[0]
+        return out
+
+def tflite_is_current(model_path=MODEL_FILE):
+    """True when the .tflite export exists and was made from the Keras model at model_path."""
+    if not (os.path.exists(TFLITE_FILE) and os.path.exists(TFLITE_META) and os.path.exists(model_path)):
+        return False
+    try:
+        with open(TFLITE_META, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get("source_sha256") == file_fingerprint(model_path)
+
+def load_tflite(model_path=MODEL_FILE):
+    if not tflite_is_current(model_path):
+        print(f"⚠️ {TFLITE_FILE} missing or not exported from {model_path}; "
+              "run inference_backend.py --export", file=sys.stderr)
+        return None
+    try:
+        model = TFLiteModel(TFLITE_FILE)
+        print("ℹ️ loaded tflite model", file=sys.stderr)
+        return model
+    except Exception as e:
+        print("⚠️ failed loading tflite model:", e, file=sys.stderr)
+        return None
+
+def load_numpy(model_path=MODEL_FILE):
+    import numpy_lstm
+
+    return numpy_lstm.load(model_path)
+
+BACKENDS = {"keras": load_keras, "tflite": load_tflite, "numpy": load_numpy}
+
+def load_backend(name=None, model_path=MODEL_FILE):
+    """
+    Model object for backend `name` (default FORECAST_BACKEND) of the Keras model at model_path
+    (e.g. a registry version), or None if it cannot load.
+    """
+    name = name or BACKEND
+    if name not in BACKENDS:
+        print(f"⚠️ unknown FORECAST_BACKEND {name!r}; choose from {sorted(BACKENDS)}", file=sys.stderr)
+        return None
+    return BACKENDS[name](model_path)
+
+# ===================== Export =====================
+def export_tflite(model_path=MODEL_FILE, out_path=TFLITE_FILE):
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    fn = tf.function(lambda x: model(x, training=False))
+    # a static batch dimension lets the converter emit fused LSTM ops instead of TensorList ops
+    concrete = fn.get_concrete_function(tf.TensorSpec([1] + list(model.input_shape[1:]), tf.float32))
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+    flatbuffer = converter.convert()
+
+    atomic_io.write_bytes(out_path, flatbuffer)
+    meta = {"source": os.path.basename(model_path), "source_sha256": file_fingerprint(model_path),
+            "tensorflow": tf.__version__, "bytes": len(flatbuffer)}
+    with open(out_path + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    # the export must reproduce the Keras forward pass
+    x = np.random.default_rng(0).random((4, WINDOW, model.input_shape[-1]), dtype=np.float32)
+    meta["max_abs_diff"] = float(np.abs(TFLiteModel(out_path).predict(x) - model.predict(x, verbose=0)).max())
+    return meta
+
+# ===================== Cold-start benchmark =====================
+def first_forecast(backend):
+    """Child-process body: imports + artifact load + one forecast, as the daily run does."""
+    t0 = time.perf_counter()
+    import affine_transform
+    import predict_lstm as pl
+    imported = time.perf_counter()
+
+    model = load_backend(backend)
+    if model is None:
+        raise SystemExit(f"backend {backend} unavailable")
+    affine = affine_transform.load(pl.SCALER_FILE, pl.RES_SCALER_FILE)
+    loaded = time.perf_counter()
+
+    values = np.random.default_rng(0).uniform([70, 2, 0], [200, 40, 6], (WINDOW, 3)).astype("float32")
+    results = pl.forecast_from_values(model, affine, values, pl.pd.Timestamp("2025-01-01"))
+    done = time.perf_counter()
+    return {"backend": backend, "tensorflow_loaded": "tensorflow" in sys.modules,
+            "sklearn_loaded": "sklearn" in sys.modules,
+            "import_s": round(imported - t0, 4), "load_s": round(loaded - imported, 4),
+            "first_predict_s": round(done - loaded, 4), "rows": len(results)}
+
+def bench_cold_start(backends, repeat):
+    """Wall time from interpreter launch to first forecast, in fresh processes."""
+    report = {}
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="2")
+    for backend in backends:
+        walls, child = [], None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--first-forecast", backend],
+                                  capture_output=True, text=True, env=env)
+            walls.append(time.perf_counter() - t0)
+            if proc.returncode != 0:
+                child = {"error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+                break
+            child = json.loads(proc.stdout.strip().splitlines()[-1])
+        report[backend] = {"wall_median_s": round(float(np.median(walls)), 4),
+                           "wall_min_s": round(min(walls), 4), "runs": len(walls), **child}
+    return report
+
+# ===================== CLI =====================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export / benchmark the inference backends")
+    parser.add_argument("--export", action="store_true", help="export trained_lstm.keras to TFLite")
+    parser.add_argument("--bench", action="store_true", help="cold start to first forecast per backend")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--first-forecast", metavar="BACKEND", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.first_forecast:
+        print(json.dumps(first_forecast(args.first_forecast)))
+    elif args.export:
+        meta = export_tflite()
+        print(f"✅ exported {TFLITE_FILE} ({meta['bytes']} bytes, max |diff| vs keras {meta['max_abs_diff']:.2e})",
+              file=sys.stderr)
+        print(json.dumps(meta))
+    elif args.bench:
+        print(json.dumps(bench_cold_start(args.backends, args.repeat)))
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
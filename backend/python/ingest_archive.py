@@ -0,0 +1,211 @@
+# backend/python/ingest_archive.py  -- bulk ingester for archives of NOAA 27DO bulletins
+# Every bulletin forecasts 27 target dates, so a target date is forecast by up to 27 issues.
+# Instead of collapsing to one row per date (load_historical.py), rows are keyed by
+# (issue_date, target_date) and carry lead_day = target_date - issue_date, giving
+# lead-time-aware training/evaluation data.
+#
+# Usage (from backend folder):
+#   python python/ingest_archive.py path/to/bulletins/            # directory, searched recursively
+#   python python/ingest_archive.py archive.tar.gz --workers 8    # tarball, members parsed in parallel
+#   python python/ingest_archive.py "python/27 day forecast.txt"  # single (concatenated) file
+#   ... --dry-run                                                  # parse and count only
+# Files are streamed to the workers with at most IN_FLIGHT_PER_WORKER x workers pending, so memory
+# stays flat however large the archive is. Workers read uncompressed tar members themselves
+# (offset + size, no text through the parent); compressed tarballs can only be read in order,
+# so there the parent decompresses and hands each member's text over.
+import os
+import sys
+import json
+import time
+import tarfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+from pymongo import UpdateOne, ASCENDING
+
+import noaa_parser
+import mongo_connection
+
+# ===================== Config =====================
+ISSUES_COLLECTION = "forecast_27day_issues"
+BATCH_SIZE = 5000
+TEXT_SUFFIXES = (".txt",)
+IN_FLIGHT_PER_WORKER = 2
+
+# ===================== Sources =====================
+def iter_directory(path):
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if name.lower().endswith(TEXT_SUFFIXES):
+                yield os.path.join(root, name)
+
+def is_text_member(member):
+    return member.isfile() and member.name.lower().endswith(TEXT_SUFFIXES)
+
+def iter_tarball(path):
+    """Yield (member_name, text) without extracting to disk."""
+    with tarfile.open(path, "r:*") as tar:
+        for member in tar:
+            if not is_text_member(member):
+                continue
+            f = tar.extractfile(member)
+            if f is None:
+                continue
+            yield member.name, f.read().decode("utf-8", errors="replace")
+
+def iter_tar_members(path):
+    """Yield (member_name, offset, size) of an uncompressed tarball's text members."""
+    with tarfile.open(path, "r:") as tar:
+        for member in tar:
+            if is_text_member(member):
+                yield member.name, member.offset_data, member.size
+
+def read_tar_member(path, offset, size):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size).decode("utf-8", errors="replace")
+
+def is_compressed_tarball(path):
+    try:
+        with tarfile.open(path, "r:"):
+            return False
+    except tarfile.ReadError:
+        return True
+
+def is_tarball(path):
+    return os.path.isfile(path) and tarfile.is_tarfile(path)
+
+# ===================== Parse + write =====================
+def bulletin_docs(text, source):
+    """Parse text into issue-keyed docs. Returns (docs, n_without_issue, n_malformed)."""
+    result = noaa_parser.parse_noaa_text(text)
+    has_issue = ~np.isnat(result.issued)
+    issue_dates = result.issued[has_issue].astype("datetime64[D]")
+    target_dates = result.dates[has_issue]
+    lead_days = (target_dates - issue_dates).astype("int64")
+
+    docs = []
+    for issued, issue_date, target_date, lead, f, a, k in zip(
+        result.issued[has_issue].astype("datetime64[ms]").tolist(),
+        issue_dates.astype("datetime64[ms]").tolist(),
+        target_dates.astype("datetime64[ms]").tolist(),
+        lead_days.tolist(),
+        result.f107[has_issue], result.a_index[has_issue], result.kp_max[has_issue],
+    ):
+        docs.append({
+            "issue_date": issue_date,
+            "target_date": target_date,
+            "issued": issued,
+            "lead_day": int(lead),
+            "f107": float(f),
+            "a_index": float(a),
+            "kp_max": float(k),
+            "source_file": source,
+        })
+    return docs, int((~has_issue).sum()), result.malformed
+
+def write_docs(coll, docs, batch_size=BATCH_SIZE):
+    """Idempotent unordered upserts on (issue_date, target_date), in batches."""
+    upserted = modified = 0
+    for start in range(0, len(docs), batch_size):
+        ops = [
+            UpdateOne({"issue_date": d["issue_date"], "target_date": d["target_date"]}, {"$set": d}, upsert=True)
+            for d in docs[start : start + batch_size]
+        ]
+        res = coll.bulk_write(ops, ordered=False)
+        upserted += res.upserted_count
+        modified += res.modified_count
+    return upserted, modified
+
+def ingest_text(text, source, collection, batch_size, dry_run):
+    """Worker entry point: parse one file's text and write it with the worker's pooled client."""
+    docs, no_issue, malformed = bulletin_docs(text, source)
+    upserted = modified = 0
+    if docs and not dry_run:
+        upserted, modified = write_docs(mongo_connection.get_mongo_collection(collection), docs, batch_size)
+    return {"source": source, "rows": len(docs), "no_issue": no_issue, "malformed": malformed,
+            "upserted": upserted, "modified": modified}
+
+def ingest_tar_member(path, name, offset, size, collection, batch_size, dry_run):
+    """Worker entry point for an uncompressed tarball: read the member from the archive itself."""
+    return ingest_text(read_tar_member(path, offset, size), name, collection, batch_size, dry_run)
+
+def ingest_file(path, collection, batch_size, dry_run):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    return ingest_text(text, os.path.basename(path), collection, batch_size, dry_run)
+
+def ingest_tasks(path, common):
+    """(fn, *args) per file of the source, generated lazily."""
+    if os.path.isdir(path):
+        return ((ingest_file, p, *common) for p in iter_directory(path))
+    if is_tarball(path):
+        if is_compressed_tarball(path):
+            return ((ingest_text, text, name, *common) for name, text in iter_tarball(path))
+        return ((ingest_tar_member, path, name, offset, size, *common)
+                for name, offset, size in iter_tar_members(path))
+    return iter([(ingest_file, path, *common)])
+
+def bounded_results(pool, tasks, max_in_flight):
+    """Submit (fn, *args) tasks lazily with at most max_in_flight pending; yield futures as they finish."""
+    pending = set()
+    for fn, *args in tasks:
+        if len(pending) >= max_in_flight:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from done
+        pending.add(pool.submit(fn, *args))
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        yield from done
+
+def ensure_indexes(coll):
+    coll.create_index([("issue_date", ASCENDING), ("target_date", ASCENDING)], unique=True)
+    coll.create_index([("target_date", ASCENDING), ("lead_day", ASCENDING)])
+
+# ===================== Main =====================
+def main():
+    parser = argparse.ArgumentParser(description="Ingest NOAA 27DO bulletin archives keyed by issue date")
+    parser.add_argument("path", help="directory of bulletins, tarball, or a single text file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--collection", default=ISSUES_COLLECTION)
+    parser.add_argument("--dry-run", action="store_true", help="parse and count, do not write")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"❌ Not found: {args.path}", file=sys.stderr)
+        sys.exit(1)
+
+    if not args.dry_run:
+        ensure_indexes(mongo_connection.get_mongo_collection(args.collection))
+        # workers open their own pooled clients; don't carry this one across the fork
+        mongo_connection.close_client()
+
+    common = (args.collection, args.batch_size, args.dry_run)
+    t0 = time.perf_counter()
+    totals = {"files": 0, "rows": 0, "no_issue": 0, "malformed": 0, "upserted": 0, "modified": 0}
+    workers = max(1, args.workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for fut in bounded_results(pool, ingest_tasks(args.path, common), workers * IN_FLIGHT_PER_WORKER):
+            try:
+                stats = fut.result()
+            except Exception as e:
+                print(f"❌ ingest failed: {e}", file=sys.stderr)
+                continue
+            totals["files"] += 1
+            for k in ("rows", "no_issue", "malformed", "upserted", "modified"):
+                totals[k] += stats[k]
+            if stats["no_issue"] or stats["malformed"]:
+                print(f"⚠️ {stats['source']}: {stats['no_issue']} rows without :Issued:, "
+                      f"{stats['malformed']} malformed lines", file=sys.stderr)
+
+    elapsed = time.perf_counter() - t0
+    totals["seconds"] = round(elapsed, 3)
+    totals["rows_per_second"] = round(totals["rows"] / elapsed, 1) if elapsed > 0 else None
+    print(f"✅ Ingested {totals['rows']} issue rows from {totals['files']} file(s) in {elapsed:.2f}s",
+          file=sys.stderr)
+    print(json.dumps(totals))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# backend/python/instrumentation.py  -- per-stage timing + memory for forecast runs
+# A run is a sequence of named stages (noaa_fetch, mongo_load, model_load, predict, ...). Each
+# stage records wall time, the tracemalloc peak inside the stage and the process RSS, and is
+# emitted as one JSON line; a final "run" line carries the per-stage totals and Mongo query
+# timings. Outside an active run, stage() is a no-op, so shared helpers can always be wrapped.
+#   FORECAST_METRICS_FILE   append JSON lines here (default: stderr)
+#   FORECAST_PROM_FILE      also write the run as a Prometheus textfile-collector file
+#   FORECAST_TRACEMALLOC=0  skip tracemalloc (it slows allocation-heavy stages)
+#   FORECAST_PROFILE        write a cProfile dump of the whole run to this path
+import os
+import sys
+import json
+import time
+import uuid
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource  # not available on Windows
+except ImportError:
+    resource = None
+
+import atomic_io
+import mongo_connection
+
+# ===================== Config =====================
+METRICS_FILE = os.getenv("FORECAST_METRICS_FILE", "")
+PROM_FILE = os.getenv("FORECAST_PROM_FILE", "")
+TRACE_MEMORY = os.getenv("FORECAST_TRACEMALLOC", "1") != "0"
+PROFILE_FILE = os.getenv("FORECAST_PROFILE", "")
+
+# ===================== Memory =====================
+def rss_mb():
+    """Current resident set size in MB (Linux /proc), or None."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 2)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def max_rss_mb():
+    """Peak RSS of this process so far in MB, or None where getrusage is unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 2)
+
+# ===================== Runs =====================
+class Run:
+    def __init__(self, name, metrics_file=METRICS_FILE, trace_memory=TRACE_MEMORY):
+        self.name = name
+        self.run_id = uuid.uuid4().hex[:12]
+        self.metrics_file = metrics_file
+        self.trace_memory = trace_memory
+        self.started = time.perf_counter()
+        self.stages = {}
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def emit(self, record):
+        line = json.dumps({"event": record.pop("event"), "run": self.name, "run_id": self.run_id, **record})
+        if self.metrics_file:
+            with open(self.metrics_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        else:
+            print(line, file=sys.stderr)
+
+    @contextmanager
+    def stage(self, name, **fields):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        ok = False
+        t0 = time.perf_counter()
+        try:
+            yield fields
+            ok = True
+        finally:
+            if self.trace_memory:
+                fields["py_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 3)
+            self.record(name, time.perf_counter() - t0, ok=ok, **fields)
+
+    def record(self, name, seconds, **fields):
+        """Add a stage that was timed elsewhere (e.g. module imports before the run started)."""
+        s = self.stages.setdefault(name, {"count": 0, "seconds": 0.0})
+        s["count"] += 1
+        s["seconds"] += seconds
+        self.emit({"event": "stage", "stage": name, "seconds": round(seconds, 6), "ok": fields.pop("ok", True),
+                   "rss_mb": rss_mb(), "max_rss_mb": max_rss_mb(), **fields})
+        return self
+
+    def finish(self, status="ok", **fields):
+        total = time.perf_counter() - self.started
+        record = {"event": "run", "status": status, "seconds": round(total, 6),
+                  "stages": {k: round(v["seconds"], 6) for k, v in self.stages.items()},
+                  "max_rss_mb": max_rss_mb(), "mongo_queries": mongo_connection.query_stats(), **fields}
+        self.emit(dict(record))
+        if PROM_FILE:
+            write_prometheus(PROM_FILE, self, record)
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return record
+
+def write_prometheus(path, run, record):
+    """Textfile-collector format (node_exporter), replaced atomically."""
+    labels = f'run="{run.name}"'
+    lines = [
+        "# TYPE forecast_run_seconds gauge",
+        f'forecast_run_seconds{{{labels},status="{record["status"]}"}} {record["seconds"]}',
+        "# TYPE forecast_stage_seconds gauge",
+    ]
+    for stage, seconds in record["stages"].items():
+        lines.append(f'forecast_stage_seconds{{{labels},stage="{stage}"}} {seconds}')
+    if record["max_rss_mb"] is not None:
+        lines += ["# TYPE forecast_max_rss_megabytes gauge",
+                  f"forecast_max_rss_megabytes{{{labels}}} {record['max_rss_mb']}"]
+    lines += ["# TYPE forecast_run_timestamp_seconds gauge",
+              f"forecast_run_timestamp_seconds{{{labels}}} {time.time():.0f}"]
+    atomic_io.write_text(path, "\n".join(lines) + "\n")
+
+# ===================== Module-level run =====================
+_current = None
+
+def start_run(name):
+    global _current
+    _current = Run(name)
+    return _current
+
+def finish_run(status="ok", **fields):
+    global _current
+    if _current is None:
+        return None
+    record = _current.finish(status, **fields)
+    _current = None
+    return record
+
+@contextmanager
+def stage(name, **fields):
+    """Time `name` in the active run; does nothing when no run is active (e.g. in the server)."""
+    if _current is None:
+        yield fields
+        return
+    with _current.stage(name, **fields) as f:
+        yield f
+
+@contextmanager
+def profiled(path=PROFILE_FILE):
+    """cProfile the wrapped block and dump stats to `path` (no-op when path is empty)."""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"ℹ️ cProfile written to {path} (inspect with: python -m pstats {path})", file=sys.stderr)
@@ -1,42 +1,29 @@
 # backend/python/load_historical.py
 import os
 import sys
-import pandas as pd
-from pymongo import MongoClient, UpdateOne
+from pymongo import UpdateOne
 from datetime import datetime
 
+import noaa_parser
+import mongo_connection
+import history_cache
+
 # ===== Config =====
-MONGO_URL = "mongodb://localhost:27018/"
-DB_NAME = "noaa_database"
 COLLECTION_NAME = "forecast_lstm_27day"
 INPUT_FILE = os.path.join(os.path.dirname(__file__), "27 day forecast.txt")
 
 def parse_noaa_file(file_path):
-    data = []
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Input file not found: {file_path}")
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line == "" or line.startswith(":") or line.startswith("#"):
-                continue
-            parts = line.split()
-            if len(parts) >= 6:
-                try:
-                    date = pd.to_datetime(f"{parts[0]} {parts[1]} {parts[2]}")
-                    f107 = int(parts[3])
-                    a_index = int(parts[4])
-                    kp_max = int(parts[5])
-                    data.append({
-                        "date": pd.Timestamp(date).to_pydatetime(),
-                        "f107": int(f107),
-                        "a_index": int(a_index),
-                        "kp_max": int(kp_max)
-                    })
-                except Exception:
-                    continue
-    return data
+    result = noaa_parser.parse_noaa_file(file_path)
+    if result.malformed:
+        print(f"⚠️ Skipped {result.malformed} malformed line(s), e.g. {result.malformed_lines[:1]}",
+              file=sys.stderr)
+    return [
+        {"date": r["date"], "f107": int(r["f107"]), "a_index": int(r["a_index"]), "kp_max": int(r["kp_max"])}
+        for r in noaa_parser.to_records(result)
+    ]
 
 def main():
     try:
@@ -63,9 +50,7 @@ def main():
 
     # Upsert using bulk operations (safe if unique index exists)
     try:
-        client = MongoClient(MONGO_URL)
-        db = client[DB_NAME]
-        coll = db[COLLECTION_NAME]
+        coll = mongo_connection.get_mongo_collection(COLLECTION_NAME)
 
         ops = []
         for r in dedup_rows:
@@ -82,7 +67,9 @@ def main():
             n_upsert = (result.upserted_count if hasattr(result, "upserted_count") else 0)
             n_modified = result.modified_count if hasattr(result, "modified_count") else 0
             print(f"✅ Bulk upsert completed. upserted={n_upsert}, modified={n_modified}, total={len(ops)}")
-        client.close()
+            if n_upsert or n_modified:
+                # rewritten rows at/below the high-water mark are invisible to the incremental sync
+                history_cache.invalidate_cache()
 
     except Exception as e:
         print(f"❌ MongoDB error during bulk upsert: {e}", file=sys.stderr)
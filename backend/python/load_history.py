@@ -1,11 +1,17 @@
 # backend/python/load_history.py
 import os, sys
-import pandas as pd
-from pymongo import MongoClient
+import time
+import hashlib
+import argparse
+from pymongo import ReplaceOne
+from pymongo.errors import OperationFailure
+
+import noaa_parser
+import mongo_connection
+import history_cache
 
-MONGO_URL = "mongodb://localhost:27018/"
-DB_NAME = "noaa_database"
 COL = "forecast_lstm_27day"
+BATCH_SIZE = int(os.getenv("LOAD_HISTORY_BATCH_SIZE", "1000"))
 
 # Candidate filenames (try both with and without space)
 CANDIDATE_NAMES = ["27 day forecast.txt", "27day_forecast.txt", "27day_forecast.txt"]
@@ -41,29 +47,56 @@ def find_input_file():
     return None
 
 def parse_simple(file_path):
-    rows = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith(':') or line.startswith('#'):
+    # expected format: YYYY Mon DD F107 A_index Kp
+    result = noaa_parser.parse_noaa_file(file_path)
+    if result.malformed:
+        print(f"⚠️ Skipped {result.malformed} malformed line(s), e.g. {result.malformed_lines[:1]}",
+              file=sys.stderr)
+    return noaa_parser.to_records(result)
+
+def content_hash(doc):
+    """Stable hash of the stored values; unchanged rows are skipped on re-runs."""
+    key = f"{doc['f107']!r}|{doc['a_index']!r}|{doc['kp_max']!r}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def ensure_date_index(coll):
+    try:
+        coll.create_index("date", unique=True)
+    except OperationFailure as e:
+        # existing duplicate dates block the unique index; upserts still key on date
+        print(f"⚠️ Could not create unique index on date ({e}); run dedupe first.", file=sys.stderr)
+
+def upsert_batched(coll, docs, batch_size=BATCH_SIZE):
+    """
+    Unordered ReplaceOne upserts in batches, skipping docs whose content hash is unchanged.
+    Returns (inserted, replaced, unchanged).
+    """
+    inserted = replaced = unchanged = 0
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start : start + batch_size]
+        with mongo_connection.timed_query("load_history:existing_hashes"):
+            existing = {
+                d["date"]: d.get("content_hash")
+                for d in coll.find({"date": {"$in": [d["date"] for d in batch]}}, {"_id": 0, "date": 1, "content_hash": 1})
+            }
+        ops = []
+        for doc in batch:
+            h = content_hash(doc)
+            if existing.get(doc["date"]) == h:
+                unchanged += 1
                 continue
-            parts = line.split()
-            if len(parts) >= 6:
-                try:
-                    # expected format: YYYY Mon DD F107 A_index Kp
-                    date = pd.to_datetime(f"{parts[0]} {parts[1]} {parts[2]}", dayfirst=False)
-                    rows.append({
-                        "date": date.to_pydatetime(),
-                        "f107": float(parts[3]),
-                        "a_index": float(parts[4]),
-                        "kp_max": float(parts[5])
-                    })
-                except Exception:
-                    # skip malformed lines silently
-                    continue
-    return rows
+            ops.append(ReplaceOne({"date": doc["date"]}, {**doc, "content_hash": h}, upsert=True))
+        if ops:
+            res = coll.bulk_write(ops, ordered=False)
+            inserted += res.upserted_count
+            replaced += res.modified_count
+    return inserted, replaced, unchanged
 
 def main():
+    parser = argparse.ArgumentParser(description="Load the NOAA 27-day archive into Mongo history")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
     input_file = find_input_file()
     if not input_file:
         print("❌ Forecast file not found in expected locations.", file=sys.stderr)
@@ -76,21 +109,24 @@ def main():
         print("❌ No parsable rows found in", input_file, file=sys.stderr)
         sys.exit(1)
 
-    client = MongoClient(MONGO_URL)
-    db = client[DB_NAME]
-    coll = db[COL]
-
-    # Upsert each doc (idempotent, safe). Uses date field as unique key.
-    upserted = 0
-    for doc in docs:
-        res = coll.replace_one({"date": doc["date"]}, doc, upsert=True)
-        # count a real upsert/replace as upserted for reporting
-        if res.upserted_id is not None:
-            upserted += 1
-
-    count = coll.count_documents({})
-    client.close()
-    print(f"✅ Upserted/Ensured {len(docs)} docs. Newly inserted: {upserted}. Collection now has {count} documents.")
+    # later bulletins win for repeated dates (same result as the old sequential replace loop)
+    docs = list({doc["date"]: doc for doc in docs}.values())
+
+    coll = mongo_connection.get_mongo_collection(COL)
+
+    ensure_date_index(coll)
+    t0 = time.perf_counter()
+    inserted, replaced, unchanged = upsert_batched(coll, docs, args.batch_size)
+    elapsed = time.perf_counter() - t0
+    if inserted or replaced:
+        # archive rows land at/below the cache's high-water mark, which its $gt sync never re-reads
+        history_cache.invalidate_cache()
+
+    count = coll.estimated_document_count()
+    rate = len(docs) / elapsed if elapsed > 0 else float("inf")
+    print(f"✅ Ensured {len(docs)} docs in {elapsed:.2f}s ({rate:.0f} rows/s). "
+          f"Inserted: {inserted}, replaced: {replaced}, unchanged: {unchanged}. "
+          f"Collection now has ~{count} documents.")
 
 if __name__ == "__main__":
     main()
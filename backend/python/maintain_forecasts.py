@@ -0,0 +1,129 @@
+# backend/python/maintain_forecasts.py  -- dedupe + rolling retention for forecast_lstm_27day
+# Duplicates are found server-side: an aggregation groups by date, keeps the smallest _id and
+# $merge-s the surplus _ids into a scratch collection; deletes then run in bounded batches.
+# Afterwards a unique index on date stops duplicates from coming back.
+#
+# Usage (from backend folder):
+#   python python/maintain_forecasts.py --dry-run                 # report counts only
+#   python python/maintain_forecasts.py                           # dedupe + unique index
+#   python python/maintain_forecasts.py --keep-days 3650          # also drop rows older than 10 years
+#   python python/maintain_forecasts.py --before 2025-07-27       # also drop rows before a fixed date
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta
+
+from pymongo.errors import OperationFailure
+
+import history_cache
+import mongo_connection
+
+# ===================== Config =====================
+COLLECTION = "forecast_lstm_27day"
+BATCH_SIZE = 1000
+
+# ===================== Dedupe =====================
+def duplicate_groups_pipeline():
+    return [
+        {"$sort": {"date": 1, "_id": 1}},
+        {"$group": {"_id": "$date", "keep": {"$first": "$_id"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+
+def count_duplicates(coll):
+    pipeline = duplicate_groups_pipeline() + [
+        {"$group": {"_id": None, "dates": {"$sum": 1}, "surplus": {"$sum": {"$subtract": ["$count", 1]}}}},
+    ]
+    res = list(coll.aggregate(pipeline, allowDiskUse=True))
+    return (res[0]["dates"], res[0]["surplus"]) if res else (0, 0)
+
+def delete_ids_in_batches(coll, id_source, batch_size):
+    """Delete _ids streamed from `id_source` (a scratch collection) in batches of `batch_size`."""
+    deleted = 0
+    batch = []
+    for doc in id_source.find({}, {"_id": 1}).batch_size(batch_size):
+        batch.append(doc["_id"])
+        if len(batch) >= batch_size:
+            deleted += coll.delete_many({"_id": {"$in": batch}}).deleted_count
+            batch = []
+    if batch:
+        deleted += coll.delete_many({"_id": {"$in": batch}}).deleted_count
+    return deleted
+
+def dedupe(coll, batch_size=BATCH_SIZE):
+    """Keep the oldest document per date; returns number of documents deleted."""
+    scratch = coll.database[f"{coll.name}__dupes"]
+    scratch.drop()
+    pipeline = duplicate_groups_pipeline() + [
+        {"$unwind": "$ids"},
+        {"$match": {"$expr": {"$ne": ["$ids", "$keep"]}}},
+        {"$project": {"_id": "$ids"}},
+        {"$merge": {"into": scratch.name, "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+    ]
+    coll.aggregate(pipeline, allowDiskUse=True)
+    try:
+        return delete_ids_in_batches(coll, scratch, batch_size)
+    finally:
+        scratch.drop()
+
+def ensure_unique_date_index(coll):
+    try:
+        coll.create_index("date", unique=True)
+        return True
+    except OperationFailure as e:
+        print(f"⚠️ unique date index not created: {e}", file=sys.stderr)
+        return False
+
+# ===================== Retention =====================
+def retention_cutoff(keep_days=None, before=None):
+    if before:
+        return datetime.strptime(before, "%Y-%m-%d")
+    if keep_days is not None:
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - timedelta(days=keep_days)
+    return None
+
+def apply_retention(coll, cutoff, batch_size=BATCH_SIZE):
+    """Delete docs with date < cutoff, at most `batch_size` per delete."""
+    deleted = 0
+    query = {"date": {"$lt": cutoff}}
+    while True:
+        ids = [d["_id"] for d in coll.find(query, {"_id": 1}).limit(batch_size)]
+        if not ids:
+            return deleted
+        deleted += coll.delete_many({"_id": {"$in": ids}}).deleted_count
+
+# ===================== Main =====================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dedupe and apply retention to forecast_lstm_27day")
+    parser.add_argument("--collection", default=COLLECTION)
+    parser.add_argument("--keep-days", type=int, help="delete rows older than this many days")
+    parser.add_argument("--before", help="delete rows dated before YYYY-MM-DD")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--skip-dedupe", action="store_true")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change, change nothing")
+    args = parser.parse_args(argv)
+
+    coll = mongo_connection.get_mongo_collection(args.collection)
+    cutoff = retention_cutoff(args.keep_days, args.before)
+    report = {"collection": args.collection, "dry_run": args.dry_run,
+              "cutoff": cutoff.date().isoformat() if cutoff else None}
+    dup_dates, surplus = count_duplicates(coll) if not args.skip_dedupe else (0, 0)
+    report["duplicate_dates"] = dup_dates
+    report["duplicate_docs"] = surplus
+    report["expired_docs"] = coll.count_documents({"date": {"$lt": cutoff}}) if cutoff else 0
+
+    if not args.dry_run:
+        if not args.skip_dedupe:
+            report["deduped"] = dedupe(coll, args.batch_size)
+            report["unique_index"] = ensure_unique_date_index(coll)
+        if cutoff:
+            report["expired_deleted"] = apply_retention(coll, cutoff, args.batch_size)
+        if report.get("deduped") or report.get("expired_deleted"):
+            # cached rows at/below the high-water mark may now be gone
+            history_cache.invalidate_cache()
+
+    print(json.dumps(report))
+
+if __name__ == "__main__":
+    main()
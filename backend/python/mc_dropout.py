@@ -0,0 +1,148 @@
+# backend/python/mc_dropout.py  -- Monte Carlo dropout uncertainty bands for the residual LSTM
+# build_encoder_decoder has Dropout(0.2) before the Dense head. Keeping it active at inference
+# and sampling N forward passes gives a spread of residual forecasts; per-day quantiles of the
+# resulting values are the uncertainty band. The N passes are one batched call:
+#   keras  the input window tiled N times into one tensor, one model(x, training=True)
+#   numpy  NumpyEncoderDecoder.predict_mc: the LSTMs are deterministic, so they run once and
+#          only the N dropout masks + Dense head are sampled
+# (TFLite exports have no dropout op; the keras model is used for sampling instead.)
+#   FORECAST_MC_SAMPLES   passes per forecast (default 0 = point forecast only)
+#   FORECAST_QUANTILES    comma-separated, default 0.05,0.5,0.95
+#
+# Usage (from backend folder):
+#   python python/predict_lstm.py --mc-samples 100            # adds "quantiles" to each day
+#   python python/mc_dropout.py --bench --samples 10 100 --backends keras numpy
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+
+from windowing import build_inputs
+
+# ===================== Config =====================
+MC_SAMPLES = int(os.getenv("FORECAST_MC_SAMPLES", "0"))
+QUANTILES = tuple(float(q) for q in os.getenv("FORECAST_QUANTILES", "0.05,0.5,0.95").split(","))
+VARIABLES = ["f107", "a_index", "kp_max"]
+
+# ===================== Sampling =====================
+def supports_sampling(model):
+    if hasattr(model, "predict_mc"):
+        return True
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return False
+    return isinstance(model, tf.keras.Model)
+
+def sample(model, X, n_samples, seed=None):
+    """
+    n_samples stochastic passes over X (n, window, features) -> (n_samples, n, window, 3).
+    For Keras the seed only takes effect when the model's sampler is first traced (re-seeding
+    TensorFlow forces a retrace, which costs more than the sampling itself).
+    """
+    if hasattr(model, "predict_mc"):
+        return model.predict_mc(X, n_samples, seed=seed)
+    X = np.asarray(X, dtype=np.float32)
+    tiled = np.tile(X, (n_samples, 1, 1))  # sample-major: rows s*n .. s*n + n - 1 are pass s
+    out = _stochastic_fn(model, seed)(tiled).numpy()
+    return out.reshape((n_samples,) + X.shape[:2] + out.shape[2:])
+
+_stochastic_fns = {}
+
+def _stochastic_fn(model, seed=None):
+    """model(x, training=True) as a traced graph (eager calls are ~4x slower), one per model."""
+    import tensorflow as tf
+
+    fn = _stochastic_fns.get(id(model))
+    if fn is None or fn[0] is not model:
+        if seed is not None:
+            tf.random.set_seed(seed)
+        fn = (model, tf.function(lambda x: model(x, training=True), reduce_retracing=True))
+        _stochastic_fns[id(model)] = fn
+    return fn[1]
+
+def sample_loop(model, X, n_samples, seed=None):
+    """The naive version of sample(): one forward pass per sample (benchmark baseline)."""
+    if hasattr(model, "predict_mc"):
+        return np.stack([model.predict_mc(X, 1, seed=None if seed is None else seed + i)[0]
+                         for i in range(n_samples)])
+    X = np.asarray(X, dtype=np.float32)
+    fn = _stochastic_fn(model, seed)
+    return np.stack([fn(X).numpy() for _ in range(n_samples)])
+
+# ===================== Forecast =====================
+def sample_values(model, affine, values, n_samples, window=27, seed=None):
+    """(n_samples, window, 3) forecasts in real units from the trailing `window` rows of values."""
+    last_baseline = values[-window:]
+    X = build_inputs(affine.transform(last_baseline)[np.newaxis])
+    pred_res_scaled = sample(model, X, n_samples, seed=seed)[:, 0]
+    return affine.forecast(last_baseline, pred_res_scaled, out=pred_res_scaled)  # broadcast over samples
+
+def quantile_key(q):
+    return f"p{round(q * 100):02d}"
+
+def add_quantiles(results, samples, quantiles=QUANTILES):
+    """Attach {"quantiles": {variable: {"p05": .., "p50": .., "p95": ..}}} to each day in results."""
+    qs = np.quantile(samples, quantiles, axis=0)  # (n_quantiles, window, 3)
+    for i, day in enumerate(results):
+        day["quantiles"] = {var: {quantile_key(q): float(qs[j, i, v]) for j, q in enumerate(quantiles)}
+                            for v, var in enumerate(VARIABLES)}
+    return results
+
+def forecast_with_quantiles(point_forecast, model, affine, values, start_date, n_samples=MC_SAMPLES,
+                            quantiles=QUANTILES, window=27, seed=None):
+    """
+    point_forecast(model, affine, values, start_date, window=...) -- predict_lstm.forecast_from_values
+    -- plus per-day quantiles over n_samples dropout passes.
+    """
+    results = point_forecast(model, affine, values, start_date, window=window)
+    samples = sample_values(model, affine, values, n_samples, window=window, seed=seed)
+    return add_quantiles(results, samples, quantiles)
+
+# ===================== Benchmark =====================
+def bench(backends, sample_counts, repeat):
+    """Median ms of one deterministic predict vs N passes batched vs N passes in a loop."""
+    import inference_backend
+
+    report = []
+    X = np.random.default_rng(0).random((1, 27, 4), dtype=np.float32)
+    for backend in backends:
+        model = inference_backend.load_backend(backend)
+        if model is None or not supports_sampling(model):
+            report.append({"backend": backend, "error": "unavailable or no dropout sampling"})
+            continue
+
+        def timed(fn):
+            fn()  # first call traces / allocates
+            runs = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                fn()
+                runs.append(time.perf_counter() - t0)
+            return round(float(np.median(runs)) * 1000, 3)
+
+        single = timed(lambda: model.predict(X, verbose=0))
+        for n in sample_counts:
+            batched = timed(lambda: sample(model, X, n, seed=0))
+            loop = timed(lambda: sample_loop(model, X, n, seed=0))
+            report.append({"backend": backend, "samples": n, "single_predict_ms": single, "batched_ms": batched,
+                           "loop_ms": loop, "batched_vs_single": round(batched / single, 2),
+                           "loop_vs_batched": round(loop / batched, 1)})
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark batched Monte Carlo dropout sampling")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--backends", nargs="+", default=["keras", "numpy"])
+    parser.add_argument("--samples", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return
+    print(json.dumps(bench(args.backends, args.samples, args.repeat)))
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,116 @@
+# backend/python/mongo_connection.py  -- shared data-access layer for every Python script
+# One lazily created, pooled MongoClient per process (re-created after fork, since pymongo
+# clients are not fork-safe), configured from the environment:
+#   MONGODB_URI                        default mongodb://localhost:27018/
+#   MONGO_DB_NAME                      default noaa_database
+#   MONGO_MAX_POOL_SIZE / MONGO_MIN_POOL_SIZE
+#   MONGO_SERVER_SELECTION_TIMEOUT_MS / MONGO_CONNECT_TIMEOUT_MS / MONGO_SOCKET_TIMEOUT_MS
+#   MONGO_QUERY_LOG=1                  print per-query timings to stderr
+import os
+import sys
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
+import numpy as np
 from pymongo import MongoClient
 
-def get_mongo_collection():
-    client = MongoClient("mongodb://localhost:27018/")
-    db = client["noaa_database"]
-    collection = db["forecast_lstm_27day"]
-    return collection
+# ===================== Config =====================
+MONGO_URL = os.getenv("MONGODB_URI", "mongodb://localhost:27018/")
+DB_NAME = os.getenv("MONGO_DB_NAME", "noaa_database")
+HIST_COLLECTION = "forecast_lstm_27day"
+MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "60000"))
+QUERY_LOG = os.getenv("MONGO_QUERY_LOG", "0") == "1"
+VALUE_COLUMNS = ("f107", "a_index", "kp_max")
+
+# ===================== Client =====================
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """The process-wide pooled client, created on first use."""
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = MongoClient(
+                MONGO_URL,
+                maxPoolSize=MAX_POOL_SIZE,
+                minPoolSize=MIN_POOL_SIZE,
+                serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=CONNECT_TIMEOUT_MS,
+                socketTimeoutMS=SOCKET_TIMEOUT_MS,
+            )
+            _client_pid = os.getpid()
+    return _client
+
+def close_client():
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+atexit.register(close_client)
+
+def get_db(name=DB_NAME):
+    return get_client()[name]
+
+def get_mongo_collection(name=HIST_COLLECTION):
+    return get_db()[name]
+
+# ===================== Timing =====================
+_stats_lock = threading.Lock()
+_query_stats = {}
+
+@contextmanager
+def timed_query(label):
+    """Record wall time of the wrapped query under `label` (see query_stats())."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000.0
+        with _stats_lock:
+            s = _query_stats.setdefault(label, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["count"] += 1
+            s["total_ms"] += ms
+            s["max_ms"] = max(s["max_ms"], ms)
+        if QUERY_LOG:
+            print(f"ℹ️ mongo {label}: {ms:.1f} ms", file=sys.stderr)
+
+def query_stats():
+    with _stats_lock:
+        return {k: dict(v) for k, v in _query_stats.items()}
+
+# ===================== Typed reads =====================
+def read_series(collection=HIST_COLLECTION, columns=VALUE_COLUMNS, query=None, newest_first=False, limit=0):
+    """
+    Read (dates, values) straight into NumPy: dates as datetime64[ms] (n,), values float64 (n, k)
+    in `columns` order, sorted ascending by date. Missing fields become NaN.
+    With newest_first + limit, only the latest `limit` rows are read (still returned ascending).
+    """
+    coll = get_mongo_collection(collection)
+    projection = {"_id": 0, "date": 1, **{c: 1 for c in columns}}
+    with timed_query(f"read_series:{collection}"):
+        cursor = coll.find(query or {}, projection).sort("date", -1 if newest_first else 1)
+        if limit:
+            cursor = cursor.limit(limit)
+        docs = list(cursor)
+    if newest_first:
+        docs.reverse()
+    dates = np.array([d["date"] for d in docs], dtype="datetime64[ms]")
+    values = np.array([[d.get(c, np.nan) for c in columns] for d in docs], dtype="float64").reshape(len(docs), len(columns))
+    return dates, values
+
+def read_history_tail(n_rows, collection=HIST_COLLECTION, columns=VALUE_COLUMNS):
+    """The latest `n_rows` rows of history, ascending."""
+    return read_series(collection, columns, newest_first=True, limit=n_rows)
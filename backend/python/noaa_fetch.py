@@ -0,0 +1,89 @@
+# backend/python/noaa_fetch.py  -- conditional, cached fetch of the NOAA 27-day outlook
+# The outlook changes once a week, so the last bulletin is kept on disk with its ETag /
+# Last-Modified headers and :Issued: timestamp. Every fetch is a conditional GET; a 304 (or a
+# network failure) serves the snapshot instead of an empty string.
+#   NOAA_URL              override the source (e.g. a local stand-in server)
+#   NOAA_SNAPSHOT_DIR     where noaa_snapshot.txt / noaa_snapshot.json live (default: this folder)
+import os
+import sys
+import json
+from datetime import datetime
+
+import numpy as np
+import requests
+
+import atomic_io
+import noaa_parser
+
+# ===================== Config =====================
+NOAA_URL = os.getenv("NOAA_URL", "https://services.swpc.noaa.gov/text/27-day-outlook.txt")
+BASE_DIR = os.path.dirname(__file__)
+SNAPSHOT_DIR = os.getenv("NOAA_SNAPSHOT_DIR", BASE_DIR)
+SNAPSHOT_TEXT = os.path.join(SNAPSHOT_DIR, "noaa_snapshot.txt")
+SNAPSHOT_META = os.path.join(SNAPSHOT_DIR, "noaa_snapshot.json")
+TIMEOUT = 15
+
+# ===================== Snapshot =====================
+def load_snapshot():
+    """(text, meta) of the stored bulletin, or ("", {}) if there is none."""
+    if not (os.path.exists(SNAPSHOT_TEXT) and os.path.exists(SNAPSHOT_META)):
+        return "", {}
+    try:
+        with open(SNAPSHOT_TEXT, "r", encoding="utf-8") as f:
+            text = f.read()
+        with open(SNAPSHOT_META, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return text, meta
+    except Exception as e:
+        print("⚠️ NOAA snapshot unreadable:", e, file=sys.stderr)
+        return "", {}
+
+def issued_of(text):
+    """ISO timestamp of the (last) :Issued: header in `text`, or None."""
+    bulletins = noaa_parser.parse_noaa_text(text).bulletins
+    bulletins = bulletins[~np.isnat(bulletins)]
+    return str(bulletins[-1]) if bulletins.size else None
+
+def save_snapshot(text, response):
+    meta = {
+        "url": NOAA_URL,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "issued": issued_of(text),
+        "fetched_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+    }
+    atomic_io.write_text(SNAPSHOT_TEXT, text)
+    atomic_io.write_text(SNAPSHOT_META, json.dumps(meta))
+    return meta
+
+# ===================== Fetch =====================
+def fetch_bulletin():
+    """
+    Conditional fetch. Returns {"text", "issued", "status"} where status is
+    "fresh" (new 200), "not_modified" (304), "offline" (request failed, snapshot served)
+    or "unavailable" (request failed, no snapshot).
+    """
+    text, meta = load_snapshot()
+    headers = {}
+    if text and meta.get("url") == NOAA_URL:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        r = requests.get(NOAA_URL, headers=headers, timeout=TIMEOUT)
+        if r.status_code == 304 and text:
+            return {"text": text, "issued": meta.get("issued"), "status": "not_modified"}
+        r.raise_for_status()
+        meta = save_snapshot(r.text, r)
+        return {"text": r.text, "issued": meta["issued"], "status": "fresh"}
+    except Exception as e:
+        if text:
+            print(f"⚠️ NOAA fetch failed ({e}); using snapshot issued {meta.get('issued')}", file=sys.stderr)
+            return {"text": text, "issued": meta.get("issued"), "status": "offline"}
+        print("❌ NOAA fetch failed and no snapshot:", e, file=sys.stderr)
+        return {"text": "", "issued": None, "status": "unavailable"}
+
+def fetch_noaa_text():
+    return fetch_bulletin()["text"]
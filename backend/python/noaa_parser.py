@@ -0,0 +1,136 @@
+# backend/python/noaa_parser.py  -- shared parser for the NOAA 27-day outlook text format (27DO.txt)
+# Handles a single bulletin or a concatenated archive of many. Rows look like
+#   2019 Jan 07      72           8          3
+# and each bulletin header carries
+#   :Issued: 2019 Jan 07 0558 UTC
+# Dates are built from a month lookup table and converted to datetime64 in one vectorized step
+# (no per-line pd.to_datetime). Lines that look like data but do not parse are counted, not hidden.
+import re
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+MONTHS = {m: i for i, m in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], start=1)}
+
+_ROW_RE = re.compile(r"\s*(\d{4})\s+([A-Za-z]{3})\s+(\d{1,2})\s+(\S+)\s+(\S+)\s+(\S+)")
+_ISSUED_RE = re.compile(r":Issued:\s*(\d{4})\s+([A-Za-z]{3})\s+(\d{1,2})\s+(\d{2})(\d{2})")
+
+class NoaaParseResult(NamedTuple):
+    dates: np.ndarray          # datetime64[D], one per row, in file order
+    f107: np.ndarray           # float64
+    a_index: np.ndarray        # float64
+    kp_max: np.ndarray         # float64
+    issued: np.ndarray         # datetime64[m] issue time of the bulletin each row belongs to (NaT if none)
+    bulletins: np.ndarray      # datetime64[m], one per :Issued: header
+    malformed: int             # data-looking lines that could not be parsed
+    malformed_lines: list      # first few offending lines, for error messages
+
+def _to_datetime64(years, months, days):
+    """Vectorized Y/M/D -> datetime64[D]; returns (dates, valid_mask) rejecting e.g. Feb 30."""
+    years = np.asarray(years, dtype="int64")
+    months = np.asarray(months, dtype="int64")
+    days = np.asarray(days, dtype="int64")
+    month_start = (years - 1970).astype("datetime64[Y]").astype("datetime64[M]") + (months - 1).astype("timedelta64[M]")
+    dates = month_start.astype("datetime64[D]") + (days - 1).astype("timedelta64[D]")
+    valid = (days >= 1) & (dates.astype("datetime64[M]") == month_start)
+    return dates, valid
+
+def parse_noaa_text(text, keep_malformed=5):
+    """Parse one bulletin or a whole archive in a single pass over the buffer."""
+    years, months, days, f107, a_index, kp_max, row_issue = [], [], [], [], [], [], []
+    issue_parts = []
+    malformed_lines = []
+    malformed = 0
+    current_issue = -1
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped[0] == ":":
+            m = _ISSUED_RE.match(stripped)
+            if m:
+                issue_parts.append(m.groups())
+                current_issue = len(issue_parts) - 1
+            continue
+        if stripped[0] == "#":
+            continue
+        m = _ROW_RE.match(stripped)
+        month = MONTHS.get(m.group(2).title()) if m else None
+        if month is None:
+            if stripped[0].isdigit():
+                malformed += 1
+                if len(malformed_lines) < keep_malformed:
+                    malformed_lines.append(stripped)
+            continue
+        try:
+            vals = float(m.group(4)), float(m.group(5)), float(m.group(6))
+        except ValueError:
+            malformed += 1
+            if len(malformed_lines) < keep_malformed:
+                malformed_lines.append(stripped)
+            continue
+        years.append(int(m.group(1)))
+        months.append(month)
+        days.append(int(m.group(3)))
+        f107.append(vals[0])
+        a_index.append(vals[1])
+        kp_max.append(vals[2])
+        row_issue.append(current_issue)
+
+    dates, valid = _to_datetime64(years, months, days)
+    if not valid.all():
+        bad = np.flatnonzero(~valid)
+        malformed += int(bad.size)
+        for i in bad[: max(0, keep_malformed - len(malformed_lines))]:
+            malformed_lines.append(f"{years[i]} {months[i]:02d} {days[i]:02d} (invalid date)")
+
+    bulletins = np.empty(0, dtype="datetime64[m]")
+    if issue_parts:
+        iy, imon, iday, ihh, imm = zip(*issue_parts)
+        bdates, bvalid = _to_datetime64(iy, [MONTHS.get(m.title(), 1) for m in imon], iday)
+        bulletins = (bdates.astype("datetime64[m]")
+                     + (np.asarray(ihh, dtype="int64") * 60 + np.asarray(imm, dtype="int64")).astype("timedelta64[m]"))
+        bulletins[~bvalid] = np.datetime64("NaT")
+
+    row_issue = np.asarray(row_issue, dtype="int64")
+    issued = np.full(row_issue.shape, np.datetime64("NaT"), dtype="datetime64[m]")
+    has_issue = row_issue >= 0
+    issued[has_issue] = bulletins[row_issue[has_issue]]
+
+    return NoaaParseResult(
+        dates=dates[valid],
+        f107=np.asarray(f107, dtype="float64")[valid],
+        a_index=np.asarray(a_index, dtype="float64")[valid],
+        kp_max=np.asarray(kp_max, dtype="float64")[valid],
+        issued=issued[valid],
+        bulletins=bulletins,
+        malformed=malformed,
+        malformed_lines=malformed_lines,
+    )
+
+def parse_noaa_file(path, encoding="utf-8"):
+    with open(path, "r", encoding=encoding) as f:
+        return parse_noaa_text(f.read())
+
+def to_frame(result, with_issued=False):
+    """DataFrame(date, f107, a_index, kp_max[, issued]) in file order."""
+    data = {
+        "date": result.dates.astype("datetime64[ns]"),
+        "f107": result.f107,
+        "a_index": result.a_index,
+        "kp_max": result.kp_max,
+    }
+    if with_issued:
+        data["issued"] = result.issued.astype("datetime64[ns]")
+    return pd.DataFrame(data)
+
+def to_records(result):
+    """List of {"date": datetime, "f107", "a_index", "kp_max"} dicts (Mongo-ready, naive UTC)."""
+    dates = result.dates.astype("datetime64[ms]").tolist()
+    return [
+        {"date": d, "f107": float(f), "a_index": float(a), "kp_max": float(k)}
+        for d, f, a, k in zip(dates, result.f107, result.a_index, result.kp_max)
+    ]
@@ -0,0 +1,236 @@
+# backend/python/numpy_lstm.py  -- NumPy forward pass of the residual encoder-decoder
+# Exactly the architecture of predict_lstm.build_encoder_decoder:
+#   Input(27, 4) -> LSTM(128, return_state) -> RepeatVector(27) -> LSTM(128, return_sequences,
+#   initial_state=encoder state) -> Dropout (identity at inference) -> TimeDistributed(Dense(3, sigmoid))
+# Weights are read with h5py straight from trained_lstm.keras, either the legacy HDF5 layout
+# (model_weights/<layer>/...) or the Keras v3 zip (model.weights.h5: layers/<layer>/cell/vars/N).
+# Keras packs the four LSTM gates as [i, f, c, o] along the last axis of kernel / recurrent_kernel /
+# bias. Inputs are projected for all timesteps in one matmul; the decoder input is the same
+# vector every step, so its projection is computed once. State/gate buffers are preallocated per
+# batch size and reused, so repeated forecasts do not allocate.
+#
+# Usage (from backend folder):
+#   python python/numpy_lstm.py --check          # compare with Keras and time both
+import io
+import os
+import sys
+import json
+import time
+import zipfile
+import argparse
+import threading
+
+import numpy as np
+import h5py
+
+# ===================== Config =====================
+BASE_DIR = os.path.dirname(__file__)
+MODEL_FILE = os.path.join(BASE_DIR, "trained_lstm.keras")
+
+# ===================== Weights =====================
+def _layer_configs(config):
+    return [(l["class_name"], l["config"]["name"]) for l in config["config"]["layers"]]
+
+def _dropout_rate(config):
+    rates = [l["config"].get("rate", 0.0) for l in config["config"]["layers"] if l["class_name"] == "Dropout"]
+    return float(rates[0]) if rates else 0.0
+
+def _legacy_weights(f, name):
+    group = f["model_weights"][name]
+    names = [n.decode() if isinstance(n, bytes) else n for n in group.attrs["weight_names"]]
+    return [np.asarray(group[n], dtype=np.float32) for n in names]
+
+def _v3_weights(f, name, sub):
+    vars_group = f["layers"][name][sub]["vars"]
+    return [np.asarray(vars_group[k], dtype=np.float32) for k in sorted(vars_group, key=int)]
+
+def load_weights(path=MODEL_FILE):
+    """{"encoder": (W, U, b), "decoder": (W, U, b), "dense": (W, b), "dropout": rate} from a saved model."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as z:
+            config = json.loads(z.read("config.json"))
+            weights_bytes = z.read("model.weights.h5")
+        with h5py.File(io.BytesIO(weights_bytes), "r") as f:
+            layers = _layer_configs(config)
+            lstms = [_v3_weights(f, n, "cell") for cls, n in layers if cls == "LSTM"]
+            dense = [_v3_weights(f, n, "layer") for cls, n in layers if cls == "TimeDistributed"]
+    else:
+        with h5py.File(path, "r") as f:
+            config = json.loads(f.attrs["model_config"])
+            layers = _layer_configs(config)
+            lstms = [_legacy_weights(f, n) for cls, n in layers if cls == "LSTM"]
+            dense = [_legacy_weights(f, n) for cls, n in layers if cls == "TimeDistributed"]
+    if len(lstms) != 2 or len(dense) != 1:
+        raise ValueError(f"{path}: expected 2 LSTM layers and 1 TimeDistributed Dense, "
+                         f"found {len(lstms)} and {len(dense)}")
+    return {"encoder": tuple(lstms[0]), "decoder": tuple(lstms[1]), "dense": tuple(dense[0]),
+            "dropout": _dropout_rate(config)}
+
+# ===================== Forward pass =====================
+def _sigmoid(x, out):
+    np.negative(x, out=out)
+    np.exp(out, out=out)
+    out += 1.0
+    np.reciprocal(out, out=out)
+    return out
+
+class NumpyEncoderDecoder:
+    """Drop-in for the Keras model's predict(): (n, window, 4) float32 -> (n, window, 3)."""
+
+    def __init__(self, weights):
+        self.enc_W, self.enc_U, self.enc_b = weights["encoder"]
+        self.dec_W, self.dec_U, self.dec_b = weights["decoder"]
+        self.dense_W, self.dense_b = weights["dense"]
+        self.dropout_rate = weights.get("dropout", 0.0)
+        self.units = self.enc_U.shape[0]
+        self.input_shape = (None, None, self.enc_W.shape[0])
+        self._buffers = {}
+        self._lock = threading.Lock()  # buffers are shared, e.g. by forecast_server threads
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        return cls(load_weights(path))
+
+    def _buffers_for(self, batch, steps):
+        key = (batch, steps)
+        buf = self._buffers.get(key)
+        if buf is None:
+            u = self.units
+            buf = {
+                "xw": np.empty((batch, steps, 4 * u), np.float32),  # encoder input projections
+                "dec_xw": np.empty((batch, 4 * u), np.float32),     # decoder input projection
+                "z": np.empty((batch, 4 * u), np.float32),          # gate pre-activations
+                "act": np.empty((batch, 4 * u), np.float32),
+                "h": np.empty((batch, u), np.float32),
+                "c": np.empty((batch, u), np.float32),
+                "tmp": np.empty((batch, u), np.float32),
+                "hs": np.empty((batch, steps, u), np.float32),      # decoder outputs
+            }
+            self._buffers[key] = buf
+        return buf
+
+    def _step(self, xw_t, U, buf):
+        """One LSTM step in place on buf["h"], buf["c"] given the input projection xw_t."""
+        u = self.units
+        z, act, h, c, tmp = buf["z"], buf["act"], buf["h"], buf["c"], buf["tmp"]
+        np.matmul(h, U, out=z)
+        z += xw_t
+        _sigmoid(z[:, : 2 * u], act[:, : 2 * u])          # i, f
+        np.tanh(z[:, 2 * u : 3 * u], out=act[:, 2 * u : 3 * u])  # candidate
+        _sigmoid(z[:, 3 * u :], act[:, 3 * u :])          # o
+        c *= act[:, u : 2 * u]
+        np.multiply(act[:, :u], act[:, 2 * u : 3 * u], out=tmp)
+        c += tmp
+        np.tanh(c, out=tmp)
+        np.multiply(act[:, 3 * u :], tmp, out=h)
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        if batch_size and X.shape[0] > batch_size:
+            return np.concatenate([self.predict(X[i : i + batch_size]) for i in range(0, X.shape[0], batch_size)])
+        with self._lock:
+            return self._forward(X)
+
+    def predict_mc(self, X, n_samples, seed=None):
+        """
+        Monte Carlo dropout: (n_samples, n, window, 3) with the Dropout layer active. Dropout sits
+        between the decoder and the Dense head, so the LSTMs run once and only the masks and the
+        Dense projection are sampled -- one batched matmul for all samples.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        with self._lock:
+            hs = self._recurrent(X).copy()
+        keep = 1.0 - self.dropout_rate
+        rng = np.random.default_rng(seed)
+        dropped = hs * ((rng.random((n_samples,) + hs.shape, dtype=np.float32) < keep) / np.float32(keep))
+        out = dropped @ self.dense_W
+        out += self.dense_b
+        with np.errstate(over="ignore"):
+            return _sigmoid(out, out)
+
+    @np.errstate(over="ignore")  # exp(-x) -> inf is the correct sigmoid limit
+    def _forward(self, X):
+        out = self._recurrent(X) @ self.dense_W  # fresh array: callers keep results across calls
+        out += self.dense_b
+        return _sigmoid(out, out)
+
+    @np.errstate(over="ignore")
+    def _recurrent(self, X):
+        """Encoder + decoder; returns the decoder outputs (a reused buffer, copy to keep)."""
+        n, steps, _ = X.shape
+        buf = self._buffers_for(n, steps)
+        h, c = buf["h"], buf["c"]
+
+        # encoder
+        np.matmul(X, self.enc_W, out=buf["xw"])
+        buf["xw"] += self.enc_b
+        h.fill(0.0)
+        c.fill(0.0)
+        for t in range(steps):
+            self._step(buf["xw"][:, t], self.enc_U, buf)
+
+        # decoder: RepeatVector(h_enc) input, starts from the encoder state
+        np.matmul(h, self.dec_W, out=buf["dec_xw"])
+        buf["dec_xw"] += self.dec_b
+        for t in range(steps):
+            self._step(buf["dec_xw"], self.dec_U, buf)
+            buf["hs"][:, t] = h
+        return buf["hs"]
+
+def load(path=MODEL_FILE):
+    if not os.path.exists(path):
+        return None
+    try:
+        model = NumpyEncoderDecoder.load(path)
+        print("ℹ️ loaded numpy model", file=sys.stderr)
+        return model
+    except Exception as e:
+        print("⚠️ failed loading numpy model:", e, file=sys.stderr)
+        return None
+
+# ===================== CLI =====================
+def check(path, batch_sizes, repeat):
+    """Max |numpy - keras| and median predict time of both per batch size."""
+    from tensorflow.keras.models import load_model
+
+    keras_model = load_model(path, compile=False)
+    np_model = NumpyEncoderDecoder.load(path)
+    rng = np.random.default_rng(0)
+    report = []
+    for n in batch_sizes:
+        X = rng.random((n, keras_model.input_shape[1], keras_model.input_shape[2]), dtype=np.float32)
+        ref = keras_model.predict(X, verbose=0)
+        got = np_model.predict(X)
+        timings = {}
+        for name, fn in (("keras", lambda: keras_model.predict(X, verbose=0)), ("numpy", lambda: np_model.predict(X))):
+            runs = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                fn()
+                runs.append(time.perf_counter() - t0)
+            timings[f"{name}_ms"] = round(float(np.median(runs)) * 1000, 3)
+        report.append({"batch": n, "max_abs_diff": float(np.abs(ref - got).max()), **timings})
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NumPy forward pass of the residual LSTM")
+    parser.add_argument("--model", default=MODEL_FILE)
+    parser.add_argument("--check", action="store_true", help="compare against Keras and time both")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 512])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--atol", type=float, default=1e-5)
+    args = parser.parse_args(argv)
+
+    if not args.check:
+        parser.print_help()
+        return
+    report = check(args.model, args.batch_sizes, args.repeat)
+    print(json.dumps(report))
+    worst = max(r["max_abs_diff"] for r in report)
+    if worst > args.atol:
+        print(f"❌ numpy forward pass differs from Keras by {worst:.2e} (> {args.atol:.0e})", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ numpy forward pass matches Keras (max |diff| {worst:.2e})", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,103 +1,151 @@
 import os
 import json
-import pandas as pd
+import argparse
 import numpy as np
-import requests
-from sklearn.linear_model import LinearRegression
 from datetime import timedelta
-from pymongo import MongoClient
+
+from history_cache import load_history as load_cached_history
+import noaa_parser
+import noaa_fetch
+import mongo_connection
+import calendar_merge
 
 # === MongoDB Config ===
-MONGO_URL = "mongodb://localhost:27018/"
-DB_NAME = "noaa_database"
 COLLECTION_NAME = "forecast_lstm_27day"
 
-# === NOAA URL ===
-NOAA_URL = "https://services.swpc.noaa.gov/text/27-day-outlook.txt"
-
 # --- Step 1: Fetch latest NOAA TXT ---
 def fetch_noaa():
-    try:
-        res = requests.get(NOAA_URL, timeout=10)
-        res.raise_for_status()
-        return res.text
-    except:
-        return ""
+    # conditional GET with on-disk snapshot fallback (see noaa_fetch.py)
+    return noaa_fetch.fetch_noaa_text()
 
 # --- Step 2: Parse NOAA TXT ---
 def parse_noaa(txt):
-    data = []
-    for line in txt.splitlines():
-        if line.strip() == "" or line.startswith(":") or line.startswith("#"):
-            continue
-        parts = line.split()
-        if len(parts) >= 6:
-            try:
-                date = pd.to_datetime(f"{parts[0]} {parts[1]} {parts[2]}")
-                rf = int(parts[3])
-                ai = int(parts[4])
-                kp = int(parts[5])
-                data.append([date, rf, ai, kp])
-            except:
-                continue
-    return pd.DataFrame(data, columns=["date", "radio_flux", "a_index", "kp_index"])
+    df = noaa_parser.to_frame(noaa_parser.parse_noaa_text(txt))
+    df = df.rename(columns={"f107": "radio_flux", "kp_max": "kp_index"})
+    df[["radio_flux", "a_index", "kp_index"]] = df[["radio_flux", "a_index", "kp_index"]].astype(int)
+    return df
 
 # --- Step 3: Get historical data from MongoDB ---
 def get_historical():
-    client = MongoClient(MONGO_URL)
-    db = client[DB_NAME]
-    coll = db[COLLECTION_NAME]
-    docs = list(coll.find({}, {"_id": 0}))
-    client.close()
-    if len(docs) == 0:
-        return pd.DataFrame(columns=["date", "radio_flux", "a_index", "kp_index"])
-    return pd.DataFrame(docs)
+    coll = mongo_connection.get_mongo_collection(COLLECTION_NAME)
+    # sorted, projected and incremental via the local history cache
+    df = load_cached_history(coll)
+    return df.rename(columns={"f107": "radio_flux", "kp_max": "kp_index"})
 
 # --- Step 4: Merge historical + latest NOAA ---
 def merge_data(historical, latest):
-    if not historical.empty:
-        historical['date'] = pd.to_datetime(historical['date'])
-    latest['date'] = pd.to_datetime(latest['date'])
-    df = pd.concat([historical, latest])
-    df = df.drop_duplicates(subset="date").sort_values("date").reset_index(drop=True)
-    df[['radio_flux', 'a_index', 'kp_index']] = df[['radio_flux', 'a_index', 'kp_index']].interpolate(method='linear').bfill().ffill()
-    return df
+    # dense daily calendar, history wins on shared dates, gaps interpolated in time
+    # (the regression below uses the row number as time, so every row must be one day)
+    return calendar_merge.merge_daily([historical, latest], ['radio_flux', 'a_index', 'kp_index']).frame
 
-# --- Step 5: Linear Regression Forecast ---
-def forecast_linear(df, latest_noaa, days=27):
-    results = []
-    X = np.arange(len(df)).reshape(-1,1)
+# --- Step 5: Least-squares trend forecast ---
+# y(t) = a + b*t [+ c*sin(2*pi*t/27) + d*cos(2*pi*t/27)] fitted to all three columns in one
+# least-squares solve, over the last FIT_WINDOW rows (0 = whole history, as before) with t the
+# row number inside the fit window. Rows must be consecutive days (see merge_data).
+COLUMNS = ['radio_flux', 'a_index', 'kp_index']
+ROTATION_DAYS = 27
+FIT_WINDOW = int(os.getenv("LINEAR_FIT_WINDOW", "0"))
+HARMONIC = os.getenv("LINEAR_HARMONIC", "0") == "1"
+
+def trend_basis(t, harmonic=HARMONIC):
+    """Design rows for times t (any shape) -> t.shape + (2 or 4,)."""
+    t = np.asarray(t, dtype='float64')
+    cols = [np.ones_like(t), t]
+    if harmonic:
+        phase = 2 * np.pi * t / ROTATION_DAYS
+        cols += [np.sin(phase), np.cos(phase)]
+    return np.stack(cols, axis=-1)
+
+def fit_trend(values, fit_window=FIT_WINDOW, harmonic=HARMONIC):
+    """Coefficients (n_basis, n_columns) for the trailing fit window of values (n, n_columns)."""
+    values = np.asarray(values, dtype='float64')
+    if fit_window:
+        values = values[-fit_window:]
+    coef, *_ = np.linalg.lstsq(trend_basis(np.arange(len(values)), harmonic), values, rcond=None)
+    return coef
+
+def forecast_trend(values, days=27, fit_window=FIT_WINDOW, harmonic=HARMONIC):
+    """Next `days` rows after values (n, n_columns) -> (days, n_columns)."""
+    n = min(len(values), fit_window) if fit_window else len(values)
+    return trend_basis(np.arange(n, n + days), harmonic) @ fit_trend(values, fit_window, harmonic)
 
-    # Predict each column separately
-    preds = {}
-    for col in ['radio_flux', 'a_index', 'kp_index']:
-        y = df[col].values
-        model = LinearRegression()
-        model.fit(X, y)
-        future_X = np.arange(len(df), len(df)+days).reshape(-1,1)
-        preds[col] = model.predict(future_X)
+def _window_sums(f, origins, starts):
+    """sum(f[starts[i]:origins[i]]) along axis 0 for every i, from one cumulative sum."""
+    c = np.concatenate([np.zeros((1,) + f.shape[1:]), np.cumsum(f, axis=0)])
+    return c[origins] - c[starts]
+
+def forecast_origins(values, origins, days=27, fit_window=FIT_WINDOW, harmonic=HARMONIC):
+    """
+    forecast_trend from many origins at once: origin o fits rows [o - fit_window, o) (or [0, o))
+    and predicts rows o .. o + days - 1. Uses rolling sums, so the cost is O(len(values)) plus a
+    batched k x k solve, independent of the fit window. Returns (n_origins, days, n_columns).
+    """
+    y = np.asarray(values, dtype='float64')
+    origins = np.asarray(origins, dtype=np.int64)
+    starts = np.maximum(origins - fit_window, 0) if fit_window else np.zeros_like(origins)
+    lengths = origins - starts
+
+    # X^T X only depends on the window length when t counts from the window start
+    basis = trend_basis(np.arange(lengths.max(initial=0)), harmonic)
+    gram = np.concatenate([np.zeros((1,) + basis.shape[1:] * 2),
+                           np.cumsum(basis[:, :, None] * basis[:, None, :], axis=0)])[lengths]
+
+    # X^T y from global cumulative sums, shifted to each window start s:
+    #   sum y*(t - s) = sum y*t - s * sum y,  sin/cos(w(t - s)) by the angle-difference identities
+    t = np.arange(len(y), dtype='float64')
+    sum_y = _window_sums(y, origins, starts)
+    moments = [sum_y, _window_sums(y * t[:, None], origins, starts) - starts[:, None] * sum_y]
+    if harmonic:
+        w = 2 * np.pi / ROTATION_DAYS
+        sin_s, cos_s = np.sin(w * starts)[:, None], np.cos(w * starts)[:, None]
+        ys = _window_sums(y * np.sin(w * t)[:, None], origins, starts)
+        yc = _window_sums(y * np.cos(w * t)[:, None], origins, starts)
+        moments += [ys * cos_s - yc * sin_s, yc * cos_s + ys * sin_s]
+    xty = np.stack(moments, axis=1)  # (n_origins, n_basis, n_columns)
+
+    # pinv: origins with too few rows for the basis still get the minimum-norm fit
+    coef = np.linalg.pinv(gram) @ xty
+    future = trend_basis(lengths[:, None] + np.arange(days), harmonic)  # (n_origins, days, n_basis)
+    return future @ coef
+
+def forecast_linear(df, latest_noaa, days=27, fit_window=FIT_WINDOW, harmonic=HARMONIC):
+    preds = forecast_trend(df[COLUMNS].values, days, fit_window, harmonic)
 
     # Use latest NOAA date as starting point
+    results = []
     last_date = latest_noaa['date'].max()
     for i in range(days):
         fdate = (last_date + timedelta(days=i+1)).date().isoformat()
+        rf, ai, kp = preds[i]
         results.append({
             "date": fdate,
-            "radio_flux": int(round(preds['radio_flux'][i])),
-            "a_index": int(round(preds['a_index'][i])),
-            "kp_index": int(round(preds['kp_index'][i]))
+            "radio_flux": int(round(rf)),
+            "a_index": int(round(ai)),
+            "kp_index": int(round(kp))
         })
     return results
 
 # === MAIN ===
-latest_txt = fetch_noaa()
-latest_noaa = parse_noaa(latest_txt)
-historical = get_historical()
-all_data = merge_data(historical, latest_noaa)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="27-day least-squares trend forecast")
+    parser.add_argument("--fit-window", type=int, default=FIT_WINDOW,
+                        help="fit on the last N days only (env LINEAR_FIT_WINDOW; 0 = whole history)")
+    parser.add_argument("--harmonic", action="store_true", default=HARMONIC,
+                        help="add a 27-day solar-rotation sin/cos term (env LINEAR_HARMONIC=1)")
+    args = parser.parse_args(argv)
+
+    latest_txt = fetch_noaa()
+    latest_noaa = parse_noaa(latest_txt)
+    historical = get_historical()
+    all_data = merge_data(historical, latest_noaa)
+
+    if all_data.empty or all_data.shape[0] < 10:
+        print("[]")
+        exit(0)
 
-if all_data.empty or all_data.shape[0] < 10:
-    print("[]")
-    exit(0)
+    predictions = forecast_linear(all_data, latest_noaa, days=27, fit_window=args.fit_window,
+                                  harmonic=args.harmonic)
+    print(json.dumps(predictions))
 
-predictions = forecast_linear(all_data, latest_noaa, days=27)
-print(json.dumps(predictions))
+if __name__ == "__main__":
+    main()
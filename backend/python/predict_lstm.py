@@ -2,92 +2,93 @@
 import os
 import sys
 import json
+import time
+import argparse
+_IMPORT_T0 = time.perf_counter()  # module import time is reported as the "imports" stage
 import numpy as np
 import pandas as pd
-import requests
 from datetime import timedelta
-from pymongo import MongoClient
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import Model, load_model
-from tensorflow.keras.layers import Input, LSTM, RepeatVector, TimeDistributed, Dense, Dropout
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
 import joblib
+# TensorFlow is imported inside the functions that build, train or load a Keras model, so the
+# NOAA-unchanged / no-data paths and light inference backends never pay its startup cost.
+# scikit-learn likewise only for fitting scalers: inference applies them through affine_transform.
+
+import atomic_io
+import noaa_parser
+import noaa_fetch
+import forecast_cache
+import calendar_merge
+import affine_transform
+import inference_backend
+import instrumentation
+import mc_dropout
+import mongo_connection
+import registry
+from history_cache import load_history as load_cached_history
+from windowing import build_inputs, build_xy
 
 # ===================== Config =====================
-MONGO_URL = os.getenv("MONGODB_URI", "mongodb://localhost:27018/")
-DB_NAME = "noaa_database"
 HIST_COLLECTION = "forecast_lstm_27day"
-NOAA_URL = "https://services.swpc.noaa.gov/text/27-day-outlook.txt"
 PRED_DAYS = 27
 BASE_DIR = os.path.dirname(__file__)
 MODEL_FILE = os.path.join(BASE_DIR, "trained_lstm.keras")
 SCALER_FILE = os.path.join(BASE_DIR, "scaler.save")
 RES_SCALER_FILE = os.path.join(BASE_DIR, "residual_scaler.save")
+FEATURES = ["f107", "a_index", "kp_max"]
+LAST_FORECAST_FILE = os.path.join(BASE_DIR, "last_forecast.json")
 
 # ===================== Helpers =====================
 def fetch_noaa_text():
-    try:
-        r = requests.get(NOAA_URL, timeout=15)
-        r.raise_for_status()
-        return r.text
-    except Exception as e:
-        print("❌ fetch_noaa_text error:", e, file=sys.stderr)
-        return ""
+    # conditional GET with on-disk snapshot fallback (see noaa_fetch.py)
+    return noaa_fetch.fetch_noaa_text()
 
 def parse_noaa_text(txt):
-    rows = []
-    for line in txt.splitlines():
-        line = line.strip()
-        if not line or line.startswith(":") or line.startswith("#"):
-            continue
-        parts = line.split()
-        if len(parts) >= 6:
-            try:
-                date = pd.to_datetime(f"{parts[0]} {parts[1]} {parts[2]}", dayfirst=False)
-                rows.append({
-                    "date": pd.Timestamp(date).to_pydatetime(),
-                    "f107": float(parts[3]),
-                    "a_index": float(parts[4]),
-                    "kp_max": float(parts[5]),
-                })
-            except Exception:
-                continue
-    df = pd.DataFrame(rows)
+    result = noaa_parser.parse_noaa_text(txt)
+    if result.malformed:
+        print(f"⚠️ NOAA parse skipped {result.malformed} malformed line(s), e.g. {result.malformed_lines[:1]}",
+              file=sys.stderr)
+    df = noaa_parser.to_frame(result)
     return df.sort_values("date").reset_index(drop=True) if not df.empty else df
 
 def load_history_from_mongo():
     try:
-        client = MongoClient(MONGO_URL)
-        db = client[DB_NAME]
-        coll = db[HIST_COLLECTION]
-        docs = list(coll.find({}, {"_id": 0}).sort("date", 1))
-        client.close()
+        coll = mongo_connection.get_mongo_collection(HIST_COLLECTION)
+        # only the delta since the cached high-water mark is fetched (see history_cache.py)
+        df = load_cached_history(coll)
     except Exception as e:
         print("❌ load_history_from_mongo error:", e, file=sys.stderr)
         return pd.DataFrame(columns=["date", "f107", "a_index", "kp_max"])
-    if not docs:
-        return pd.DataFrame(columns=["date", "f107", "a_index", "kp_max"])
-    df = pd.DataFrame(docs)
-    df["date"] = pd.to_datetime(df["date"])
-    return df.sort_values("date").reset_index(drop=True)
-
-def merge_history_and_noaa(history_df, noaa_df):
-    """✅ Keep all history and append NOAA (removing duplicates)."""
-    if history_df.empty:
-        return noaa_df
-    if noaa_df.empty:
-        return history_df
-
-    df = pd.concat([history_df, noaa_df], ignore_index=True)
-    df = df.drop_duplicates(subset="date").sort_values("date").reset_index(drop=True)
+    return df
 
-    if not df.empty:
-        df[["f107", "a_index", "kp_max"]] = (
-            df[["f107", "a_index", "kp_max"]].interpolate(method="linear").bfill().ffill()
-        )
+def load_history_tail_from_mongo(n_rows):
+    """Only the latest `n_rows` history rows (ascending by date) -- all inference needs."""
+    columns = ["f107", "a_index", "kp_max"]
+    try:
+        dates, values = mongo_connection.read_history_tail(n_rows, HIST_COLLECTION, columns)
+    except Exception as e:
+        print("❌ load_history_tail_from_mongo error:", e, file=sys.stderr)
+        return pd.DataFrame(columns=["date"] + columns)
+    df = pd.DataFrame(values, columns=columns)
+    df.insert(0, "date", pd.to_datetime(dates))
     return df
 
+def merge_history_and_noaa(history_df, noaa_df):
+    """
+    ✅ History plus NOAA on a dense daily calendar (history wins on shared dates). Missing days
+    are interpolated in time and flagged in the "imputed" column; see calendar_merge.py.
+    """
+    merged = calendar_merge.merge_daily([history_df, noaa_df], FEATURES)
+    report = merged.report
+    if report["imputed_days"]:
+        worst = report["largest"][0]
+        print(f"⚠️ {report['imputed_days']} missing day(s) in {report['gaps']} gap(s) interpolated; "
+              f"longest {worst['days']}d from {worst['start']}", file=sys.stderr)
+    return merged.frame
+
 def build_encoder_decoder(window, n_features, n_targets, latent=128):
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Input, LSTM, RepeatVector, TimeDistributed, Dense, Dropout
+
     inp = Input(shape=(window, n_features))
     enc = LSTM(latent, return_state=True)(inp)
     _, state_h, state_c = enc
@@ -99,121 +100,449 @@ def build_encoder_decoder(window, n_features, n_targets, latent=128):
     model.compile(optimizer="adam", loss="mse", metrics=["mae"])
     return model
 
-# ===================== Main =====================
-def main():
-    noaa_text = fetch_noaa_text()
-    noaa_df = parse_noaa_text(noaa_text)
-    if noaa_df.empty:
-        print("[]")
-        print("❌ No NOAA 27-day data found; exiting.", file=sys.stderr)
-        sys.exit(0)
+def load_trained_model():
+    """Load the saved residual model, or return None if it is missing/unreadable."""
+    return inference_backend.load_keras(MODEL_FILE)
 
-    history_df = load_history_from_mongo()
-    print(f"ℹ️ history rows: {len(history_df)}", file=sys.stderr)
-    print(f"ℹ️ noaa rows: {len(noaa_df)}", file=sys.stderr)
+def load_inference_model(backend=None):
+    """
+    Forward-pass-only model for the configured FORECAST_BACKEND (see inference_backend.py),
+    falling back to the Keras model if that backend is unavailable.
+    """
+    art = registry.load(backend=backend)
+    return art.model if art else None
 
-    all_df = merge_history_and_noaa(history_df, noaa_df)
-    print(f"ℹ️ merged rows: {len(all_df)} (history + noaa)", file=sys.stderr)
+def forecast_from_values(model, affine, values, start_date, window=PRED_DAYS):
+    """
+    Predict the next PRED_DAYS days from the trailing `window` rows of `values`; `affine` is the
+    AffineScalers of the model's scaler pair (registry.load(...).affine).
+    """
+    last_baseline = values[-window:]
+    last_baseline_s = affine.transform(last_baseline)
 
-    window = 27
-    if all_df.empty or len(all_df) < window * 2:
-        print("[]")
-        print(f"❗ Need at least {window*2} rows. Found {len(all_df)}. Exiting.", file=sys.stderr)
-        sys.exit(0)
+    input_seq = build_inputs(last_baseline_s[np.newaxis])
+
+    pred_res_scaled = model.predict(input_seq, verbose=0)[0]
+    pred_actual = affine.forecast(last_baseline, pred_res_scaled, out=pred_res_scaled)
+
+    results = []
+    for i in range(PRED_DAYS):
+        fdate = (start_date + timedelta(days=i)).date().isoformat()
+        rf, ai, kp = pred_actual[i]
+        results.append({"date": fdate, "f107": float(rf), "a_index": float(ai), "kp_max": float(kp)})
+    return results
+
+def band_settings(mc_samples=mc_dropout.MC_SAMPLES, quantiles=mc_dropout.QUANTILES):
+    """
+    Monte Carlo settings (defaults: FORECAST_MC_SAMPLES / FORECAST_QUANTILES), or None for a
+    point forecast. They change the output, so they are part of the cache key / last-forecast check.
+    """
+    if mc_samples <= 0:
+        return None
+    return {"mc_samples": int(mc_samples), "quantiles": [float(q) for q in quantiles]}
 
-    values = all_df[["f107", "a_index", "kp_max"]].values.astype("float32")
+def forecast_with_bands(model, affine, values, start_date, window=PRED_DAYS, bands=None):
+    """forecast_from_values, plus per-day "quantiles" when bands (band_settings()) is given."""
+    if not bands:
+        return forecast_from_values(model, affine, values, start_date, window=window)
+    return mc_dropout.forecast_with_quantiles(forecast_from_values, model, affine, values, start_date,
+                                              n_samples=bands["mc_samples"], quantiles=bands["quantiles"],
+                                              window=window)
+
+# ===================== Training =====================
+def train_model(values, window, refit_scalers=False, train_opts=None, dates=None, imputed=None):
+    """
+    Fit (or load) both scalers on the full series and train a fresh residual model through the
+    tf.data trainer. train_opts: batch_size / seed / threads / deterministic (see trainer.py).
+    `dates` (one per row) records the training range in the artifact metadata; windows across
+    long runs of `imputed` days are left out.
+    """
     n_features = values.shape[1]
 
-    baselines, targets = [], []
-    for i in range(0, len(values) - 2 * window + 1):
-        baselines.append(values[i : i + window])
-        targets.append(values[i + window : i + 2 * window])
-    baselines, targets = np.array(baselines), np.array(targets)
-    print(f"ℹ️ baseline/target pairs: {baselines.shape}", file=sys.stderr)
+    n_pairs = len(values) - 2 * window + 1
+    print(f"ℹ️ baseline/target pairs: {(n_pairs, window, n_features)}", file=sys.stderr)
+
+    from sklearn.preprocessing import MinMaxScaler
 
     # === Scalers ===
-    if os.path.exists(SCALER_FILE):
+    if os.path.exists(SCALER_FILE) and not refit_scalers:
         scaler = joblib.load(SCALER_FILE)
         print("ℹ️ loaded existing scaler", file=sys.stderr)
     else:
+        # every row appears in some baseline or target window, so fitting the flat series
+        # gives the same min/max as fitting the stacked windows
         scaler = MinMaxScaler()
-        combined = np.vstack([baselines.reshape(-1, n_features), targets.reshape(-1, n_features)])
-        scaler.fit(combined)
-        joblib.dump(scaler, SCALER_FILE)
-        print("ℹ️ new scaler fitted and saved", file=sys.stderr)
+        scaler.fit(values)
+        print("ℹ️ new scaler fitted", file=sys.stderr)
 
-    bas_s = scaler.transform(baselines.reshape(-1, n_features)).reshape(baselines.shape)
-    tar_s = scaler.transform(targets.reshape(-1, n_features)).reshape(targets.shape)
+    values_s = scaler.transform(values).astype("float32")
 
-    Y_raw = tar_s - bas_s
-    if os.path.exists(RES_SCALER_FILE):
+    if os.path.exists(RES_SCALER_FILE) and not refit_scalers:
         res_scaler = joblib.load(RES_SCALER_FILE)
         print("ℹ️ loaded existing residual scaler", file=sys.stderr)
     else:
+        _, Y_raw, _, _ = build_xy(values_s, window)
         res_scaler = MinMaxScaler(feature_range=(0, 1))
         res_scaler.fit(Y_raw.reshape(-1, Y_raw.shape[-1]))
-        joblib.dump(res_scaler, RES_SCALER_FILE)
-        print("ℹ️ new residual scaler fitted and saved", file=sys.stderr)
-
-    Y = res_scaler.transform(Y_raw.reshape(-1, Y_raw.shape[-1])).reshape(Y_raw.shape)
-    print("Y (scaled residuals) min/max:", float(Y.min()), float(Y.max()), file=sys.stderr)
-
-    day_idx = (np.arange(window) / float(window - 1)).reshape(1, window, 1)
-    day_idx = np.repeat(day_idx, bas_s.shape[0], axis=0)
-    X = np.concatenate([bas_s, day_idx], axis=2)
-
-    split = int(0.8 * X.shape[0])
-    X_train, X_val, Y_train, Y_val = X[:split], X[split:], Y[:split], Y[split:]
-    print(f"ℹ️ Train samples: {X_train.shape[0]}, Val samples: {X_val.shape[0]}", file=sys.stderr)
-
-    # --- load or train ---
-    model = None
-    if os.path.exists(MODEL_FILE):
-        try:
-            model = load_model(MODEL_FILE, compile=False)
-            print("ℹ️ loaded existing model", file=sys.stderr)
-        except Exception as e:
-            print("⚠️ failed loading model:", e, file=sys.stderr)
-            model = None
-
-    if model is None:
-        n_targets = Y_train.shape[2]
-        model = build_encoder_decoder(window, X.shape[2], n_targets, latent=128)
-        model.summary(print_fn=lambda x: print(x, file=sys.stderr))
-        callbacks = [
-            EarlyStopping(monitor="val_loss", patience=15, restore_best_weights=True, verbose=1),
-            ReduceLROnPlateau(monitor="val_loss", factor=0.5, patience=6, min_lr=1e-6, verbose=1),
-            ModelCheckpoint(MODEL_FILE, monitor="val_loss", save_best_only=True, verbose=1),
-        ]
-        model.fit(
-            X_train, Y_train,
-            validation_data=(X_val, Y_val),
-            epochs=200, batch_size=32,
-            callbacks=callbacks, verbose=2
-        )
-        model.save(MODEL_FILE)
-        print("✅ Residual model trained and saved", file=sys.stderr)
-
-    # === Inference ===
-    last_baseline = values[-window:]
-    last_baseline_s = scaler.transform(last_baseline)
+        print("ℹ️ new residual scaler fitted", file=sys.stderr)
+
+    import trainer
+
+    opts = {k: v for k, v in (train_opts or {}).items() if v is not None}
+    # seeds / thread pools must be set before the model creates any TensorFlow op
+    opts["seed"] = trainer.configure(opts.get("seed", trainer.SEED), opts.get("threads", trainer.THREADS),
+                                     opts.get("deterministic", trainer.DETERMINISTIC))
+    model = build_encoder_decoder(window, n_features + 1, n_features, latent=128)
+    model.summary(print_fn=lambda x: print(x, file=sys.stderr))
+    version = registry.new_version()
+    # checkpoints go to the version directory; the live model is only replaced on promote
+    os.makedirs(registry.version_dir(version), exist_ok=True)
+    checkpoint = registry.version_paths(version)[0]
+    model, report = trainer.train(model, values_s, res_scaler, window, checkpoint_path=checkpoint,
+                                  valid_starts=usable_starts(imputed, len(values), window), **opts)
+    print(f"ℹ️ training: {json.dumps(report)}", file=sys.stderr)
+    registry.register(model, scaler, res_scaler, {
+        "kind": "full", "parent": None, **training_range(dates, len(values)),
+        "hyperparameters": {"window": window, "latent": 128, **opts}, "report": report,
+    }, version=version)
+    registry.promote(version)
+    print(f"✅ Residual model trained and saved (version {version})", file=sys.stderr)
+    return model, scaler, res_scaler
+
+def finetune_model(values, dates, window, cutoff, meta, train_opts=None, imputed=None):
+    """
+    Warm-start the saved model on the windows whose targets reach past `cutoff` (plus replay).
+    Scalers are only widened (partial_fit) when the new rows fall outside their fitted range.
+    Returns (model, scaler, res_scaler), or None when there is nothing new to learn from.
+    """
+    n_pairs = len(values) - 2 * window + 1
+    if n_pairs <= 0:
+        return None
+    # pair i covers rows i .. i + 2*window - 1; it is new if its last target day is past the cutoff
+    target_end = np.asarray(dates, dtype="datetime64[D]")[np.arange(n_pairs) + 2 * window - 1]
+    new_starts = np.flatnonzero(target_end > cutoff)
+    if new_starts.size == 0:
+        print(f"ℹ️ no windows past the training cutoff {cutoff}; nothing to fine-tune", file=sys.stderr)
+        return None
+
+    import trainer
+
+    opts = {k: v for k, v in (train_opts or {}).items() if v is not None}
+    opts["seed"] = trainer.configure(opts.get("seed", trainer.SEED), opts.get("threads", trainer.THREADS),
+                                     opts.get("deterministic", trainer.DETERMINISTIC))
+    # a private (uncached) Keras copy of the current version: fit() changes its weights
+    art = registry.load(meta.get("version"), backend="keras", cache=False)
+    if art is None:
+        return None
+    model = art.model
+    scaler, res_scaler = registry.load_scalers(art.version)
+
+    new_rows = values[int(new_starts[0]):]
+    outside = (new_rows < scaler.data_min_) | (new_rows > scaler.data_max_)
+    scalers_widened = bool(outside.any())
+    if scalers_widened:
+        scaler.partial_fit(new_rows)
+    values_s = scaler.transform(values).astype("float32")
+    if scalers_widened:
+        _, Y_raw, _, _ = build_xy(values_s[int(new_starts[0]):], window)
+        if len(Y_raw):
+            res_scaler.partial_fit(Y_raw.reshape(-1, Y_raw.shape[-1]))
+        print("ℹ️ new rows outside the fitted range; scalers widened", file=sys.stderr)
+
+    model, report = trainer.finetune(model, values_s, res_scaler, window, new_starts,
+                                     valid_starts=usable_starts(imputed, len(values), window), **opts)
+    print(f"ℹ️ fine-tune: {json.dumps(report)}", file=sys.stderr)
+    version = registry.register(model, scaler, res_scaler, {
+        "kind": "finetune", "parent": meta.get("version"), **training_range(dates, len(values)),
+        "previous_train_end": str(cutoff), "scalers_widened": scalers_widened,
+        "hyperparameters": {"window": window, **opts}, "report": report,
+    })
+    registry.promote(version)
+    print(f"✅ Residual model fine-tuned and saved (version {version})", file=sys.stderr)
+    return model, scaler, res_scaler
 
-    day_idx_inf = (np.arange(window) / float(window - 1)).reshape(window, 1)
-    input_seq = np.concatenate([last_baseline_s, day_idx_inf], axis=1).reshape(1, window, X.shape[2])
+def usable_starts(imputed, n_rows, window):
+    """Pair starts whose 2*window rows cross no long gap, or None (all) without a mask."""
+    if imputed is None:
+        return None
+    starts = calendar_merge.clean_starts(imputed, 2 * window)
+    skipped = max(n_rows - 2 * window + 1, 0) - len(starts)
+    if skipped:
+        print(f"⚠️ {skipped} window(s) span a gap > {calendar_merge.MAX_GAP_DAYS} days; left out", file=sys.stderr)
+    return starts
 
-    pred_res_scaled = model.predict(input_seq)[0]
-    pred_res_s = res_scaler.inverse_transform(pred_res_scaled)
-    pred_actual_s = last_baseline_s + pred_res_s
-    pred_actual = scaler.inverse_transform(pred_actual_s)
+# ===================== Artifacts =====================
+def training_range(dates, n_rows):
+    """Training data range recorded in a registry version's meta.json."""
+    if dates is None or len(dates) == 0:
+        return {"train_start": None, "train_end": None, "rows": int(n_rows)}
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    return {"train_start": str(dates.min()), "train_end": str(dates.max()), "rows": int(n_rows)}
 
+def fit_scalers(values, window):
+    """Fresh (unsaved) scaler + residual scaler for `values`, as train_model would fit them."""
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler = MinMaxScaler()
+    scaler.fit(values)
+    _, Y_raw, _, _ = build_xy(scaler.transform(values).astype("float32"), window)
+    res_scaler = MinMaxScaler(feature_range=(0, 1))
+    res_scaler.fit(Y_raw.reshape(-1, Y_raw.shape[-1]))
+    return scaler, res_scaler
+
+def prepare_training_data(values, window, scaler, res_scaler):
+    """(X, Y) for the residual model: scaled inputs and residual-scaled targets."""
+    affine = affine_transform.AffineScalers.from_scalers(scaler, res_scaler)
+    X, Y_raw, _, _ = build_xy(affine.transform(values), window)
+    return X, affine.res_transform(Y_raw, out=Y_raw)  # Y_raw is a fresh array: scale it in place
+
+# ===================== Modes =====================
+def artifacts_exist(version=None):
+    """Model + both scalers of a registry version (the live files when version is None) exist."""
+    return all(os.path.exists(p) for p in registry.version_paths(version))
+
+def run_inference(noaa_df, window, version=None, bands=None):
+    """
+    Inference-only path: load the trailing `window` history rows plus the NOAA block and
+    predict with the saved model/scalers of `version` (resolved as in registry.resolve), with
+    quantile bands when `bands` (band_settings()) is given. Returns None if the model cannot be loaded. The model is only loaded on a forecast-cache miss.
+    """
+    version = registry.resolve(version)
+    if not artifacts_exist(version):
+        print(f"⚠️ model version {version or 'live'} is missing files", file=sys.stderr)
+        return None
+    with instrumentation.stage("mongo_load") as st:
+        history_df = load_history_tail_from_mongo(window)
+        st["rows"] = len(history_df)
+    with instrumentation.stage("merge") as st:
+        all_df = merge_history_and_noaa(history_df, noaa_df)
+        st["imputed_days"] = int(all_df["imputed"].sum())
+    print(f"ℹ️ inference rows: {len(all_df)} (history tail {len(history_df)} + noaa {len(noaa_df)})", file=sys.stderr)
+    if len(all_df) < window:
+        print(f"❗ Need at least {window} rows. Found {len(all_df)}.", file=sys.stderr)
+        return []
+
+    values = all_df[FEATURES].values.astype("float32")
     start_date = noaa_df["date"].max() + timedelta(days=1)
-    results = []
-    for i in range(PRED_DAYS):
-        fdate = (start_date + timedelta(days=i)).date().isoformat()
-        rf, ai, kp = pred_actual[i]
-        results.append({"date": fdate, "f107": float(rf), "a_index": float(ai), "kp_max": float(kp)})
+    imputed = int(all_df["imputed"].values[-window:].sum())
+    if imputed:
+        print(f"⚠️ {imputed} of the last {window} input days are interpolated", file=sys.stderr)
+
+    def compute():
+        with instrumentation.stage("model_load", backend=inference_backend.BACKEND, version=version):
+            art = registry.load(version)
+            if art is not None and bands and not mc_dropout.supports_sampling(art.model):
+                print("ℹ️ backend has no dropout sampling; using the keras model for quantiles", file=sys.stderr)
+                art = registry.load(version, backend="keras")
+            if art is None:
+                return None
+        with instrumentation.stage("predict", mc_samples=bands["mc_samples"] if bands else 0):
+            return forecast_with_bands(art.model, art.affine, values, start_date, window=window, bands=bands)
+
+    return forecast_cache.cached(registry.version_paths(version), values[-window:], start_date, compute,
+                                 extra=bands)
+
+def run_training(noaa_df, window, refit_scalers=False, train_opts=None, bands=None):
+    """Training path: full history + NOAA, train a new model, then forecast with it."""
+    with instrumentation.stage("mongo_load") as st:
+        history_df = load_history_from_mongo()
+        st["rows"] = len(history_df)
+    print(f"ℹ️ history rows: {len(history_df)}", file=sys.stderr)
+    print(f"ℹ️ noaa rows: {len(noaa_df)}", file=sys.stderr)
+
+    with instrumentation.stage("merge") as st:
+        all_df = merge_history_and_noaa(history_df, noaa_df)
+        st["imputed_days"] = int(all_df["imputed"].sum())
+    print(f"ℹ️ merged rows: {len(all_df)} (history + noaa)", file=sys.stderr)
+
+    if all_df.empty or len(all_df) < window * 2:
+        print(f"❗ Need at least {window*2} rows. Found {len(all_df)}. Exiting.", file=sys.stderr)
+        return []
+
+    values = all_df[FEATURES].values.astype("float32")
+    with instrumentation.stage("train", rows=len(values)):
+        model, scaler, res_scaler = train_model(values, window, refit_scalers=refit_scalers, train_opts=train_opts,
+                                                dates=all_df["date"].values, imputed=all_df["imputed"].values)
+
+    start_date = noaa_df["date"].max() + timedelta(days=1)
+    affine = affine_transform.AffineScalers.from_scalers(scaler, res_scaler)
+    with instrumentation.stage("predict", mc_samples=bands["mc_samples"] if bands else 0):
+        return forecast_with_bands(model, affine, values, start_date, window=window, bands=bands)
+
+def run_finetune(noaa_df, window, train_opts=None, bands=None):
+    """
+    Fine-tune path: full history + NOAA, warm-start the saved model on what arrived after its
+    recorded training cutoff, then forecast. Returns None when there was nothing to fine-tune
+    (the caller then runs plain inference).
+    """
+    meta = registry.current_meta()
+    with instrumentation.stage("mongo_load") as st:
+        history_df = load_history_from_mongo()
+        st["rows"] = len(history_df)
+    with instrumentation.stage("merge") as st:
+        all_df = merge_history_and_noaa(history_df, noaa_df)
+        st["imputed_days"] = int(all_df["imputed"].sum())
+    if all_df.empty:
+        return None
+    dates = all_df["date"].values.astype("datetime64[D]")
+    values = all_df[FEATURES].values.astype("float32")
+
+    if not meta or not meta.get("train_end"):
+        # a model from before the registry: adopt it with today's data as its cutoff from now on
+        print(f"⚠️ current model has no recorded training range; adopting it with cutoff {dates.max()}",
+              file=sys.stderr)
+        registry.adopt(training_range(dates, len(values)))
+        return None
+
+    with instrumentation.stage("finetune", rows=len(values)):
+        tuned = finetune_model(values, dates, window, np.datetime64(meta["train_end"], "D"), meta, train_opts,
+                               imputed=all_df["imputed"].values)
+    if tuned is None:
+        return None
+    model, scaler, res_scaler = tuned
+    start_date = noaa_df["date"].max() + timedelta(days=1)
+    affine = affine_transform.AffineScalers.from_scalers(scaler, res_scaler)
+    with instrumentation.stage("predict", mc_samples=bands["mc_samples"] if bands else 0):
+        return forecast_with_bands(model, affine, values, start_date, window=window, bands=bands)
+
+# ===================== Last forecast =====================
+def artifact_stamp(version=None, backend=None, paths=None):
+    """
+    Identity of the model that produces a forecast: registry version, inference backend and the
+    content fingerprints of its model + scaler files (paths default to the version's files).
+    None when any of them is missing.
+    """
+    paths = registry.version_paths(version) if paths is None else paths
+    try:
+        fingerprints = [forecast_cache.file_fingerprint(p) for p in paths]
+    except OSError:
+        return None
+    return {"version": version, "backend": backend or inference_backend.BACKEND, "artifacts": fingerprints}
+
+def load_last_forecast(issued, stamp, bands=None):
+    """Stored results if they came from the bulletin issued at `issued` with the model `stamp` and `bands`."""
+    if not issued or stamp is None or not os.path.exists(LAST_FORECAST_FILE):
+        return None
+    try:
+        with open(LAST_FORECAST_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except Exception:
+        return None
+    if (state.get("issued") != issued or state.get("model") != stamp
+            or state.get("bands") != bands):
+        return None
+    return state.get("results") or None
+
+def save_last_forecast(issued, results, stamp, bands=None):
+    """stamp: artifact_stamp() of the model that produced `results` (taken when it was loaded)."""
+    if not issued or not results or stamp is None:
+        return
+    atomic_io.write_json(LAST_FORECAST_FILE, {"issued": issued, "model": stamp, "bands": bands, "results": results})
+
+# ===================== Main =====================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="27-day residual LSTM forecast")
+    parser.add_argument(
+        "--mode", choices=["auto", "infer", "train", "finetune"], default=os.getenv("FORECAST_MODE", "auto"),
+        help="infer: saved model, trailing window only; train: retrain on full history; "
+             "finetune: warm-start the saved model on data past its training cutoff, then forecast; "
+             "auto: infer when model + scalers exist, else train (default)",
+    )
+    parser.add_argument("--force", action="store_true",
+                        help="recompute even if the NOAA bulletin has not changed since the last forecast")
+    parser.add_argument("--refit-scalers", action="store_true",
+                        help="in train mode, refit both scalers instead of reusing the saved ones")
+    parser.add_argument("--batch-size", type=int, help="training batch size (env TRAIN_BATCH_SIZE, default 32)")
+    parser.add_argument("--threads", type=int, help="training thread count (env TRAIN_THREADS)")
+    parser.add_argument("--seed", type=int, help="training seed (env TRAIN_SEED)")
+    parser.add_argument("--deterministic", action="store_true", default=None,
+                        help="reproducible training (env TRAIN_DETERMINISTIC=1)")
+    parser.add_argument("--model-version", default=registry.MODEL_VERSION, metavar="VERSION",
+                        help="infer with this registry version instead of the current one "
+                             "(env FORECAST_MODEL_VERSION; see registry.py list)")
+    parser.add_argument("--mc-samples", type=int, default=mc_dropout.MC_SAMPLES, metavar="N",
+                        help="add per-day quantile bands from N Monte Carlo dropout passes "
+                             "(env FORECAST_MC_SAMPLES, default 0 = point forecast only)")
+    parser.add_argument("--quantiles", type=float, nargs="+", default=list(mc_dropout.QUANTILES),
+                        help="quantiles reported with --mc-samples (env FORECAST_QUANTILES, default 0.05 0.5 0.95)")
+    parser.add_argument("--profile", default=instrumentation.PROFILE_FILE, metavar="PATH",
+                        help="write a cProfile dump of the run to PATH (env FORECAST_PROFILE)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Run the forecast with per-stage timing/memory lines (see instrumentation.py)."""
+    args = parse_args(argv)
+    instrumentation.start_run("predict_lstm").record("imports", time.perf_counter() - _IMPORT_T0)
+    status = "error"
+    try:
+        with instrumentation.profiled(args.profile):
+            status = run(args)
+    finally:
+        instrumentation.finish_run(status)
+
+def run(args):
+    with instrumentation.stage("noaa_fetch") as st:
+        bulletin = noaa_fetch.fetch_bulletin()
+        st["status"] = bulletin["status"]
+    print(f"ℹ️ NOAA bulletin issued {bulletin['issued']} ({bulletin['status']})", file=sys.stderr)
+    with instrumentation.stage("noaa_parse"):
+        noaa_df = parse_noaa_text(bulletin["text"])
+    if noaa_df.empty:
+        print("[]")
+        print("❌ No NOAA 27-day data found; exiting.", file=sys.stderr)
+        return "no_noaa_data"
+
+    window = PRED_DAYS
+    version = registry.resolve(args.model_version or None)
+    if args.model_version and registry.read_meta(version) is None:
+        print(f"❌ unknown model version {version!r} (see registry.py list)", file=sys.stderr)
+        sys.exit(1)
+    bands = band_settings(args.mc_samples, args.quantiles)
+    mode = args.mode
+    if mode == "auto":
+        mode = "infer" if artifacts_exist(version) else "train"
+    print(f"ℹ️ mode: {mode}", file=sys.stderr)
+
+    # identity of the model an inference run would use; the stored forecast must match it
+    stamp = artifact_stamp(version)
+    if mode == "infer" and not args.force:
+        cached = load_last_forecast(bulletin["issued"], stamp, bands)
+        if cached is not None:
+            print("ℹ️ NOAA issue unchanged since last forecast; reusing stored result.", file=sys.stderr)
+            print(json.dumps(cached))
+            return "unchanged"
+
+    results = None
+    train_opts = {"batch_size": args.batch_size, "threads": args.threads, "seed": args.seed,
+                  "deterministic": args.deterministic}
+    if mode == "finetune":
+        if not artifacts_exist():
+            print("❌ finetune mode needs model + both scalers; run with --mode train first.", file=sys.stderr)
+            sys.exit(1)
+        results = run_finetune(noaa_df, window, train_opts=train_opts, bands=bands)
+        mode = "infer" if results is None else mode
+        version = registry.resolve(args.model_version or None)  # a finetune may have adopted the live files
+        stamp = artifact_stamp(version)
+    if results is None and mode == "infer":
+        if not artifacts_exist(version):
+            print("❌ infer mode needs model + both scalers; run with --mode train first.", file=sys.stderr)
+            sys.exit(1)
+        results = run_inference(noaa_df, window, version=version, bands=bands)
+        if results is None and args.mode in ("infer", "finetune"):
+            print("❌ failed to load model in infer mode.", file=sys.stderr)
+            sys.exit(1)
+    if results is None:
+        results = run_training(noaa_df, window, refit_scalers=args.refit_scalers, train_opts=train_opts,
+                               bands=bands)
+        mode = "train"
+    if mode != "infer":
+        # trained / fine-tuned in process: the forecast came from the new (promoted) keras model
+        stamp = artifact_stamp(registry.current_version(), backend="keras")
 
-    print(json.dumps(results))
+    with instrumentation.stage("output", rows=len(results)):
+        save_last_forecast(bulletin["issued"], results, stamp, bands)
+        print(json.dumps(results))
+    return "ok"
 
 if __name__ == "__main__":
     main()
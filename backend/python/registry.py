@@ -0,0 +1,250 @@
+# backend/python/registry.py  -- versioned store for the residual model and its scalers
+# Layout (FORECAST_ARTIFACTS_DIR, default backend/python/artifacts):
+#   <version>/trained_lstm.keras, scaler.save, residual_scaler.save
+#   <version>/meta.json   kind, parent, training range, hyperparameters, training report, backtest
+#   current.json          {"version", "promoted", "history": [previously current, newest first]}
+# meta.json is written last, so a version only shows up once all of its files are complete.
+# promote() swaps current.json with os.replace and copies the version's files over the live
+# paths next to the scripts (the Node runner and the eval scripts read those), so a rollback is
+# one pointer swap plus three small copies -- no retraining.
+# load() resolves a version (default: FORECAST_MODEL_VERSION, else current) and keeps the model
+# and the folded scalers (affine_transform.py; sidecar written by register) in an in-process
+# cache keyed by (version, backend), without unpickling -- or importing -- scikit-learn. Models trained before the
+# registry existed have no version; load() then reads the live files, and `adopt` imports them.
+#
+# Usage (from backend folder):
+#   python python/registry.py list
+#   python python/registry.py show [VERSION]
+#   python python/registry.py promote VERSION
+#   python python/registry.py rollback
+#   python python/registry.py adopt                      # register the live files as a version
+#   python python/registry.py metrics VERSION bt.json    # bt.json from backtest.py --json-out
+import os
+import sys
+import json
+import shutil
+import argparse
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+import joblib
+
+import atomic_io
+import affine_transform
+import inference_backend
+
+# ===================== Config =====================
+BASE_DIR = os.path.dirname(__file__)
+REGISTRY_DIR = os.getenv("FORECAST_ARTIFACTS_DIR", os.path.join(BASE_DIR, "artifacts"))
+CURRENT_FILE = os.path.join(REGISTRY_DIR, "current.json")
+MODEL_VERSION = os.getenv("FORECAST_MODEL_VERSION", "")  # pin inference to a version
+MODEL_NAME = "trained_lstm.keras"
+SCALER_NAME = "scaler.save"
+RES_SCALER_NAME = "residual_scaler.save"
+LIVE_FILES = tuple(os.path.join(BASE_DIR, n) for n in (MODEL_NAME, SCALER_NAME, RES_SCALER_NAME))
+HISTORY_LIMIT = 20  # rollback depth kept in current.json
+
+Artifacts = namedtuple("Artifacts", "version model affine meta paths")
+
+# ===================== Versions =====================
+def new_version():
+    return datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
+
+def version_dir(version):
+    return os.path.join(REGISTRY_DIR, version)
+
+def version_paths(version=None):
+    """(model, scaler, residual scaler) paths of `version`; the live files when version is None."""
+    if version is None:
+        return LIVE_FILES
+    d = version_dir(version)
+    return tuple(os.path.join(d, n) for n in (MODEL_NAME, SCALER_NAME, RES_SCALER_NAME))
+
+def _write_json(path, obj):
+    atomic_io.write_json(path, obj, indent=2)
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def read_meta(version):
+    return _read_json(os.path.join(version_dir(version), "meta.json"))
+
+def list_versions():
+    """meta.json of every complete version, oldest first."""
+    if not os.path.isdir(REGISTRY_DIR):
+        return []
+    metas = (read_meta(v) for v in sorted(os.listdir(REGISTRY_DIR)) if os.path.isdir(version_dir(v)))
+    return [m for m in metas if m]
+
+def register(model, scaler, res_scaler, meta, version=None):
+    """Save model + scalers + meta under a new (or given) version id; does not promote it."""
+    version = version or new_version()
+    model_path, scaler_path, res_path = version_paths(version)
+    os.makedirs(version_dir(version), exist_ok=True)
+    model.save(model_path)
+    joblib.dump(scaler, scaler_path)
+    joblib.dump(res_scaler, res_path)
+    affine_transform.write_sidecar(affine_transform.AffineScalers.from_scalers(scaler, res_scaler),
+                                   scaler_path, res_path)
+    meta = {"version": version, "created": datetime.utcnow().isoformat(timespec="seconds") + "Z", **meta}
+    _write_json(os.path.join(version_dir(version), "meta.json"), meta)
+    return version
+
+def adopt(meta=None):
+    """Register the live files (from before the registry existed) as a version and make it current."""
+    if not all(os.path.exists(p) for p in LIVE_FILES):
+        raise FileNotFoundError("no live model + scalers to adopt")
+    version = new_version()
+    os.makedirs(version_dir(version), exist_ok=True)
+    for src, dst in zip(LIVE_FILES, version_paths(version)):
+        shutil.copyfile(src, dst)
+    meta = {"version": version, "created": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "kind": "adopted", "parent": None, **(meta or {})}
+    _write_json(os.path.join(version_dir(version), "meta.json"), meta)
+    promote(version)
+    return version
+
+def set_backtest(version, metrics):
+    """Attach backtest metrics (e.g. backtest.py's summary) to a version's meta.json."""
+    meta = read_meta(version)
+    if meta is None:
+        raise KeyError(f"unknown model version {version!r}")
+    meta["backtest"] = metrics
+    _write_json(os.path.join(version_dir(version), "meta.json"), meta)
+    return meta
+
+# ===================== Current pointer =====================
+def current():
+    return _read_json(CURRENT_FILE)
+
+def current_version():
+    cur = current()
+    return cur.get("version") if cur else None
+
+def current_meta():
+    version = current_version()
+    return read_meta(version) if version else None
+
+def _sync_live(version):
+    pairs = list(zip(version_paths(version), LIVE_FILES))
+    sidecar = affine_transform.sidecar_path(version_paths(version)[1])
+    if os.path.exists(sidecar):  # keyed by the .save hashes, so it stays valid next to the copies
+        pairs.append((sidecar, affine_transform.sidecar_path(LIVE_FILES[1])))
+    for src, live in pairs:
+        atomic_io.copy_file(src, live)
+
+def promote(version, history=None):
+    """Make `version` current: atomic swap of current.json, then refresh the live files."""
+    if read_meta(version) is None:
+        raise KeyError(f"unknown model version {version!r}")
+    cur = current() or {}
+    if history is None:
+        history = ([cur["version"]] if cur.get("version") else []) + cur.get("history", [])
+    _write_json(CURRENT_FILE, {"version": version, "promoted": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                               "history": history[:HISTORY_LIMIT]})
+    _sync_live(version)
+    print(f"✅ model version {version} is current", file=sys.stderr)
+    return version
+
+def rollback():
+    """Re-promote the previously current version."""
+    cur = current() or {}
+    history = cur.get("history", [])
+    if not history:
+        raise RuntimeError("no previous model version to roll back to")
+    return promote(history[0], history=history[1:])
+
+# ===================== Loading =====================
+_cache = {}
+_cache_lock = threading.Lock()
+
+def resolve(version=None):
+    """Explicit version, else FORECAST_MODEL_VERSION, else current; None means the live files."""
+    return version or MODEL_VERSION or current_version()
+
+def load(version=None, backend=None, cache=True):
+    """
+    Artifacts(version, model, affine, meta, paths) for `version`, or None when the
+    model cannot be loaded. backend as in inference_backend (falls back to keras); pass
+    cache=False for a private copy you intend to modify (e.g. fine-tuning).
+    """
+    version = resolve(version)
+    backend = backend or inference_backend.BACKEND
+    key = (version, backend)
+    with _cache_lock:
+        if cache and key in _cache:
+            return _cache[key]
+        paths = version_paths(version)
+        if not all(os.path.exists(p) for p in paths):
+            print(f"⚠️ model version {version or 'live'} is missing files", file=sys.stderr)
+            return None
+        model = inference_backend.load_backend(backend, paths[0])
+        if model is None and backend != "keras":
+            print("⚠️ falling back to the keras backend", file=sys.stderr)
+            model = inference_backend.load_keras(paths[0])
+        if model is None:
+            return None
+        art = Artifacts(version, model, affine_transform.load(paths[1], paths[2]),
+                        read_meta(version) if version else None, paths)
+        if cache:
+            _cache[key] = art
+        return art
+
+def load_scalers(version=None):
+    """The fitted sklearn scalers of `version` (training / fine-tuning; inference uses load().affine)."""
+    _, scaler_path, res_path = version_paths(resolve(version))
+    return joblib.load(scaler_path), joblib.load(res_path)
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+# ===================== CLI =====================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List, promote and roll back residual model versions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="all versions with their training range and kind")
+    show = sub.add_parser("show", help="meta.json of a version (default: current)")
+    show.add_argument("version", nargs="?")
+    promote_p = sub.add_parser("promote", help="make a version current")
+    promote_p.add_argument("version")
+    sub.add_parser("rollback", help="re-promote the previously current version")
+    sub.add_parser("adopt", help="register the live model + scalers as a version")
+    metrics = sub.add_parser("metrics", help="attach a backtest.py report to a version")
+    metrics.add_argument("version")
+    metrics.add_argument("report", help="JSON report written by backtest.py --json-out (or its redirected stdout)")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        cur = current_version()
+        rows = [{"version": m["version"], "current": m["version"] == cur, "kind": m.get("kind"),
+                 "parent": m.get("parent"), "train_start": m.get("train_start"), "train_end": m.get("train_end"),
+                 "backtest": bool(m.get("backtest"))} for m in list_versions()]
+        print(json.dumps(rows, indent=2))
+    elif args.command == "show":
+        version = args.version or current_version()
+        meta = read_meta(version) if version else None
+        if meta is None:
+            print(f"❌ unknown model version {version!r}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(meta, indent=2))
+    elif args.command == "promote":
+        promote(args.version)
+    elif args.command == "rollback":
+        print(rollback())
+    elif args.command == "adopt":
+        print(adopt())
+    elif args.command == "metrics":
+        report = _read_json(args.report)
+        if report is None:
+            print(f"❌ cannot read {args.report}", file=sys.stderr)
+            sys.exit(1)
+        set_backtest(args.version, {k: report.get(k) for k in ("series", "folds", "summary", "per_lead")})
+
+if __name__ == "__main__":
+    main()
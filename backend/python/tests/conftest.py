@@ -0,0 +1,5 @@
+# backend/python/tests/conftest.py  -- the scripts import their siblings directly (flat folder)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,45 @@
+# backend/python/tests/test_atomic_io.py  -- temp-then-rename writes under concurrency and failure
+import os
+import json
+import threading
+
+import numpy as np
+import pytest
+
+import atomic_io
+
+def test_concurrent_writers_leave_one_complete_file(tmp_path):
+    path = str(tmp_path / "state.json")
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(200):
+                atomic_io.write_json(path, {"writer": n, "i": i, "pad": "x" * 1000})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["i"] == 199
+    assert os.listdir(tmp_path) == ["state.json"]
+
+def test_failed_writer_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / "cache.npz")
+    atomic_io.atomic_write(path, lambda tmp: np.savez(tmp, a=np.arange(3)), suffix=".tmp.npz")
+
+    def broken(tmp):
+        with open(tmp, "wb") as f:
+            f.write(b"half")
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        atomic_io.atomic_write(path, broken, suffix=".tmp.npz")
+    with np.load(path) as data:
+        assert data["a"].tolist() == [0, 1, 2]
+    assert os.listdir(tmp_path) == ["cache.npz"]
@@ -0,0 +1,42 @@
+# backend/python/tests/test_history_cache.py  -- incremental cache against writes below the high-water mark
+from datetime import datetime, timedelta
+
+import pytest
+
+import history_cache
+
+mongomock = pytest.importorskip("mongomock")
+
+def add_days(coll, first, n):
+    coll.insert_many([{"date": first + timedelta(days=i), "f107": 100.0 + i, "a_index": 5.0, "kp_max": 2.0}
+                      for i in range(n)])
+
+@pytest.fixture
+def coll():
+    coll = mongomock.MongoClient().db.history
+    add_days(coll, datetime(2024, 1, 1), 10)
+    return coll
+
+def test_appends_rows_past_the_mark(coll, tmp_path):
+    path = str(tmp_path / "cache.npz")
+    assert history_cache.sync_history(coll, path)["date"].size == 10
+    add_days(coll, datetime(2024, 1, 11), 3)
+    assert history_cache.sync_history(coll, path)["date"].size == 13
+
+def test_rebuilds_after_deletes_below_the_mark(coll, tmp_path):
+    path = str(tmp_path / "cache.npz")
+    history_cache.sync_history(coll, path)
+    coll.delete_many({"date": {"$lte": datetime(2024, 1, 3)}})
+    arrays = history_cache.sync_history(coll, path)
+    assert arrays["date"].size == 7
+    assert arrays["f107"][0] == 103.0
+
+def test_rebuilds_after_a_replace_with_fewer_rows(coll, tmp_path):
+    """The POST /lstm shape: delete everything, insert a new block."""
+    path = str(tmp_path / "cache.npz")
+    history_cache.sync_history(coll, path)
+    coll.delete_many({})
+    add_days(coll, datetime(2024, 1, 5), 3)
+    arrays = history_cache.sync_history(coll, path)
+    assert arrays["date"].size == 3
+    assert arrays["f107"].tolist() == [100.0, 101.0, 102.0]
@@ -0,0 +1,148 @@
+# backend/python/tests/test_noaa_fetch.py  -- noaa_fetch against a local stand-in for NOAA
+# The stand-in serves one bulletin with an ETag and answers If-None-Match with 304, so the
+# conditional GET, a changed bulletin, an unchanged issue and the offline snapshot fallback
+# are all exercised over real HTTP on localhost.
+#
+# Usage (from backend/python):
+#   python -m pytest -q tests
+import socket
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import noaa_fetch
+
+def bulletin(issued, flux=120):
+    """A 27DO bulletin issued on `issued` (a date), 27 rows of constant values."""
+    lines = [":Product: 27-day Space Weather Outlook Table 27DO.txt",
+             f":Issued: {issued:%Y %b %d} 0153 UTC",
+             "#   UTC      Radio Flux   Planetary   Largest",
+             "#  Date       10.7 cm      A Index    Kp Index"]
+    for i in range(27):
+        lines.append(f"{issued + timedelta(days=i):%Y %b %d}     {flux}          12          4")
+    return "\n".join(lines) + "\n"
+
+class StandIn:
+    """Serves `body` with `etag`; 304 when the request's If-None-Match matches it."""
+
+    def __init__(self):
+        self.body = bulletin(date(2025, 6, 9))
+        self.etag = '"v1"'
+        self.status = 200
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests.append(dict(self.headers))
+                if stand_in.status != 200:
+                    self.send_response(stand_in.status)
+                    self.end_headers()
+                    return
+                if self.headers.get("If-None-Match") == stand_in.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", stand_in.etag)
+                    self.end_headers()
+                    return
+                data = stand_in.body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("ETag", stand_in.etag)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/27do.txt"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.server.shutdown()
+            self.server.server_close()
+
+@pytest.fixture
+def noaa(tmp_path, monkeypatch):
+    stand_in = StandIn()
+    monkeypatch.setattr(noaa_fetch, "NOAA_URL", stand_in.url)
+    monkeypatch.setattr(noaa_fetch, "SNAPSHOT_TEXT", str(tmp_path / "noaa_snapshot.txt"))
+    monkeypatch.setattr(noaa_fetch, "SNAPSHOT_META", str(tmp_path / "noaa_snapshot.json"))
+    monkeypatch.setattr(noaa_fetch, "TIMEOUT", 2)
+    yield stand_in
+    stand_in.close()
+
+def closed_port_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/27do.txt"
+
+def test_first_fetch_is_fresh_and_stores_snapshot(noaa):
+    got = noaa_fetch.fetch_bulletin()
+    assert got["status"] == "fresh"
+    assert got["text"] == noaa.body
+    assert got["issued"].startswith("2025-06-09")
+    text, meta = noaa_fetch.load_snapshot()
+    assert text == noaa.body
+    assert meta["etag"] == noaa.etag
+    assert "If-None-Match" not in noaa.requests[0]
+
+def test_unchanged_bulletin_is_a_conditional_304(noaa):
+    first = noaa_fetch.fetch_bulletin()
+    got = noaa_fetch.fetch_bulletin()
+    assert noaa.requests[-1].get("If-None-Match") == noaa.etag
+    assert got["status"] == "not_modified"
+    assert got["text"] == first["text"]
+    assert got["issued"] == first["issued"]
+
+def test_changed_bulletin_replaces_snapshot(noaa):
+    first = noaa_fetch.fetch_bulletin()
+    noaa.body, noaa.etag = bulletin(date(2025, 6, 16), flux=140), '"v2"'
+    got = noaa_fetch.fetch_bulletin()
+    assert got["status"] == "fresh"
+    assert got["text"] == noaa.body
+    assert got["issued"].startswith("2025-06-16") and got["issued"] != first["issued"]
+    assert noaa_fetch.load_snapshot()[1]["etag"] == '"v2"'
+
+def test_new_etag_with_same_issue_keeps_issue_date(noaa, tmp_path, monkeypatch):
+    """A re-served (e.g. re-formatted) bulletin with the same :Issued: reuses the stored forecast."""
+    import predict_lstm as pl
+
+    monkeypatch.setattr(pl, "LAST_FORECAST_FILE", str(tmp_path / "last_forecast.json"))
+    first = noaa_fetch.fetch_bulletin()
+    stamp = {"version": "v", "backend": "numpy", "artifacts": ["a", "b", "c"]}
+    results = [{"date": "2025-06-09", "f107": 120.0, "a_index": 12.0, "kp_max": 4.0}]
+    pl.save_last_forecast(first["issued"], results, stamp)
+
+    noaa.body, noaa.etag = noaa.body + "# trailing comment\n", '"v1b"'
+    got = noaa_fetch.fetch_bulletin()
+    assert got["status"] == "fresh"
+    assert got["issued"] == first["issued"]
+    assert pl.load_last_forecast(got["issued"], stamp) == results
+    assert pl.load_last_forecast(got["issued"], dict(stamp, version="other")) is None
+
+def test_offline_serves_snapshot(noaa):
+    first = noaa_fetch.fetch_bulletin()
+    noaa.close()  # same URL, nothing listening any more
+    got = noaa_fetch.fetch_bulletin()
+    assert got["status"] == "offline"
+    assert got["text"] == first["text"]
+    assert got["issued"] == first["issued"]
+
+def test_server_error_serves_snapshot(noaa):
+    first = noaa_fetch.fetch_bulletin()
+    noaa.status = 503
+    got = noaa_fetch.fetch_bulletin()
+    assert got["status"] == "offline"
+    assert got["text"] == first["text"]
+
+def test_offline_without_snapshot_is_unavailable(noaa, monkeypatch):
+    monkeypatch.setattr(noaa_fetch, "NOAA_URL", closed_port_url())
+    got = noaa_fetch.fetch_bulletin()
+    assert got == {"text": "", "issued": None, "status": "unavailable"}
@@ -0,0 +1,58 @@
+# backend/python/tests/test_registry.py  -- registry metrics round trip and missing-version paths
+import os
+import json
+
+import pytest
+
+import backtest
+import forecast_cache
+import registry
+
+ARCHIVE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "27 day forecast.txt")
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, "REGISTRY_DIR", str(tmp_path / "artifacts"))
+    monkeypatch.setattr(registry, "CURRENT_FILE", str(tmp_path / "artifacts" / "current.json"))
+    monkeypatch.setattr(registry, "MODEL_VERSION", "")
+    registry.clear_cache()
+    os.makedirs(registry.REGISTRY_DIR)
+    return tmp_path
+
+def make_version(version):
+    os.makedirs(registry.version_dir(version))  # meta.json only: enough for metrics
+    registry._write_json(os.path.join(registry.version_dir(version), "meta.json"),
+                         {"version": version, "kind": "full", "parent": None})
+
+def test_backtest_json_out_feeds_registry_metrics(store):
+    make_version("v1")
+    report_path = str(store / "bt.json")
+    backtest.main(["--from-file", ARCHIVE, "--models", "persistence", "linear", "--folds", "1",
+                   "--test-days", "30", "--workers", "1", "--json-out", report_path])
+    with open(report_path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+
+    registry.main(["metrics", "v1", report_path])
+    attached = registry.read_meta("v1")["backtest"]
+    assert attached["summary"] == report["summary"]
+    assert attached["per_lead"] == report["per_lead"]
+    assert attached["series"] == report["series"]
+
+def test_missing_version_does_not_load(store):
+    assert registry.load("DOES_NOT_EXIST", backend="numpy") is None
+
+def test_current_pointing_at_deleted_version(store):
+    registry._write_json(registry.CURRENT_FILE, {"version": "gone", "history": []})
+    assert registry.resolve() == "gone"
+    assert registry.load(backend="numpy") is None
+
+def test_forecast_cache_bypassed_for_missing_artifacts(store, monkeypatch):
+    monkeypatch.setattr(forecast_cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(forecast_cache, "_default", forecast_cache.ForecastCache(str(store / "cache")))
+    paths = registry.version_paths("DOES_NOT_EXIST")
+    assert forecast_cache.cached(paths, [[1.0, 2.0, 3.0]], "2025-01-01", lambda: None) is None
+
+def test_inference_with_missing_version_returns_none(store):
+    import predict_lstm as pl
+
+    assert pl.run_inference(None, pl.PRED_DAYS, version="DOES_NOT_EXIST") is None
@@ -0,0 +1,247 @@
+# backend/python/trainer.py  -- tf.data training loop for the residual encoder-decoder
+# Instead of materializing X (n, 27, 4) and Y (n, 27, 3) up front, the pipeline keeps only the
+# scaled flat series and a list of window start indices; each (X, Y) pair is cut on the fly,
+# cached after the first epoch, reshuffled per epoch and prefetched while the model trains.
+# Residual scaling is applied in-graph (MinMax is affine: y * scale_ + min_).
+#   TRAIN_BATCH_SIZE      default 32
+#   TRAIN_THREADS         intra-op / tf.data thread count (default: TensorFlow's choice)
+#   TRAIN_SEED            seed for weights, dropout and shuffling
+#   TRAIN_DETERMINISTIC=1 reproducible runs (op determinism; slower)
+# Fine-tuning (predict_lstm --mode finetune) continues training the saved model on the windows
+# that reach past its recorded training cutoff plus a random replay sample of older windows:
+#   FINETUNE_EPOCHS (5), FINETUNE_REPLAY (4 old windows per new one), FINETUNE_LR (1e-4)
+#
+# Usage (from backend folder):
+#   python python/trainer.py --bench --from-file "python/27 day forecast.txt" --epochs 5
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import numpy as np
+import tensorflow as tf
+
+from windowing import day_index_channel
+from instrumentation import max_rss_mb
+
+# ===================== Config =====================
+BATCH_SIZE = int(os.getenv("TRAIN_BATCH_SIZE", "32"))
+THREADS = int(os.getenv("TRAIN_THREADS", "0")) or None
+SEED = int(os.getenv("TRAIN_SEED")) if os.getenv("TRAIN_SEED") else None
+DETERMINISTIC = os.getenv("TRAIN_DETERMINISTIC", "0") == "1"
+VAL_FRACTION = 0.2
+FINETUNE_EPOCHS = int(os.getenv("FINETUNE_EPOCHS", "5"))
+FINETUNE_REPLAY = float(os.getenv("FINETUNE_REPLAY", "4"))
+FINETUNE_LR = float(os.getenv("FINETUNE_LR", "1e-4"))
+
+# ===================== Runtime =====================
+def configure(seed=SEED, threads=THREADS, deterministic=DETERMINISTIC):
+    """Thread pools, seeds and op determinism; call before any TensorFlow op has run."""
+    if threads:
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(max(1, threads // 2))
+        except RuntimeError as e:
+            print(f"⚠️ thread count not applied (TensorFlow already initialized): {e}", file=sys.stderr)
+    if deterministic and seed is None:
+        seed = 0
+    if seed is not None:
+        tf.keras.utils.set_random_seed(seed)
+    if deterministic:
+        tf.config.experimental.enable_op_determinism()
+    return seed
+
+# ===================== Dataset =====================
+def window_dataset(values_s, res_scaler, window, starts, batch_size=BATCH_SIZE, shuffle=False,
+                   seed=None, threads=THREADS, deterministic=DETERMINISTIC, cache=True):
+    """
+    Batches of (X, Y) for the window pairs starting at `starts`: X is values_s[i:i+window] plus
+    the day-index channel, Y the residual-scaled values_s[i+window:i+2*window] - baseline.
+    """
+    series = tf.constant(np.asarray(values_s, dtype=np.float32))
+    day = tf.constant(day_index_channel(window)[:, None])
+    res_scale = tf.constant(res_scaler.scale_.astype(np.float32))
+    res_min = tf.constant(res_scaler.min_.astype(np.float32))
+
+    def pair(i):
+        seg = series[i : i + 2 * window]
+        bas, tar = seg[:window], seg[window:]
+        return tf.concat([bas, day], axis=-1), (tar - bas) * res_scale + res_min
+
+    ds = tf.data.Dataset.from_tensor_slices(np.asarray(starts, dtype=np.int64))
+    ds = ds.map(pair, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+    if cache:
+        ds = ds.cache()
+    if shuffle:
+        ds = ds.shuffle(len(starts), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+    options = tf.data.Options()
+    options.deterministic = deterministic
+    if threads:
+        options.threading.private_threadpool_size = threads
+    return ds.with_options(options)
+
+def split_starts(n_values, window, val_fraction=VAL_FRACTION, valid_starts=None):
+    """
+    Chronological train/val split of window start indices (same 80/20 as before), restricted
+    to valid_starts when given (e.g. calendar_merge.clean_starts).
+    """
+    n_pairs = n_values - 2 * window + 1
+    starts = np.arange(max(n_pairs, 0))
+    if valid_starts is not None:
+        starts = np.intersect1d(starts, valid_starts)
+    split = int((1 - val_fraction) * len(starts))
+    return starts[:split], starts[split:]
+
+# ===================== Training =====================
+class EpochStats(tf.keras.callbacks.Callback):
+    def on_train_begin(self, logs=None):
+        self.epoch_seconds, self.max_rss_mb = [], []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._t0 = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_seconds.append(time.perf_counter() - self._t0)
+        self.max_rss_mb.append(max_rss_mb())
+
+def train(model, values_s, res_scaler, window, epochs=200, batch_size=BATCH_SIZE, seed=SEED,
+          threads=THREADS, deterministic=DETERMINISTIC, checkpoint_path=None, valid_starts=None, verbose=2):
+    """
+    Fit `model` (a fresh build_encoder_decoder) on the scaled flat series with the same
+    callbacks as before. Returns (model, report) where report has per-epoch seconds / peak RSS.
+    valid_starts limits training to those window starts (None: every window).
+    """
+    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
+
+    train_starts, val_starts = split_starts(len(values_s), window, valid_starts=valid_starts)
+    print(f"ℹ️ Train samples: {len(train_starts)}, Val samples: {len(val_starts)}", file=sys.stderr)
+    common = dict(batch_size=batch_size, threads=threads, deterministic=deterministic)
+    train_ds = window_dataset(values_s, res_scaler, window, train_starts, shuffle=True, seed=seed, **common)
+    val_ds = window_dataset(values_s, res_scaler, window, val_starts, **common)
+
+    stats = EpochStats()
+    callbacks = [
+        EarlyStopping(monitor="val_loss", patience=15, restore_best_weights=True, verbose=1 if verbose else 0),
+        ReduceLROnPlateau(monitor="val_loss", factor=0.5, patience=6, min_lr=1e-6, verbose=1 if verbose else 0),
+        stats,
+    ]
+    if checkpoint_path:
+        callbacks.append(ModelCheckpoint(checkpoint_path, monitor="val_loss", save_best_only=True, verbose=1))
+    history = model.fit(train_ds, validation_data=val_ds, epochs=epochs, callbacks=callbacks, verbose=verbose)
+
+    report = {
+        "epochs": len(stats.epoch_seconds),
+        "epoch_seconds": [round(s, 4) for s in stats.epoch_seconds],
+        "max_rss_mb": stats.max_rss_mb[-1] if stats.max_rss_mb else max_rss_mb(),
+        "best_val_loss": float(min(history.history.get("val_loss", [np.nan]))),
+        "windows": int(len(train_starts) + len(val_starts)),
+    }
+    return model, report
+
+def finetune(model, values_s, res_scaler, window, new_starts, epochs=FINETUNE_EPOCHS, replay=FINETUNE_REPLAY,
+             learning_rate=FINETUNE_LR, batch_size=BATCH_SIZE, seed=SEED, threads=THREADS,
+             deterministic=DETERMINISTIC, valid_starts=None, verbose=2):
+    """
+    Warm-start `model` on the window pairs starting at `new_starts` plus `replay` x as many
+    randomly chosen older pairs (so the recent windows do not overwrite what was learned).
+    valid_starts, when given, restricts both the new and the replay windows.
+    """
+    new_starts = np.asarray(new_starts, dtype=np.int64)
+    old_starts = np.arange(int(new_starts.min()) if new_starts.size else 0)
+    if valid_starts is not None:
+        new_starts = np.intersect1d(new_starts, valid_starts)
+        old_starts = np.intersect1d(old_starts, valid_starts)
+    n_replay = min(old_starts.size, int(round(replay * new_starts.size)))
+    rng = np.random.default_rng(seed)
+    replay_starts = rng.choice(old_starts, n_replay, replace=False) if n_replay else old_starts[:0]
+    starts = np.concatenate([new_starts, replay_starts])
+    print(f"ℹ️ Fine-tune samples: {new_starts.size} new + {n_replay} replay", file=sys.stderr)
+
+    ds = window_dataset(values_s, res_scaler, window, starts, batch_size=batch_size, shuffle=True,
+                        seed=seed, threads=threads, deterministic=deterministic)
+    # a fresh, smaller-step optimizer: the saved model is compile=False
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate), loss="mse", metrics=["mae"])
+    stats = EpochStats()
+    history = model.fit(ds, epochs=epochs, callbacks=[stats], verbose=verbose)
+    report = {
+        "epochs": len(stats.epoch_seconds),
+        "epoch_seconds": [round(s, 4) for s in stats.epoch_seconds],
+        "max_rss_mb": stats.max_rss_mb[-1] if stats.max_rss_mb else max_rss_mb(),
+        "new_windows": int(new_starts.size),
+        "replay_windows": int(n_replay),
+        "final_loss": float(history.history["loss"][-1]),
+        "learning_rate": learning_rate,
+    }
+    return model, report
+
+# ===================== Benchmark =====================
+def bench_child(pipeline, path, epochs, batch_size, seed):
+    """One training run in this (fresh) process; peak RSS is per process, so runs are isolated."""
+    import predict_lstm as pl
+    from backtest import load_from_file
+
+    configure(seed=seed, deterministic=False)
+    if path:
+        (_, values), _ = load_from_file(path)
+    else:
+        values = pl.load_history_from_mongo()[["f107", "a_index", "kp_max"]].values.astype("float32")
+    scaler, res_scaler = pl.fit_scalers(values, pl.PRED_DAYS)
+    rss_before = max_rss_mb()
+    t0 = time.perf_counter()
+    if pipeline == "arrays":
+        stats = EpochStats()
+        X, Y = pl.prepare_training_data(values, pl.PRED_DAYS, scaler, res_scaler)
+        model = pl.build_encoder_decoder(pl.PRED_DAYS, X.shape[2], Y.shape[2])
+        split = int((1 - VAL_FRACTION) * X.shape[0])
+        model.fit(X[:split], Y[:split], validation_data=(X[split:], Y[split:]), epochs=epochs,
+                  batch_size=batch_size, callbacks=[stats], verbose=0)
+        report = {"epoch_seconds": [round(s, 4) for s in stats.epoch_seconds]}
+    else:
+        values_s = scaler.transform(values).astype("float32")
+        model = pl.build_encoder_decoder(pl.PRED_DAYS, values.shape[1] + 1, values.shape[1])
+        model, report = train(model, values_s, res_scaler, pl.PRED_DAYS, epochs=epochs,
+                              batch_size=batch_size, seed=seed, verbose=0)
+    secs = report["epoch_seconds"]
+    return {"pipeline": pipeline, "rows": int(len(values)), "epochs": len(secs),
+            "total_s": round(time.perf_counter() - t0, 3), "first_epoch_s": secs[0] if secs else None,
+            "median_epoch_s": round(float(np.median(secs[1:] or secs)), 4) if secs else None,
+            "rss_before_mb": rss_before, "max_rss_mb": max_rss_mb()}
+
+def bench(path, epochs, batch_size, seed):
+    report = []
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="2")
+    for pipeline in ("arrays", "tf.data"):
+        cmd = [sys.executable, os.path.abspath(__file__), "--bench-child", pipeline, "--epochs", str(epochs),
+               "--batch-size", str(batch_size), "--seed", str(seed)]
+        if path:
+            cmd += ["--from-file", path]
+        proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+        if proc.returncode != 0:
+            report.append({"pipeline": pipeline, "error": proc.stderr.strip().splitlines()[-1:]})
+            continue
+        report.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="tf.data trainer: epoch time / memory benchmark")
+    parser.add_argument("--bench", action="store_true", help="in-memory arrays vs tf.data, separate processes")
+    parser.add_argument("--from-file", help="NOAA archive text file instead of Mongo history")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=SEED if SEED is not None else 0)
+    parser.add_argument("--bench-child", choices=["arrays", "tf.data"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.bench_child:
+        print(json.dumps(bench_child(args.bench_child, args.from_file, args.epochs, args.batch_size, args.seed)))
+    elif args.bench:
+        print(json.dumps(bench(args.from_file, args.epochs, args.batch_size, args.seed)))
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
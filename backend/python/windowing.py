@@ -0,0 +1,43 @@
+# backend/python/windowing.py  -- sliding-window dataset builder shared by training and evaluation
+# Baseline/target pairs are strided views over the flat (N, n_features) series, so nothing is
+# duplicated 27x until the model input X is assembled. Scale the flat series first
+# (scaler.transform(values)); MinMax is per-feature, so that equals scaling every window.
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+def pair_views(values, window):
+    """
+    Zero-copy (baselines, targets) views, each shaped (n_pairs, window, n_features), where
+    baselines[i] = values[i:i+window] and targets[i] = values[i+window:i+2*window].
+    """
+    values = np.asarray(values)
+    n_pairs = len(values) - 2 * window + 1
+    if n_pairs <= 0:
+        empty = np.empty((0, window, values.shape[1]), dtype=values.dtype)
+        return empty, empty
+    # (N - window + 1, n_features, window) -> (N - window + 1, window, n_features), still a view
+    views = sliding_window_view(values, window, axis=0).transpose(0, 2, 1)
+    return views[:n_pairs], views[window : window + n_pairs]
+
+def day_index_channel(window):
+    """Position-in-window feature in [0, 1], shaped (window,)."""
+    return (np.arange(window) / float(window - 1)).astype("float32")
+
+def build_inputs(baselines_s):
+    """Model input X: scaled baselines plus the day-index channel, (n, window, n_features + 1)."""
+    n, window, n_features = baselines_s.shape
+    X = np.empty((n, window, n_features + 1), dtype="float32")
+    X[..., :n_features] = baselines_s
+    X[..., n_features] = day_index_channel(window)
+    return X
+
+def build_xy(values_s, window):
+    """
+    Build (X, Y_raw, bas_s, tar_s) from the already-scaled flat series.
+    Y_raw are the scaled residuals tar_s - bas_s (not yet residual-scaled);
+    bas_s / tar_s are views into values_s.
+    """
+    bas_s, tar_s = pair_views(values_s, window)
+    X = build_inputs(bas_s)
+    Y_raw = (tar_s - bas_s).astype("float32")
+    return X, Y_raw, bas_s, tar_s
@@ -6,6 +6,7 @@ const path = require("path");
 
 const Prediction = require("../models/Prediction");
 const LSTMForecast = require("../models/LSTMForecast");
+const { invalidateHistoryCache } = require("../models/HistoryCache");
 
 /* --- helper: build shifted 27 from stored LSTM (unchanged) --- */
 async function buildShifted27() {
@@ -68,6 +69,7 @@ router.post("/lstm", async (req, res) => {
     if (Array.isArray(req.body.predictions) && req.body.predictions.length) {
       await LSTMForecast.insertMany(req.body.predictions);
     }
+    invalidateHistoryCache();
     res.json({ message: "LSTM predictions saved successfully" });
   } catch (error) {
     res.status(500).json({ error: error.message });
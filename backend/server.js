@@ -6,6 +6,8 @@ const { execFile } = require("child_process");
 const path = require("path");
 const mongoose = require("mongoose");
 const axios = require("axios");
+const { fetchFromForecastServer } = require("./models/LSTMModelRunner");
+const { invalidateHistoryCache } = require("./models/HistoryCache");
 
 // Expose mongoose global for noaa27.js
 global.mongoose = mongoose;
@@ -72,6 +74,10 @@ async function fetchLastNOAADate() {
 
 // ===== Run Python LSTM =====
 async function runLSTM() {
+  // warm forecast server (FORECAST_SERVER_URL) first; null means fall back to the script
+  const served = await fetchFromForecastServer();
+  if (served) return served;
+
   console.log("⏰ Running Python LSTM:", pythonExe, pythonScript);
   return new Promise((resolve, reject) => {
     execFile(
@@ -212,6 +218,7 @@ async function savePredictions(predictions) {
               ap_index: p.a_index,
               kp_index: p.kp_max,
               source: "lstm",
+              ...(p.quantiles ? { quantiles: p.quantiles } : {}),
             },
           },
           upsert: true,
@@ -220,6 +227,12 @@ async function savePredictions(predictions) {
     });
 
     const result = await coll.bulkWrite(bulkOps, { ordered: false });
+    if (
+      deleteRes.deletedCount > 0 ||
+      result.upsertedCount + result.modifiedCount > 0
+    ) {
+      invalidateHistoryCache();
+    }
     console.log(
       `✅ Upserted ${result.upsertedCount + result.modifiedCount} predictions (after ${lastNoaaDay
         .toISOString()
@@ -299,6 +312,7 @@ function mapDoc(d) {
     ap_index: d.ap_index ?? d.a_index,
     kp_index: d.kp_index ?? d.kp_max,
     source: d.source || "unknown",
+    ...(d.quantiles ? { quantiles: d.quantiles } : {}),
   };
 }
 